@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from typing import Dict, List, Optional
+from app import storage
+from app.snapshots import atomic_write
+
+# Configuration
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'asset_cache')
+MAX_BYTES = int(os.environ.get("SCRAPER_ASSET_CACHE_MB", "512")) * 1024 * 1024
+ENABLED = os.environ.get("SCRAPER_ASSET_CACHE", "1") != "0"
+# X's static hosts serve content-hashed bundles, fonts and emoji that never change under one URL
+ASSET_URL = re.compile(r"^https://(abs|abs-0)\.twimg\.com/.+\.(js|css|woff2?|svg|png|json)(\?.*)?$")
+# Response headers replayed from the cache; scripts are loaded cross-origin so CORS headers matter
+KEPT_HEADERS = ("content-type", "access-control-allow-origin", "timing-allow-origin", "cache-control")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS asset_cache (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_asset_cache_digest ON asset_cache(digest);
+CREATE INDEX IF NOT EXISTS idx_asset_cache_access ON asset_cache(last_access);
+
+CREATE TABLE IF NOT EXISTS asset_cache_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    bytes_saved INTEGER NOT NULL DEFAULT 0,
+    bytes_fetched INTEGER NOT NULL DEFAULT 0,
+    evicted INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_schema_ready = set()
+
+def connect(db_path: str = None):
+    """Open the profile database, creating the asset cache index on first use."""
+    conn = storage.connect(db_path)
+    if (db_path or storage.DB_PATH) not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(db_path or storage.DB_PATH)
+    return conn
+
+def blob_path(digest: str, cache_dir: str = None) -> str:
+    return os.path.join(cache_dir or CACHE_DIR, digest[:2], digest)
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def evict(max_bytes: int = None, db_path: str = None, cache_dir: str = None) -> int:
+    """Drop least recently used entries until the blobs fit in max_bytes. Returns entries removed."""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    removed_digests = []
+    removed = 0
+    connect(db_path).close()
+    with storage.transaction(db_path) as conn:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM asset_cache)").fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        for row in conn.execute("SELECT url, digest, size FROM asset_cache ORDER BY last_access").fetchall():
+            if total <= max_bytes:
+                break
+            conn.execute("DELETE FROM asset_cache WHERE url = ?", (row["url"],))
+            removed += 1
+            # A blob shared by several URLs is only freed with its last reference
+            if conn.execute("SELECT 1 FROM asset_cache WHERE digest = ? LIMIT 1", (row["digest"],)).fetchone() is None:
+                removed_digests.append(row["digest"])
+                total -= row["size"]
+        conn.execute("INSERT OR IGNORE INTO asset_cache_totals (id) VALUES (1)")
+        conn.execute("UPDATE asset_cache_totals SET evicted = evicted + ? WHERE id = 1", (removed,))
+    for digest in removed_digests:
+        try:
+            os.remove(blob_path(digest, cache_dir))
+        except OSError:
+            pass
+    return removed
+
+class AssetCache:
+    """Serves X's static assets for one browser context from the shared disk cache.
+
+    Blobs are stored by sha256 under CACHE_DIR and indexed by URL in SQLite, so
+    every context, browser and worker process shares them. Requests answered by
+    a service worker never reach context.route and are not counted.
+    """
+
+    def __init__(self, db_path: str = None, cache_dir: str = None):
+        self.db_path = db_path
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_fetched = 0
+        self._hit_urls: List[str] = []
+        self._index: Dict[str, tuple] = {}
+        self._stored = False
+
+    def _load_index(self) -> None:
+        conn = connect(self.db_path)
+        try:
+            self._index = {
+                row["url"]: (row["digest"], row["size"], json.loads(row["headers"]))
+                for row in conn.execute("SELECT url, digest, size, headers FROM asset_cache")
+            }
+        finally:
+            conn.close()
+
+    async def install(self, context) -> "AssetCache":
+        await asyncio.to_thread(self._load_index)
+        await context.route(ASSET_URL, self._handle)
+        return self
+
+    def _store(self, url: str, body: bytes, headers: Dict[str, str]) -> None:
+        digest = hashlib.sha256(body).hexdigest()
+        path = blob_path(digest, self.cache_dir)
+        if not os.path.exists(path):
+            atomic_write(path, body)
+        now = time.time()
+        with storage.transaction(self.db_path) as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO asset_cache (url, digest, size, headers, stored_at, last_access, hits)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+                """,
+                (url, digest, len(body), json.dumps(headers), now, now),
+            )
+        self._index[url] = (digest, len(body), headers)
+
+    async def _handle(self, route, request) -> None:
+        if request.method != "GET":
+            await route.fallback()
+            return
+        url = request.url
+        entry = self._index.get(url)
+        if entry is not None:
+            digest, size, headers = entry
+            body = await asyncio.to_thread(_read, blob_path(digest, self.cache_dir))
+            if body is not None:
+                self.hits += 1
+                self.bytes_saved += size
+                self._hit_urls.append(url)
+                await route.fulfill(status=200, headers=headers, body=body)
+                return
+            # Evicted by another process since the index was loaded
+            self._index.pop(url, None)
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception:
+            await route.fallback()
+            return
+        self.misses += 1
+        self.bytes_fetched += len(body)
+        if response.status == 200 and body:
+            headers = {k: v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS}
+            try:
+                await asyncio.to_thread(self._store, url, body, headers)
+                self._stored = True
+            except Exception as e:
+                print(f"Asset cache write failed for {url}: {e}")
+        await route.fulfill(response=response, body=body)
+
+    def flush(self) -> None:
+        """Record access times and totals for this run, then evict if the cache grew."""
+        now = time.time()
+        connect(self.db_path).close()
+        with storage.transaction(self.db_path) as conn:
+            if self._hit_urls:
+                counts: Dict[str, int] = {}
+                for url in self._hit_urls:
+                    counts[url] = counts.get(url, 0) + 1
+                conn.executemany(
+                    "UPDATE asset_cache SET last_access = ?, hits = hits + ? WHERE url = ?",
+                    [(now, n, url) for url, n in counts.items()],
+                )
+            conn.execute("INSERT OR IGNORE INTO asset_cache_totals (id) VALUES (1)")
+            conn.execute(
+                """
+                UPDATE asset_cache_totals SET hits = hits + ?, misses = misses + ?,
+                       bytes_saved = bytes_saved + ?, bytes_fetched = bytes_fetched + ?
+                WHERE id = 1
+                """,
+                (self.hits, self.misses, self.bytes_saved, self.bytes_fetched),
+            )
+        self._hit_urls = []
+        if self._stored:
+            evict(db_path=self.db_path, cache_dir=self.cache_dir)
+
+    def summary(self) -> Dict:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / requests, 4) if requests else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "bytes_fetched": self.bytes_fetched,
+        }
+
+def stats(db_path: str = None) -> Dict:
+    """Cache size and lifetime hit ratio for the /asset-cache endpoint."""
+    conn = connect(db_path)
+    try:
+        entries, blobs, size = conn.execute(
+            """
+            SELECT COUNT(*), COUNT(DISTINCT digest),
+                   COALESCE((SELECT SUM(size) FROM (SELECT DISTINCT digest, size FROM asset_cache)), 0)
+            FROM asset_cache
+            """
+        ).fetchone()
+        totals = conn.execute("SELECT * FROM asset_cache_totals WHERE id = 1").fetchone()
+    finally:
+        conn.close()
+    hits = totals["hits"] if totals else 0
+    misses = totals["misses"] if totals else 0
+    return {
+        "enabled": ENABLED,
+        "entries": entries,
+        "blobs": blobs,
+        "bytes": size,
+        "max_bytes": MAX_BYTES,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "bytes_saved": totals["bytes_saved"] if totals else 0,
+        "bytes_fetched": totals["bytes_fetched"] if totals else 0,
+        "evicted": totals["evicted"] if totals else 0,
+    }
@@ -0,0 +1,181 @@
+import os
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Set
+from app import metrics, events, roundtrips
+
+# Configuration
+# SCRAPER_MEMORY_CONTAINMENT=1 keeps long scrolls from growing the tab without bound:
+# processed timeline cells are hidden and stripped of their media at the same height, and
+# the page is reloaded and scrolled back when its JS heap passes SCRAPER_HEAP_LIMIT_MB
+ENABLED = os.environ.get("SCRAPER_MEMORY_CONTAINMENT", "0") == "1"
+HEAP_LIMIT_BYTES = int(os.environ.get("SCRAPER_HEAP_LIMIT_MB", "512")) * 1024 * 1024  # 0: never reload
+RESUME_MAX_SCROLLS = 60  # scrolls spent getting back to the old position after a reload
+RESUME_STALLS = 3  # scrolls without growth that end the resume early
+RESUME_SETTLE = 1.0  # seconds for each resume scroll to load
+# After a reload the limit is raised to the resumed heap plus this fraction of the configured
+# limit, so a page that is large just from scrolling back is not reloaded on every batch
+RECYCLE_HEADROOM = 0.25
+
+CELL_SELECTOR = 'div[data-testid="cellInnerDiv"]'
+# Cells and tweets not yet neutralised; the extraction loops iterate these only
+LIVE_CELL_SELECTOR = 'div[data-testid="cellInnerDiv"]:not([data-scraper-pruned])'
+LIVE_TWEET_SELECTOR = 'article[data-testid="tweet"]:not([data-scraper-pruned])'
+
+# Cells and their children belong to X's virtualized React list, which removes them
+# itself when they scroll far enough away, so nothing here is detached or replaced.
+# Processed cells are neutralised in place instead: their children skip layout and
+# paint (content-visibility, at their measured size so the scroll position holds),
+# images and videos drop their sources so decoded media is freed, and the cell and its
+# articles are marked so the extraction loops don't visit them again.
+# Keys are status ids ("status") or profile handles ("handle").
+PRUNE_SCRIPT = """
+({cellSelector, keys, match}) => {
+    const BLANK = 'data:image/gif;base64,R0lGODlhAQABAAAAACw=';
+    const wanted = new Set(keys);
+    let pruned = 0, nodes = 0;
+    for (const cell of document.querySelectorAll(cellSelector)) {
+        if (cell.dataset.scraperPruned) continue;
+        let key = null;
+        for (const link of cell.querySelectorAll('a[href]')) {
+            const href = link.getAttribute('href');
+            const candidate = match === 'status'
+                ? (href.match(/\\/status\\/(\\d+)/) || [])[1]
+                : href.replace(/^\\/+|\\/+$/g, '').split('/').pop();
+            if (candidate && wanted.has(candidate)) { key = candidate; break; }
+        }
+        if (key === null) continue;
+        for (const child of cell.children) {
+            const rect = child.getBoundingClientRect();
+            child.style.containIntrinsicSize = `${rect.width}px ${rect.height}px`;
+            child.style.contentVisibility = 'hidden';
+        }
+        for (const img of cell.querySelectorAll('img')) {
+            img.removeAttribute('srcset');
+            img.src = BLANK;
+        }
+        for (const video of cell.querySelectorAll('video')) {
+            video.pause();
+            video.removeAttribute('src');
+            video.load();
+        }
+        for (const element of cell.querySelectorAll('[style*="background-image"]')) {
+            element.style.backgroundImage = 'none';
+        }
+        for (const article of cell.querySelectorAll('article')) article.dataset.scraperPruned = key;
+        nodes += cell.getElementsByTagName('*').length;
+        cell.dataset.scraperPruned = key;
+        pruned++;
+    }
+    return {pruned, nodes};
+}
+"""
+
+class PageGuard:
+    """Memory containment for one scrolling page (the tweet timeline or a follower list)."""
+
+    def __init__(self, page, section: str, match: str, pace: Callable[[], Awaitable[None]]):
+        self.page = page
+        self.section = section
+        self.match = match
+        self.pace = pace  # the scraper's request pacing, awaited before each navigation and scroll
+        self.done: Set[str] = set()
+        self.pending: List[str] = []
+        self.pruned = 0
+        self.nodes_hidden = 0
+        self.recycles = 0
+        self.peak_heap = 0
+        self.heap_limit = HEAP_LIMIT_BYTES  # 0: reloads are off, or stopped helping
+        self._cdp = None
+
+    def processed(self, key: str) -> None:
+        """Mark an item as handled; its cell is pruned after the batch."""
+        if key not in self.done:
+            self.done.add(key)
+            self.pending.append(key)
+
+    async def prune(self, keys: List[str]) -> int:
+        try:
+            result = await self.page.evaluate(PRUNE_SCRIPT, {"cellSelector": CELL_SELECTOR, "keys": keys, "match": self.match})
+        except Exception as e:
+            events.warning("dom_prune_failed", section=self.section, error=str(e))
+            return 0
+        self.pruned += result["pruned"]
+        self.nodes_hidden += result["nodes"]
+        if result["pruned"]:
+            metrics.REGISTRY.inc("scraper_dom_pruned_total", result["pruned"], section=self.section)
+        events.debug("dom_pruned", section=self.section, cells=result["pruned"], nodes=result["nodes"])
+        return result["pruned"]
+
+    async def heap_used(self) -> Optional[int]:
+        """Used JS heap of the page's renderer, through CDP (Runtime.getHeapUsage)."""
+        try:
+            if self._cdp is None:
+                raw = roundtrips.unwrap(self.page)
+                self._cdp = await raw.context.new_cdp_session(raw)
+            usage = await self._cdp.send("Runtime.getHeapUsage")
+        except Exception as e:
+            events.debug("heap_check_failed", section=self.section, error=str(e))
+            self._cdp = None
+            return None
+        used = int(usage["usedSize"])
+        self.peak_heap = max(self.peak_heap, used)
+        return used
+
+    async def after_batch(self) -> bool:
+        """Prune the batch's cells and reload the page if it is over the heap limit. True after a reload."""
+        if self.pending:
+            keys, self.pending = self.pending, []
+            await self.prune(keys)
+        if not self.heap_limit:
+            return False
+        used = await self.heap_used()
+        if used is None or used < self.heap_limit:
+            return False
+        await self.recycle(used)
+        return True
+
+    async def recycle(self, used: int) -> None:
+        """Reload the page for a fresh document and heap, then scroll back to where it was."""
+        url = self.page.url
+        position = await self.page.evaluate("window.scrollY")
+        self.recycles += 1
+        metrics.REGISTRY.inc("scraper_page_recycles_total", section=self.section)
+        events.info("page_recycle", section=self.section, heap_mb=round(used / 1e6, 1), resume_at=position)
+        await self.pace()
+        await self.page.goto(url, wait_until="domcontentloaded")
+        await self.page.wait_for_selector(CELL_SELECTOR, timeout=10000)
+        fresh = await self.heap_used()
+        await self.resume(position)
+        if fresh is not None and fresh >= self.heap_limit:
+            # A fresh document is already over the limit: more reloads would only repeat the scroll back
+            events.warning("page_recycle_ineffective", section=self.section, heap_mb=round(fresh / 1e6, 1))
+            self.heap_limit = 0
+            return
+        resumed = await self.heap_used()
+        if resumed is not None and resumed >= self.heap_limit:
+            self.heap_limit = resumed + int(HEAP_LIMIT_BYTES * RECYCLE_HEADROOM)
+            events.info("heap_limit_raised", section=self.section, limit_mb=round(self.heap_limit / 1e6, 1))
+
+    async def resume(self, position: float) -> None:
+        # Timelines have no cursor in the URL: scroll until the list is as tall as before,
+        # emptying what was already extracted on the way so the next batch starts with new items
+        height, stalls = 0, 0
+        for _ in range(RESUME_MAX_SCROLLS):
+            await self.prune(sorted(self.done))
+            current = await self.page.evaluate("document.body.scrollHeight")
+            if current > position:
+                break
+            stalls = stalls + 1 if current <= height else 0
+            if stalls >= RESUME_STALLS:
+                break
+            height = current
+            await self.pace()
+            await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            await asyncio.sleep(RESUME_SETTLE)
+        await self.page.evaluate(f"window.scrollTo(0, {float(position)})")
+        await self.prune(sorted(self.done))
+        events.info("page_resumed", section=self.section, height=height)
+
+    def summary(self) -> dict:
+        return {"pruned": self.pruned, "nodes_hidden": self.nodes_hidden, "recycles": self.recycles,
+                "peak_heap_mb": round(self.peak_heap / 1e6, 1)}
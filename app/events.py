@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import time
+import uuid
+import contextvars
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+from app import storage
+
+# Configuration
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+LEVEL = LEVELS.get(os.environ.get("SCRAPER_LOG_LEVEL", "info").lower(), LEVELS["info"])
+FORMAT = os.environ.get("SCRAPER_LOG_FORMAT", "text")  # "text" or "json" (one object per line)
+RING_SIZE = int(os.environ.get("SCRAPER_LOG_RING", "1000"))  # recent events kept per run
+MAX_RUNS = 50  # runs kept in memory per process
+EVENTS_MAX_AGE = 7 * 86400  # stored event buffers older than this are dropped
+
+# Worker processes store each run's ring buffer here so the API can serve it
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS run_events (
+    run_id TEXT PRIMARY KEY,
+    job_id INTEGER,
+    username TEXT,
+    events TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_run_events_job ON run_events(job_id);
+"""
+
+_schema_ready = set()
+
+def connect(db_path: str = None):
+    """Open the profile database, creating the event table on first use."""
+    conn = storage.connect(db_path)
+    if (db_path or storage.DB_PATH) not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(db_path or storage.DB_PATH)
+    return conn
+
+class RunLog:
+    """Correlation id and ring buffer of recent events for one scrape run."""
+
+    def __init__(self, username: Optional[str] = None, job_id: Optional[int] = None):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.username = username
+        self.job_id = job_id
+        self.events = deque(maxlen=RING_SIZE)
+
+    def to_dict(self, min_level: int = 0) -> Dict:
+        return {
+            "run_id": self.run_id,
+            "job_id": self.job_id,
+            "username": self.username,
+            "events": [event for event in self.events if LEVELS[event["level"]] >= min_level],
+        }
+
+_current_run: contextvars.ContextVar[Optional[RunLog]] = contextvars.ContextVar("events_run", default=None)
+_current_job: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("events_job", default=None)
+_runs: "OrderedDict[str, RunLog]" = OrderedDict()
+
+def bind_job(job_id: Optional[int]) -> None:
+    """Tag runs started from this task with the queue job that started them."""
+    _current_job.set(job_id)
+
+def start_run(username: Optional[str] = None) -> RunLog:
+    run = RunLog(username, _current_job.get())
+    _current_run.set(run)
+    _runs[run.run_id] = run
+    while len(_runs) > MAX_RUNS:
+        _runs.popitem(last=False)
+    return run
+
+def current_run() -> Optional[RunLog]:
+    return _current_run.get()
+
+def enabled(level: str) -> bool:
+    return LEVELS[level] >= LEVEL
+
+def set_level(level: str) -> None:
+    global LEVEL
+    LEVEL = LEVELS[level]
+
+def _emit(level: str, event: str, fields: Dict) -> None:
+    run = _current_run.get()
+    record = {"ts": round(time.time(), 3), "level": level, "event": event}
+    if run is not None:
+        record["run"] = run.run_id
+        run.events.append({**record, **fields})
+    if FORMAT == "json":
+        line = json.dumps({**record, **fields}, ensure_ascii=False, default=str)
+    else:
+        stamp = time.strftime("%H:%M:%S", time.localtime(record["ts"]))
+        context = f" [{run.run_id}]" if run is not None else ""
+        line = f"{stamp} {level.upper():7}{context} {event}" + "".join(f" {k}={v!r}" for k, v in fields.items())
+    sys.stdout.write(line + "\n")
+
+# The level check comes first, so a disabled call costs one comparison and
+# its arguments are never formatted.
+def debug(event: str, **fields) -> None:
+    if LEVEL <= 10:
+        _emit("debug", event, fields)
+
+def info(event: str, **fields) -> None:
+    if LEVEL <= 20:
+        _emit("info", event, fields)
+
+def warning(event: str, **fields) -> None:
+    if LEVEL <= 30:
+        _emit("warning", event, fields)
+
+def error(event: str, **fields) -> None:
+    if LEVEL <= 40:
+        _emit("error", event, fields)
+
+def flush(run: RunLog, db_path: str = None) -> None:
+    """Store the run's ring buffer so other processes can read it."""
+    now = time.time()
+    connect(db_path).close()
+    with storage.transaction(db_path) as conn:
+        conn.execute("DELETE FROM run_events WHERE updated_at < ?", (now - EVENTS_MAX_AGE,))
+        conn.execute(
+            "INSERT OR REPLACE INTO run_events (run_id, job_id, username, events, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (run.run_id, run.job_id, run.username, json.dumps(list(run.events), default=str), now),
+        )
+
+def flush_job(job_id: int, db_path: str = None) -> None:
+    for run in list(_runs.values()):
+        if run.job_id == job_id:
+            flush(run, db_path)
+
+def _stored(where: str, args: tuple, db_path: str = None) -> Optional[Dict]:
+    conn = connect(db_path)
+    try:
+        row = conn.execute(
+            f"SELECT run_id, job_id, username, events FROM run_events WHERE {where} ORDER BY updated_at DESC LIMIT 1",
+            args,
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {"run_id": row["run_id"], "job_id": row["job_id"], "username": row["username"],
+            "events": json.loads(row["events"])}
+
+def _filter(entry: Optional[Dict], min_level: int) -> Optional[Dict]:
+    if entry is not None and min_level:
+        entry["events"] = [event for event in entry["events"] if LEVELS[event["level"]] >= min_level]
+    return entry
+
+def get_run_events(run_id: str, min_level: int = 0, db_path: str = None) -> Optional[Dict]:
+    """Recent events of a run in this process, or as last stored by the process that ran it."""
+    run = _runs.get(run_id)
+    if run is not None:
+        return run.to_dict(min_level)
+    return _filter(_stored("run_id = ?", (run_id,), db_path), min_level)
+
+def get_job_events(job_id: int, min_level: int = 0, db_path: str = None) -> Optional[Dict]:
+    """Recent events of the latest run of a queue job."""
+    runs: List[RunLog] = [run for run in _runs.values() if run.job_id == job_id]
+    if runs:
+        return runs[-1].to_dict(min_level)
+    return _filter(_stored("job_id = ?", (job_id,), db_path), min_level)
@@ -0,0 +1,169 @@
+from typing import Dict, List, Optional
+from app import storage
+
+# An edge (src, dst) means src follows dst. Edges are tagged with the scraped account
+# whose follower/following list showed them, so re-scraping one account only
+# replaces what that account's lists observed.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS graph_handles (
+    id INTEGER PRIMARY KEY,
+    handle TEXT NOT NULL UNIQUE COLLATE NOCASE
+);
+
+CREATE TABLE IF NOT EXISTS graph_edges (
+    src INTEGER NOT NULL,
+    dst INTEGER NOT NULL,
+    via INTEGER NOT NULL,
+    PRIMARY KEY (src, dst, via)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_graph_edges_dst ON graph_edges(dst, src);
+CREATE INDEX IF NOT EXISTS idx_graph_edges_via ON graph_edges(via);
+"""
+
+_schema_ready = set()
+
+def connect(db_path: str = None):
+    """Open the profile database, creating the graph index on first use."""
+    conn = storage.connect(db_path)
+    if (db_path or storage.DB_PATH) not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(db_path or storage.DB_PATH)
+    return conn
+
+def _normalize(handle: str) -> str:
+    return (handle or "").strip().lstrip('@')
+
+def _intern(conn, handles: List[str]) -> Dict[str, int]:
+    """Map handles to integer ids, assigning new ids as needed."""
+    conn.executemany("INSERT OR IGNORE INTO graph_handles (handle) VALUES (?)", [(h,) for h in handles])
+    ids = {}
+    # Stay well under SQLite's bound-parameter limit
+    for start in range(0, len(handles), 500):
+        chunk = handles[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        for row in conn.execute(f"SELECT id, handle FROM graph_handles WHERE handle IN ({placeholders})", chunk):
+            ids[row["handle"].lower()] = row["id"]
+    return ids
+
+def _handle_id(conn, handle: str) -> Optional[int]:
+    row = conn.execute("SELECT id FROM graph_handles WHERE handle = ?", (_normalize(handle),)).fetchone()
+    return row["id"] if row else None
+
+def update_account(username: str, result: Dict, db_path: str = None) -> Dict[str, int]:
+    """Replace the edges observed by one account's follower/following lists.
+
+    Lists that are empty in the result (not collected this run) are left untouched;
+    partial lists (see storage.complete_relations) only add edges.
+    """
+    updated = {}
+    complete = storage.complete_relations(result)
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        account = _normalize(username)
+        for relation, (handle_key, name_key, _) in storage.SOCIAL_RELATIONS.items():
+            users = result.get(relation) or []
+            members = []
+            for user in users:
+                # Older results only carry the display name
+                member = _normalize(user.get(handle_key) or user.get(name_key, ""))
+                if member:
+                    members.append(member)
+            if not members:
+                continue
+            ids = _intern(conn, [account] + members)
+            account_id = ids[account.lower()]
+            member_ids = {ids[m.lower()] for m in members} - {account_id}
+            if relation == "followers":
+                if relation in complete:
+                    conn.execute("DELETE FROM graph_edges WHERE via = ? AND dst = ?", (account_id, account_id))
+                edges = [(member_id, account_id, account_id) for member_id in member_ids]
+            else:
+                if relation in complete:
+                    conn.execute("DELETE FROM graph_edges WHERE via = ? AND src = ?", (account_id, account_id))
+                edges = [(account_id, member_id, account_id) for member_id in member_ids]
+            conn.executemany("INSERT OR IGNORE INTO graph_edges (src, dst, via) VALUES (?, ?, ?)", edges)
+            updated[relation] = len(edges)
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return updated
+
+def rebuild_from_storage(db_path: str = None) -> int:
+    """Backfill the graph from every profile already in the database."""
+    conn = storage.connect(db_path)
+    try:
+        usernames = [row["username"] for row in conn.execute("SELECT username FROM profiles")]
+    finally:
+        conn.close()
+    for username in usernames:
+        update_account(username, storage.load_result(username, db_path) or {}, db_path)
+    return len(usernames)
+
+def _page(conn, sql: str, params: tuple, limit: int, offset: int) -> Dict:
+    total = conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT h.handle FROM ({sql}) AS q JOIN graph_handles h ON h.id = q.uid ORDER BY h.handle LIMIT ? OFFSET ?",
+        params + (limit, offset),
+    ).fetchall()
+    return {"total": total, "limit": limit, "offset": offset, "handles": [row["handle"] for row in rows]}
+
+def followers_of(handle: str, limit: int = 100, offset: int = 0, db_path: str = None) -> Optional[Dict]:
+    """Everyone known to follow a handle, from any scraped list."""
+    conn = connect(db_path)
+    try:
+        handle_id = _handle_id(conn, handle)
+        if handle_id is None:
+            return None
+        return _page(conn, "SELECT DISTINCT src AS uid FROM graph_edges WHERE dst = ?", (handle_id,), limit, offset)
+    finally:
+        conn.close()
+
+def mutuals(handle: str, limit: int = 100, offset: int = 0, db_path: str = None) -> Optional[Dict]:
+    """Handles that both follow and are followed by a handle."""
+    conn = connect(db_path)
+    try:
+        handle_id = _handle_id(conn, handle)
+        if handle_id is None:
+            return None
+        sql = """
+            SELECT src AS uid FROM graph_edges WHERE dst = ?
+            INTERSECT
+            SELECT dst AS uid FROM graph_edges WHERE src = ?
+        """
+        return _page(conn, sql, (handle_id, handle_id), limit, offset)
+    finally:
+        conn.close()
+
+def overlap(first: str, second: str, relation: str = "followers", limit: int = 100, offset: int = 0,
+            db_path: str = None) -> Optional[Dict]:
+    """Shared followers (or shared following) of two handles, with the Jaccard index."""
+    if relation == "followers":
+        members_sql = "SELECT DISTINCT src AS uid FROM graph_edges WHERE dst = ?"
+    else:
+        members_sql = "SELECT DISTINCT dst AS uid FROM graph_edges WHERE src = ?"
+    conn = connect(db_path)
+    try:
+        first_id, second_id = _handle_id(conn, first), _handle_id(conn, second)
+        if first_id is None or second_id is None:
+            return None
+        first_count = conn.execute(f"SELECT COUNT(*) FROM ({members_sql})", (first_id,)).fetchone()[0]
+        second_count = conn.execute(f"SELECT COUNT(*) FROM ({members_sql})", (second_id,)).fetchone()[0]
+        page = _page(conn, f"{members_sql} INTERSECT {members_sql}", (first_id, second_id), limit, offset)
+        union = first_count + second_count - page["total"]
+        page.update({
+            "relation": relation,
+            "counts": {_normalize(first): first_count, _normalize(second): second_count},
+            "jaccard": round(page["total"] / union, 4) if union else 0.0,
+        })
+        return page
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    count = rebuild_from_storage()
+    print(f"Rebuilt follower graph from {count} stored profiles")
@@ -0,0 +1,82 @@
+import os
+import json
+from typing import Dict, List, Optional, Set
+from app.snapshots import atomic_write
+
+# Configuration; both accept a {username} placeholder, e.g. data/har/{username}.har
+# SCRAPER_HAR_RECORD: save each run's network traffic to this HAR, secrets scrubbed
+# SCRAPER_HAR_REPLAY: serve every request from this HAR, fully offline (unmatched requests fail)
+RECORD_PATH = os.environ.get("SCRAPER_HAR_RECORD") or None
+REPLAY_PATH = os.environ.get("SCRAPER_HAR_REPLAY") or None
+
+REDACTED = "REDACTED"
+# Headers whose values are credentials for the recorded session
+SECRET_HEADERS = {"cookie", "set-cookie", "authorization", "x-csrf-token", "x-guest-token", "proxy-authorization"}
+MIN_SECRET_LENGTH = 8  # shorter cookie values ("1", "en") are left alone when scrubbing bodies and URLs
+
+def record_path(username: str) -> Optional[str]:
+    return RECORD_PATH.format(username=username) if RECORD_PATH else None
+
+def replay_path(username: str) -> Optional[str]:
+    return REPLAY_PATH.format(username=username) if REPLAY_PATH else None
+
+def record_options(path: str) -> Dict:
+    """Context options that record a HAR; it is written when the context closes."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return {"record_har_path": path, "record_har_content": "embed", "record_har_mode": "full"}
+
+async def replay(context, path: str) -> None:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"HAR file not found: {path}")
+    await context.route_from_har(path, not_found="abort")
+
+def _cookie_values(header: str, set_cookie: bool) -> List[str]:
+    values = []
+    # Set-Cookie carries one cookie per line, followed by its attributes
+    pairs = [line.split(";", 1)[0] for line in header.splitlines()] if set_cookie else header.split(";")
+    for pair in pairs:
+        if "=" in pair:
+            values.append(pair.split("=", 1)[1].strip().strip('"'))
+    return values
+
+def scrub_message(message: Dict, secrets: Set[str]) -> None:
+    """Redact a request's or response's secret headers and cookies, collecting their values."""
+    for header in message.get("headers", []):
+        name = header.get("name", "").lower()
+        if name in SECRET_HEADERS:
+            if name in ("cookie", "set-cookie"):
+                secrets.update(_cookie_values(header.get("value", ""), name == "set-cookie"))
+            else:
+                secrets.add(header.get("value", ""))
+            header["value"] = REDACTED
+    for cookie in message.get("cookies", []):
+        secrets.add(cookie.get("value", ""))
+        cookie["value"] = REDACTED
+
+def scrub(path: str) -> int:
+    """Redact credentials in a recorded HAR in place. Returns the number of distinct secrets removed.
+
+    Secret headers and cookies are replaced first; their values are then removed
+    wherever else they appear (URLs, request bodies, inline responses), since X
+    echoes the CSRF token and account ids back in several places.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    secrets: Set[str] = set()
+    for entry in data.get("log", {}).get("entries", []):
+        scrub_message(entry.get("request", {}), secrets)
+        scrub_message(entry.get("response", {}), secrets)
+    secrets = usable_secrets(secrets)
+    atomic_write(path, redact(json.dumps(data, ensure_ascii=False), secrets).encode("utf-8"))
+    return len(secrets)
+
+def usable_secrets(secrets: Set[str]) -> Set[str]:
+    return {s for s in secrets if len(s) >= MIN_SECRET_LENGTH and s != REDACTED}
+
+def redact(text: str, secrets: Set[str]) -> str:
+    """Remove every occurrence of the secrets from text, raw or JSON-escaped."""
+    # Longest first, so a token containing another token is removed whole
+    for secret in sorted(secrets, key=len, reverse=True):
+        text = text.replace(secret, REDACTED)
+        text = text.replace(json.dumps(secret, ensure_ascii=False)[1:-1], REDACTED)
+    return text
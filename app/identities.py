@@ -0,0 +1,330 @@
+import os
+import glob
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app import storage, ratelimit
+
+# Configuration
+IDENTITIES_DIR = os.environ.get(
+    "SCRAPER_IDENTITIES_DIR", os.path.join(os.path.dirname(__file__), '..', 'data', 'identities')
+)
+# Single-account fallback when the pool directory is empty
+FALLBACK_COOKIES_FILE = os.path.join(os.path.dirname(__file__), 'twitter_cookies.json')
+# Optional per-identity overrides: {"<file stem>": {"rate": 0.5, "burst": 3, "hourly_budget": 300}}
+POOL_CONFIG_FILE = "pool.json"
+HOURLY_BUDGET = int(os.environ.get("SCRAPER_HOURLY_BUDGET", "900"))  # navigations/scrolls per identity per hour
+MAX_CONCURRENT = int(os.environ.get("SCRAPER_IDENTITY_CONCURRENCY", "2"))  # parallel runs per identity
+ERROR_COOLDOWN = 120.0  # seconds an identity rests after a run that failed outright
+LEASE_MAX_AGE = 2 * 3600  # leases older than this belong to dead processes
+BUSY_WAIT = float(os.environ.get("SCRAPER_IDENTITY_WAIT", "30"))  # seconds a scrape waits for a busy identity
+
+# identity_state.disabled_at is set when a session is found logged out; replacing the
+# storage-state file (newer mtime) re-enables it.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS identity_state (
+    identity TEXT PRIMARY KEY,
+    runs INTEGER NOT NULL DEFAULT 0,
+    successes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    requests INTEGER NOT NULL DEFAULT 0,
+    last_used REAL,
+    last_error TEXT,
+    cooldown_until REAL NOT NULL DEFAULT 0,
+    disabled_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS identity_usage (
+    identity TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (identity, hour)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS identity_leases (
+    id INTEGER PRIMARY KEY,
+    identity TEXT NOT NULL,
+    holder TEXT NOT NULL,
+    acquired_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_identity_leases ON identity_leases(identity);
+"""
+
+_schema_ready = set()
+
+def connect(db_path: str = None):
+    """Open the profile database, creating the identity tables on first use."""
+    # The breaker table is read alongside the identity tables
+    conn = ratelimit.connect(db_path)
+    if (db_path or storage.DB_PATH) not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(db_path or storage.DB_PATH)
+    return conn
+
+class IdentitiesBusy(RuntimeError):
+    """Every usable identity is already running MAX_CONCURRENT scrapes (not a rate limit)."""
+
+@dataclass
+class Identity:
+    name: str  # file stem, used in config and stats
+    path: str  # storage-state or cookie-list file
+    key: str  # rate-limit / circuit-breaker key (the account id when known)
+    rate: float = ratelimit.RATE
+    burst: float = ratelimit.BURST
+    hourly_budget: int = HOURLY_BUDGET
+
+@dataclass
+class Lease:
+    id: int
+    identity: Identity
+
+def _load_config(directory: str) -> Dict:
+    try:
+        with open(os.path.join(directory, POOL_CONFIG_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def list_identities(directory: str = None) -> List[Identity]:
+    """Identities in the pool directory, or the single legacy cookies file if it is empty."""
+    directory = directory or IDENTITIES_DIR
+    paths = sorted(
+        path for path in glob.glob(os.path.join(directory, "*.json"))
+        if os.path.basename(path) != POOL_CONFIG_FILE
+    )
+    if not paths and os.path.exists(FALLBACK_COOKIES_FILE):
+        paths = [FALLBACK_COOKIES_FILE]
+    config = _load_config(directory)
+    identities = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        overrides = config.get(name, {})
+        identity = Identity(
+            name=name,
+            path=path,
+            key=ratelimit.cookie_identity(path),
+            rate=float(overrides.get("rate", ratelimit.RATE)),
+            burst=float(overrides.get("burst", ratelimit.BURST)),
+            hourly_budget=int(overrides.get("hourly_budget", HOURLY_BUDGET)),
+        )
+        ratelimit.configure(identity.key, identity.rate, identity.burst)
+        identities.append(identity)
+    return identities
+
+def load_cookies(identity: Identity) -> List[Dict]:
+    """Cookies from a storage-state file ({"cookies": [...], "origins": [...]}) or a plain cookie list."""
+    with open(identity.path, "r") as f:
+        data = json.load(f)
+    return data.get("cookies", []) if isinstance(data, dict) else data
+
+def _hour(now: float) -> int:
+    return int(now // 3600)
+
+def _status(identity: Identity, row, active: int, used: int, breaker_until: Optional[float], now: float) -> Dict:
+    """Health of one identity and, when it cannot be used now, when it can."""
+    available_at = None
+    if row is not None and row["disabled_at"] and os.path.getmtime(identity.path) <= row["disabled_at"]:
+        health = "disabled"
+    else:
+        health = "healthy"
+        waits = []
+        if breaker_until is not None and breaker_until > now:
+            health = "rate_limited"
+            waits.append(breaker_until)
+        if row is not None and row["cooldown_until"] > now:
+            health = "cooling_down" if health == "healthy" else health
+            waits.append(row["cooldown_until"])
+        if used >= identity.hourly_budget:
+            health = "budget_exhausted" if health == "healthy" else health
+            waits.append((_hour(now) + 1) * 3600)
+        if waits:
+            available_at = max(waits)
+    return {
+        "health": health,
+        "available_at": available_at,
+        "active": active,
+        "requests_this_hour": used,
+    }
+
+def _snapshot(conn, identities: List[Identity], now: float) -> Dict[str, Dict]:
+    conn.execute("DELETE FROM identity_leases WHERE acquired_at < ?", (now - LEASE_MAX_AGE,))
+    active = {row["identity"]: row["n"] for row in conn.execute(
+        "SELECT identity, COUNT(*) AS n FROM identity_leases GROUP BY identity")}
+    used = {row["identity"]: row["requests"] for row in conn.execute(
+        "SELECT identity, requests FROM identity_usage WHERE hour = ?", (_hour(now),))}
+    rows = {row["identity"]: row for row in conn.execute("SELECT * FROM identity_state")}
+    breakers = {row["identity"]: row["open_until"] for row in conn.execute("SELECT identity, open_until FROM rate_breakers")}
+    return {
+        identity.key: _status(identity, rows.get(identity.key), active.get(identity.key, 0),
+                              used.get(identity.key, 0), breakers.get(identity.key), now)
+        for identity in identities
+    }
+
+def acquire(holder: str, db_path: str = None) -> Optional[Lease]:
+    """Lease the least-loaded usable identity, or None if none can be used right now."""
+    identities = list_identities()
+    if not identities:
+        return None
+    now = time.time()
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        status = _snapshot(conn, identities, now)
+        candidates = [
+            identity for identity in identities
+            if status[identity.key]["health"] == "healthy" and status[identity.key]["active"] < MAX_CONCURRENT
+        ]
+        lease = None
+        if candidates:
+            # Spread load: fewest running scrapes first, then the most unused budget this hour
+            chosen = min(candidates, key=lambda i: (
+                status[i.key]["active"],
+                status[i.key]["requests_this_hour"] / max(i.hourly_budget, 1),
+            ))
+            cursor = conn.execute(
+                "INSERT INTO identity_leases (identity, holder, acquired_at) VALUES (?, ?, ?)",
+                (chosen.key, holder, now),
+            )
+            lease = Lease(id=cursor.lastrowid, identity=chosen)
+        conn.execute("COMMIT")
+        return lease
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def charge(identity: Identity, requests: int = 1, db_path: str = None) -> Optional[float]:
+    """Count requests against the identity's hourly budget as the run makes them.
+
+    Returns when the budget frees up (the start of the next hour) once it is used up,
+    otherwise None.
+    """
+    now = time.time()
+    connect(db_path).close()
+    with storage.transaction(db_path) as conn:
+        conn.execute(
+            """
+            INSERT INTO identity_usage (identity, hour, requests) VALUES (?, ?, ?)
+            ON CONFLICT(identity, hour) DO UPDATE SET requests = requests + excluded.requests
+            """,
+            (identity.key, _hour(now), requests),
+        )
+        used = conn.execute(
+            "SELECT requests FROM identity_usage WHERE identity = ? AND hour = ?", (identity.key, _hour(now))
+        ).fetchone()["requests"]
+    return (_hour(now) + 1) * 3600 if used >= identity.hourly_budget else None
+
+def release(lease: Lease, requests: int, error: Optional[str] = None, logged_out: bool = False,
+            charged: int = 0, db_path: str = None) -> None:
+    """Return a leased identity and record the run's usage and outcome.
+
+    charged is how many of the requests were already counted through charge().
+    """
+    now = time.time()
+    key = lease.identity.key
+    connect(db_path).close()
+    with storage.transaction(db_path) as conn:
+        conn.execute("DELETE FROM identity_leases WHERE id = ?", (lease.id,))
+        if requests > charged:
+            conn.execute(
+                """
+                INSERT INTO identity_usage (identity, hour, requests) VALUES (?, ?, ?)
+                ON CONFLICT(identity, hour) DO UPDATE SET requests = requests + excluded.requests
+                """,
+                (key, _hour(now), requests - charged),
+            )
+        conn.execute(
+            """
+            INSERT INTO identity_state (identity, runs, successes, failures, requests, last_used, last_error,
+                                        cooldown_until, disabled_at)
+            VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(identity) DO UPDATE SET
+                runs = runs + 1,
+                successes = successes + excluded.successes,
+                failures = failures + excluded.failures,
+                requests = requests + excluded.requests,
+                last_used = excluded.last_used,
+                last_error = COALESCE(excluded.last_error, last_error),
+                cooldown_until = excluded.cooldown_until,
+                disabled_at = COALESCE(excluded.disabled_at, disabled_at)
+            """,
+            (key, int(error is None), int(error is not None), requests, now, error,
+             now + ERROR_COOLDOWN if error and not logged_out else 0, now if logged_out else None),
+        )
+        if error is None:
+            conn.execute("UPDATE identity_state SET disabled_at = NULL WHERE identity = ?", (key,))
+
+def availability(db_path: str = None) -> Tuple[str, Optional[float]]:
+    """Whether an identity can be leased now, and if not, why.
+
+    ("available", None); ("busy", None) when healthy identities are only at MAX_CONCURRENT,
+    which frees up as soon as a run ends; ("blocked", t) when every identity is rate limited,
+    cooling down or out of budget until t; ("unusable", inf) when all are disabled or none
+    are configured.
+    """
+    identities = list_identities()
+    now = time.time()
+    conn = connect(db_path)
+    try:
+        status = _snapshot(conn, identities, now)
+    finally:
+        conn.close()
+    busy = False
+    times = []
+    for identity in identities:
+        entry = status[identity.key]
+        if entry["health"] == "healthy":
+            if entry["active"] < MAX_CONCURRENT:
+                return "available", None
+            busy = True
+        elif entry["available_at"] is not None:
+            times.append(entry["available_at"])
+    if busy:
+        return "busy", None
+    return ("blocked", min(times)) if times else ("unusable", float("inf"))
+
+def available_at(db_path: str = None) -> Optional[float]:
+    """None if an identity can be leased now, otherwise the earliest time one may free up.
+
+    Busy identities count as free in a second. Returns float('inf') when every identity
+    is disabled (or none are configured).
+    """
+    state, until = availability(db_path)
+    if state == "busy":
+        return time.time() + 1
+    return until
+
+def stats(db_path: str = None) -> Dict:
+    """Per-identity health, load and lifetime usage for the /identities endpoint."""
+    identities = list_identities()
+    now = time.time()
+    conn = connect(db_path)
+    try:
+        status = _snapshot(conn, identities, now)
+        rows = {row["identity"]: row for row in conn.execute("SELECT * FROM identity_state")}
+    finally:
+        conn.close()
+    entries = []
+    for identity in identities:
+        row = rows.get(identity.key)
+        entry = {
+            "name": identity.name,
+            "identity": identity.key,
+            "rate": identity.rate,
+            "burst": identity.burst,
+            "hourly_budget": identity.hourly_budget,
+            **status[identity.key],
+            "breaker": ratelimit.breaker_state(identity.key),
+            "runs": row["runs"] if row else 0,
+            "successes": row["successes"] if row else 0,
+            "failures": row["failures"] if row else 0,
+            "requests": row["requests"] if row else 0,
+            "last_used": row["last_used"] if row else None,
+            "last_error": row["last_error"] if row else None,
+        }
+        entries.append(entry)
+    healthy = sum(1 for entry in entries if entry["health"] == "healthy")
+    return {"total": len(entries), "healthy": healthy, "identities": entries}
@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import socket
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from app import storage
+
+# Configuration
+LEASE_SECONDS = 120  # a running job whose heartbeat is older than this is requeued
+MAX_ATTEMPTS = 3  # attempts before a job that keeps losing its worker is marked failed
+
+# Scrape options a job may carry; anything else is rejected at enqueue time
+JOB_PARAMS = ("max_tweets", "max_retweets", "max_followers", "max_following", "incremental", "profile")
+
+# status: queued -> running -> done | failed. The API process only inserts and
+# reads rows; worker processes claim them one at a time.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL COLLATE NOCASE,
+    params TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    not_before REAL,
+    summary TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_username ON jobs(username, status);
+"""
+
+_schema_ready = set()
+
+def connect(db_path: str = None):
+    """Open the profile database, creating the job table on first use."""
+    conn = storage.connect(db_path)
+    if (db_path or storage.DB_PATH) not in _schema_ready:
+        conn.executescript(SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "not_before" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN not_before REAL")
+        _schema_ready.add(db_path or storage.DB_PATH)
+    return conn
+
+@contextmanager
+def _transaction(db_path: str = None):
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _row_to_job(row) -> Dict:
+    return {
+        "id": row["id"],
+        "username": row["username"],
+        "params": json.loads(row["params"]),
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "worker": row["worker"],
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+        "not_before": row["not_before"],
+        "summary": json.loads(row["summary"]) if row["summary"] else None,
+        "error": row["error"],
+    }
+
+def enqueue(username: str, params: Optional[Dict] = None, db_path: str = None) -> Dict:
+    """Queue a scrape, or return the job already queued or running for the same user and options."""
+    username = username.lstrip('@')
+    params = {k: v for k, v in (params or {}).items() if v is not None}
+    unknown = set(params) - set(JOB_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown job parameters: {', '.join(sorted(unknown))}")
+    encoded = json.dumps(params, sort_keys=True)
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE username = ? AND params = ? AND status IN ('queued', 'running') ORDER BY id LIMIT 1",
+            (username, encoded),
+        ).fetchone()
+        if row is None:
+            cursor = conn.execute(
+                "INSERT INTO jobs (username, params, created_at) VALUES (?, ?, ?)",
+                (username, encoded, time.time()),
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (cursor.lastrowid,)).fetchone()
+        conn.execute("COMMIT")
+        return _row_to_job(row)
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def claim(worker: str, db_path: str = None) -> Optional[Dict]:
+    """Atomically take the oldest queued job for a user nobody else is scraping."""
+    now = time.time()
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        # Requeue jobs whose worker died mid-run
+        conn.execute(
+            """
+            UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                            error = 'worker lost', worker = NULL,
+                            finished_at = CASE WHEN attempts >= ? THEN ? ELSE NULL END
+            WHERE status = 'running' AND heartbeat_at < ?
+            """,
+            (MAX_ATTEMPTS, MAX_ATTEMPTS, now, now - LEASE_SECONDS),
+        )
+        # One run per user at a time - runs share the user's spill file and screenshots
+        row = conn.execute(
+            """
+            SELECT * FROM jobs AS j
+            WHERE j.status = 'queued'
+              AND (j.not_before IS NULL OR j.not_before <= ?)
+              AND NOT EXISTS (SELECT 1 FROM jobs r WHERE r.username = j.username AND r.status = 'running')
+            ORDER BY j.id LIMIT 1
+            """,
+            (now,),
+        ).fetchone()
+        job = None
+        if row is not None:
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1,
+                                started_at = ?, heartbeat_at = ?, error = NULL
+                WHERE id = ?
+                """,
+                (worker, now, now, row["id"]),
+            )
+            job = _row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+        conn.execute("COMMIT")
+        return job
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def heartbeat(job_id: int, worker: str, db_path: str = None) -> bool:
+    """Extend a running job's lease. False means the job was taken away from this worker."""
+    with _transaction(db_path) as conn:
+        cursor = conn.execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time(), job_id, worker),
+        )
+        return cursor.rowcount == 1
+
+def _finish(job_id: int, worker: str, status: str, summary: Optional[Dict], error: Optional[str],
+            db_path: str = None) -> None:
+    with _transaction(db_path) as conn:
+        conn.execute(
+            """
+            UPDATE jobs SET status = ?, summary = ?, error = ?, finished_at = ?
+            WHERE id = ? AND worker = ? AND status = 'running'
+            """,
+            (status, json.dumps(summary) if summary is not None else None, error, time.time(), job_id, worker),
+        )
+
+def complete(job_id: int, worker: str, summary: Dict, db_path: str = None) -> None:
+    _finish(job_id, worker, "done", summary, None, db_path)
+
+def fail(job_id: int, worker: str, error: str, db_path: str = None) -> None:
+    _finish(job_id, worker, "failed", None, error, db_path)
+
+def defer(job_id: int, worker: str, until: float, reason: str, db_path: str = None) -> None:
+    """Put a running job back in the queue until a time, without using up an attempt."""
+    with _transaction(db_path) as conn:
+        conn.execute(
+            """
+            UPDATE jobs SET status = 'queued', worker = NULL, attempts = MAX(attempts - 1, 0),
+                            not_before = ?, error = ?
+            WHERE id = ? AND worker = ? AND status = 'running'
+            """,
+            (until, reason, job_id, worker),
+        )
+
+def get_job(job_id: int, db_path: str = None) -> Optional[Dict]:
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row) if row else None
+
+def list_jobs(status: Optional[str] = None, username: Optional[str] = None, limit: int = 50,
+              offset: int = 0, db_path: str = None) -> Dict:
+    """Most recent jobs first, with queue depth by status."""
+    filters, params = [], []
+    if status:
+        filters.append("status = ?")
+        params.append(status)
+    if username:
+        filters.append("username = ?")
+        params.append(username.lstrip('@'))
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            f"SELECT * FROM jobs {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        counts = {row["status"]: row["n"] for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+    finally:
+        conn.close()
+    return {"counts": counts, "limit": limit, "offset": offset, "jobs": [_row_to_job(row) for row in rows]}
+
+def summarize_result(result: Dict) -> Dict:
+    """What a finished job records; the full result lives in the profile database."""
+    summary = {section: len(result.get(section) or []) for section in ("tweets", "retweets", "followers", "following")}
+    for key in ("run_id", "incremental", "rate_limit", "trace", "profile"):
+        if result.get(key):
+            summary[key] = result[key]
+    return summary
@@ -2,12 +2,24 @@ from fastapi import FastAPI, Request, HTTPException, Query
 from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, Response, StreamingResponse
 import json
 import os
+import time
 from fastapi.middleware.cors import CORSMiddleware
 from app.scraper import scrape_twitter, clean_username_for_filename
-from app.models import TwitterScrapeResponse
+from app.models import TwitterScrapeResponse, ScrapeJobRequest, ScrapeJob
+from app import storage, snapshots, graph, search, jobs, identities, assetcache, metrics, events, tracing, profiling
+from app.spill import read_spill, spill_path
+from app.responses import (
+    compressed_json_response, compressed_bytes_response, conditional_file_response, PRIVATE_FILE,
+    file_etag, listing_etag, is_not_modified, not_modified_response, validator_headers,
+)
+from starlette.concurrency import run_in_threadpool
 import img2pdf
 from io import BytesIO
 
+# "queue" (default): /scrape enqueues a job for the worker processes (python -m app.worker),
+# so the API process never runs a browser; "inline" scrapes inside the API's event loop
+SCRAPE_MODE = os.environ.get("SCRAPE_MODE", "queue")
+
 class PrettyJSONResponse(JSONResponse):
     def render(self, content) -> bytes:
         return json.dumps(
@@ -20,6 +32,11 @@ class PrettyJSONResponse(JSONResponse):
 
 app = FastAPI()
 
+def require_admin(request: Request) -> None:
+    """Profiling and trace endpoints and options need the X-Admin-Token header to match SCRAPER_ADMIN_TOKEN."""
+    if not profiling.is_admin(request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -155,9 +172,23 @@ async def form():
             result.textContent = 'Scraping in progress...';
             screenshotsLink.style.display = 'none';
             try {
-                const response = await fetch(`/scrape/${encodeURIComponent(username)}`, { signal: abortController.signal });
+                let response = await fetch(`/scrape/${encodeURIComponent(username)}`, { signal: abortController.signal });
                 if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-                const data = await response.json();
+                let data = await response.json();
+                // Queue mode answers 202 with a job; poll it until a worker has stored the result
+                while (response.status === 202 || (data.status && data.status !== 'done')) {
+                    if (data.status === 'failed') throw new Error(data.error || 'Scrape job failed');
+                    result.textContent = `Scraping in progress... (job ${data.id}: ${data.status})`;
+                    await new Promise(resolve => setTimeout(resolve, 2000));
+                    response = await fetch(`/jobs/${data.id}`, { signal: abortController.signal });
+                    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                    data = await response.json();
+                }
+                if (data.result_url) {
+                    response = await fetch(data.result_url, { signal: abortController.signal });
+                    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                    data = await response.json();
+                }
                 result.textContent = JSON.stringify(data, null, 2);
                 const viewScreenshotsBtn = document.getElementById('viewScreenshotsBtn');
                 viewScreenshotsBtn.href = `/view-screenshots/${username}`;
@@ -188,22 +219,42 @@ async def form():
     </html>
     """
 
-@app.get("/scrape/{username}")
-async def scrape(username: str):
+# Queue mode answers 202 with the job, inline mode 200 with the result
+@app.get("/scrape/{username}", response_model=None,
+         responses={200: {"model": TwitterScrapeResponse}, 202: {"model": ScrapeJob}})
+async def scrape(username: str, request: Request, incremental: bool = Query(False, description="Only fetch tweets newer than the stored history"),
+                 profile: bool = Query(False, description="Profile the run (admin only); files are listed in the result's profile")):
+    if profile:
+        require_admin(request)
+    if SCRAPE_MODE == "queue":
+        params = {key: True for key, value in (("incremental", incremental), ("profile", profile)) if value}
+        job = await run_in_threadpool(jobs.enqueue, username, params or None)
+        return compressed_json_response(request, job, status_code=202, headers={"Location": f"/jobs/{job['id']}"})
+    state, blocked_until = await run_in_threadpool(identities.availability)
+    if state == "unusable":
+        raise HTTPException(status_code=503, detail="No usable cookie identity")
+    if state == "blocked":
+        retry_after = max(1, int(blocked_until - time.time()))
+        raise HTTPException(status_code=503, detail="Rate limited; try again later",
+                            headers={"Retry-After": str(retry_after)})
+    # "busy": the scrape waits up to SCRAPER_IDENTITY_WAIT for a running one to finish
     try:
-        result = await scrape_twitter(username)
-        return JSONResponse(
-            content=result,
-            headers={
-                "Content-Type": "application/json",
-                "X-Content-Type-Options": "nosniff"
-            }
+        result = await scrape_twitter(username, incremental=incremental, profile=profile)
+        # Validate the assembled result once, at the boundary
+        content = TwitterScrapeResponse.model_validate(result).model_dump(exclude_none=True)
+        return compressed_json_response(
+            request,
+            content,
+            headers={"X-Content-Type-Options": "nosniff"}
         )
+    except identities.IdentitiesBusy as e:
+        raise HTTPException(status_code=503, detail=f"All cookie identities are busy; try again shortly ({e})",
+                            headers={"Retry-After": "10"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/screenshots/{username}")
-async def get_screenshots(username: str, list: int = Query(0, description="Return list instead of PDF")):
+async def get_screenshots(username: str, request: Request, list: int = Query(0, description="Return list instead of PDF")):
     """Return a PDF of all screenshots for a specific user, or a list if ?list=1"""
     screenshots_dir = os.path.join(os.path.dirname(__file__), '..', 'screenshots')
     user_screenshots = []
@@ -212,7 +263,7 @@ async def get_screenshots(username: str, list: int = Query(0, description="Retur
         cleaned_username = clean_username_for_filename(username)
         for filename in sorted(os.listdir(screenshots_dir)):
             if filename.startswith(f"{cleaned_username}_") and filename.lower().endswith('.png'):
-                user_screenshots.append(filename if list else os.path.join(screenshots_dir, filename))
+                user_screenshots.append(os.path.join(screenshots_dir, filename))
     if not user_screenshots:
         # Return a simple HTML error if accessed from browser
         return Response(
@@ -220,12 +271,21 @@ async def get_screenshots(username: str, list: int = Query(0, description="Retur
             status_code=404,
             media_type="text/html"
         )
+    # Validators come from file names, sizes and mtimes, so polls never touch image data
+    etag, last_modified = listing_etag(user_screenshots, variant="list" if list else "pdf")
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
     if list:
-        return JSONResponse(content={"screenshots": user_screenshots})
+        return compressed_json_response(
+            request,
+            {"screenshots": [os.path.basename(path) for path in user_screenshots]},
+            headers=validator_headers(etag, last_modified)
+        )
     # Create PDF in memory
     pdf_bytes = BytesIO()
     try:
-        pdf_bytes.write(img2pdf.convert(user_screenshots))
+        # img2pdf is CPU-bound; keep it off the event loop
+        pdf_bytes.write(await run_in_threadpool(img2pdf.convert, user_screenshots))
         pdf_bytes.seek(0)
     except Exception as e:
         return Response(
@@ -233,9 +293,8 @@ async def get_screenshots(username: str, list: int = Query(0, description="Retur
             status_code=500,
             media_type="text/html"
         )
-    headers = {
-        "Content-Disposition": f"attachment; filename={username}_screenshots.pdf"
-    }
+    headers = validator_headers(etag, last_modified)
+    headers["Content-Disposition"] = f"attachment; filename={username}_screenshots.pdf"
     return StreamingResponse(
         pdf_bytes,
         media_type="application/pdf",
@@ -243,13 +302,13 @@ async def get_screenshots(username: str, list: int = Query(0, description="Retur
     )
 
 @app.get("/screenshot/{filename}")
-async def get_screenshot(filename: str):
+async def get_screenshot(filename: str, request: Request):
     """Serve a specific screenshot file"""
     screenshots_dir = os.path.join(os.path.dirname(__file__), '..', 'screenshots')
     file_path = os.path.join(screenshots_dir, filename)
     
     if os.path.exists(file_path):
-        return FileResponse(file_path, media_type="image/png")
+        return conditional_file_response(request, file_path, media_type="image/png")
     else:
         raise HTTPException(status_code=404, detail="Screenshot not found")
 
@@ -397,10 +456,209 @@ async def view_screenshots_page(username: str):
     """)
 
 @app.get("/scraped/{filename}")
-async def get_scraped_profile(filename: str):
+async def get_scraped_profile(filename: str, request: Request):
+    """Return a stored profile as JSON, generated from the profile database."""
+    username = filename[:-len('.json')] if filename.endswith('.json') else filename
+    version = await run_in_threadpool(storage.get_profile_version, username)
+    if version:
+        revision, scraped_at = version
+        etag = f'"{clean_username_for_filename(username).lower()}-r{revision}"'
+        if is_not_modified(request, etag, scraped_at):
+            return not_modified_response(etag, scraped_at)
+        return compressed_json_response(
+            request,
+            await run_in_threadpool(storage.load_result, username),
+            headers=validator_headers(etag, scraped_at)
+        )
+    # Fall back to JSON dumps written before the database existed
     scraped_dir = os.path.join(os.path.dirname(__file__), '..', 'scraped_profiles')
     file_path = os.path.join(scraped_dir, filename)
     if os.path.exists(file_path):
-        return FileResponse(file_path, media_type="application/json")
+        etag, last_modified = file_etag(file_path)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        with open(file_path, 'rb') as f:
+            body = f.read()
+        return compressed_bytes_response(
+            request,
+            body,
+            media_type="application/json",
+            headers=validator_headers(etag, last_modified)
+        )
     else:
         raise HTTPException(status_code=404, detail="File not found")
+
+@app.get("/runs/{username}")
+async def get_partial_run(username: str, request: Request):
+    """Return what an in-progress or interrupted scrape has extracted so far."""
+    path = spill_path(username)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No in-progress run for this user")
+    return compressed_json_response(request, read_spill(path))
+
+@app.get("/history/{username}")
+async def get_history(username: str, request: Request):
+    """List stored snapshot versions with item counts and change summaries."""
+    history = await run_in_threadpool(snapshots.list_snapshots, username)
+    if not history:
+        raise HTTPException(status_code=404, detail="No snapshots for this user")
+    return compressed_json_response(request, {"username": username, "versions": history})
+
+@app.get("/history/{username}/diff")
+async def get_history_diff(username: str, request: Request, from_version: int = Query(..., ge=0), to_version: int = Query(...)):
+    """Net changes between two snapshot versions (from_version=0 means since the beginning)."""
+    diff = await run_in_threadpool(snapshots.get_diff, username, from_version, to_version)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Unknown version range")
+    return compressed_json_response(request, diff)
+
+@app.get("/history/{username}/{version}")
+async def get_history_snapshot(username: str, version: int, request: Request):
+    """Return one full stored snapshot."""
+    snapshot = await run_in_threadpool(snapshots.load_snapshot, username, version)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return compressed_json_response(request, snapshot)
+
+@app.get("/graph/followers-of")
+async def graph_followers_of(request: Request, username: str, limit: int = Query(100, ge=1, le=5000), offset: int = Query(0, ge=0)):
+    """Everyone known to follow a user, across all scraped lists."""
+    page = await run_in_threadpool(graph.followers_of, username, limit, offset)
+    if page is None:
+        raise HTTPException(status_code=404, detail="User not in follower graph")
+    return compressed_json_response(request, page)
+
+@app.get("/graph/mutuals")
+async def graph_mutuals(request: Request, username: str, limit: int = Query(100, ge=1, le=5000), offset: int = Query(0, ge=0)):
+    """Users who follow and are followed by a user."""
+    page = await run_in_threadpool(graph.mutuals, username, limit, offset)
+    if page is None:
+        raise HTTPException(status_code=404, detail="User not in follower graph")
+    return compressed_json_response(request, page)
+
+@app.get("/graph/overlap")
+async def graph_overlap(request: Request, a: str, b: str, relation: str = Query("followers", pattern="^(followers|following)$"),
+                        limit: int = Query(100, ge=1, le=5000), offset: int = Query(0, ge=0)):
+    """Audience overlap between two users."""
+    page = await run_in_threadpool(graph.overlap, a, b, relation, limit, offset)
+    if page is None:
+        raise HTTPException(status_code=404, detail="User not in follower graph")
+    return compressed_json_response(request, page)
+
+@app.get("/search")
+async def search_scraped(
+    request: Request,
+    q: str = Query(..., min_length=1, description='Words or "quoted phrases"; a trailing * matches prefixes'),
+    username: str = Query(None, description="Only results from this scraped account"),
+    kind: str = Query(None, pattern="^(tweet|quote|retweet|follower_bio|following_bio)$"),
+    since: str = Query(None, description="ISO date, inclusive"),
+    until: str = Query(None, description="ISO date, inclusive"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=200),
+):
+    """Ranked full-text search over scraped tweets, quotes, retweets and bios."""
+    results = await run_in_threadpool(search.search, q, username, kind, since, until, page, page_size)
+    return compressed_json_response(request, results)
+
+@app.post("/jobs", status_code=202, responses={202: {"model": ScrapeJob}})
+async def create_job(body: ScrapeJobRequest, request: Request):
+    """Queue a scrape for the worker processes. Returns the existing job if an identical one is pending."""
+    params = body.model_dump(exclude={"username"}, exclude_none=True)
+    for flag in ("incremental", "profile"):
+        if not params.get(flag):
+            params.pop(flag, None)
+    if params.get("profile"):
+        require_admin(request)
+    job = await run_in_threadpool(jobs.enqueue, body.username, params)
+    return compressed_json_response(request, job, status_code=202, headers={"Location": f"/jobs/{job['id']}"})
+
+@app.get("/jobs")
+async def list_scrape_jobs(
+    request: Request,
+    status: str = Query(None, pattern="^(queued|running|done|failed)$"),
+    username: str = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """Recent jobs and queue depth by status."""
+    return compressed_json_response(request, await run_in_threadpool(jobs.list_jobs, status, username, limit, offset))
+
+@app.get("/jobs/{job_id}", responses={200: {"model": ScrapeJob}})
+async def get_scrape_job(job_id: int, request: Request):
+    """Job status; finished jobs link to the stored result."""
+    job = await run_in_threadpool(jobs.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "done":
+        job["result_url"] = f"/scraped/{job['username']}.json"
+    return compressed_json_response(request, job)
+
+@app.get("/jobs/{job_id}/events")
+async def get_scrape_job_events(
+    job_id: int,
+    request: Request,
+    level: str = Query("debug", pattern="^(debug|info|warning|error)$"),
+):
+    """Recent structured events of the job's latest run, for debugging."""
+    entry = await run_in_threadpool(events.get_job_events, job_id, events.LEVELS[level])
+    if entry is None:
+        raise HTTPException(status_code=404, detail="No events recorded for this job")
+    return compressed_json_response(request, entry)
+
+@app.get("/runs/{run_id}/events")
+async def get_run_events(
+    run_id: str,
+    request: Request,
+    level: str = Query("debug", pattern="^(debug|info|warning|error)$"),
+):
+    """Recent structured events of one scrape run (its id is in the result's run_id)."""
+    entry = await run_in_threadpool(events.get_run_events, run_id, events.LEVELS[level])
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return compressed_json_response(request, entry)
+
+@app.get("/jobs/{job_id}/traces")
+async def get_scrape_job_traces(job_id: int, request: Request):
+    """Playwright traces kept for the job's runs (slow, failing or empty ones) when SCRAPER_TRACE=1 (admin only)."""
+    require_admin(request)
+    return compressed_json_response(request, await run_in_threadpool(tracing.list_traces, job_id))
+
+@app.get("/traces/{run_id}")
+async def download_trace(run_id: str, request: Request):
+    """A retained trace; open it with `playwright show-trace` or trace.playwright.dev (admin only)."""
+    require_admin(request)
+    entry = await run_in_threadpool(tracing.get_trace, run_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return conditional_file_response(request, entry["path"], media_type="application/zip", cache_control=PRIVATE_FILE)
+
+@app.get("/jobs/{job_id}/profile")
+async def get_scrape_job_profiles(job_id: int, request: Request):
+    """Profiles stored for the job's runs, with download links (admin only)."""
+    require_admin(request)
+    return compressed_json_response(request, await run_in_threadpool(profiling.get_job_profiles, job_id))
+
+@app.get("/profiles/{run_id}/{name}")
+async def download_profile_file(run_id: str, name: str, request: Request):
+    """One profile output: cpu.folded and memory.folded load in flamegraph.pl or speedscope (admin only)."""
+    require_admin(request)
+    path = await run_in_threadpool(profiling.get_profile_file, run_id, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return conditional_file_response(request, path, media_type=profiling.FILES[name], cache_control=PRIVATE_FILE)
+
+@app.get("/identities")
+async def get_identities(request: Request):
+    """Health, load and usage of each cookie identity in the pool."""
+    return compressed_json_response(request, await run_in_threadpool(identities.stats))
+
+@app.get("/asset-cache")
+async def get_asset_cache_stats(request: Request):
+    """Size and lifetime hit ratio of the shared static asset cache."""
+    return compressed_json_response(request, await run_in_threadpool(assetcache.stats))
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: phase timings, item counts, timeouts and retries from every scraping process."""
+    body = await run_in_threadpool(metrics.render)
+    return Response(body, media_type="text/plain; version=0.0.4; charset=utf-8")
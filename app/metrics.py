@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import socket
+import threading
+import contextvars
+from typing import Dict, List, Optional, Tuple
+from app import storage
+
+# Histogram buckets in seconds, from a single locator call up to a full follower crawl
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+SNAPSHOT_MAX_AGE = 7 * 86400  # snapshots of processes silent for longer are dropped
+
+# name -> (type, help)
+METRICS = {
+    "scraper_phase_seconds": ("histogram", "Time spent in each scrape phase"),
+    "scraper_items_total": ("counter", "Items extracted, by kind"),
+    "scraper_timeouts_total": ("counter", "Timeouts hit, by operation"),
+    "scraper_retries_total": ("counter", "Retries made, by operation"),
+    "scraper_runs_total": ("counter", "Finished scrape runs, by outcome"),
+    "scraper_round_trips_total": ("counter", "Browser protocol calls, by scrape section"),
+    "scraper_dom_pruned_total": ("counter", "Processed timeline cells hidden and stripped of media, by section"),
+    "scraper_page_recycles_total": ("counter", "Pages reloaded after passing the JS heap limit, by section"),
+}
+
+# Every process that scrapes stores its registry here; /metrics merges them
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics_snapshots (
+    process TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_schema_ready = set()
+
+def connect(db_path: str = None):
+    """Open the profile database, creating the metrics table on first use."""
+    conn = storage.connect(db_path)
+    if (db_path or storage.DB_PATH) not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(db_path or storage.DB_PATH)
+    return conn
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+class Registry:
+    """Counters and histograms for one process."""
+
+    def __init__(self):
+        self.counters: Dict[Key, float] = {}
+        self.histograms: Dict[Key, List[float]] = {}  # bucket counts..., +Inf count, sum
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            data = self.histograms.get(key)
+            if data is None:
+                data = self.histograms[key] = [0.0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    data[i] += 1
+            data[len(BUCKETS)] += 1
+            data[-1] += value
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "counters": [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                "histograms": [[name, dict(labels), list(data)] for (name, labels), data in self.histograms.items()],
+            }
+
+    def merge(self, data: Dict) -> None:
+        for name, labels, value in data.get("counters", []):
+            self.inc(name, value, **labels)
+        for name, labels, values in data.get("histograms", []):
+            key = (name, tuple(sorted(labels.items())))
+            with self._lock:
+                current = self.histograms.setdefault(key, [0.0] * (len(BUCKETS) + 2))
+                for i, value in enumerate(values[:len(current)]):
+                    current[i] += value
+
+REGISTRY = Registry()
+PROCESS = f"{socket.gethostname()}:{os.getpid()}"
+
+class RunTimings:
+    """Per-run phase breakdown attached to the scrape result."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, List[float]] = {}  # phase -> [count, total, max]
+        self.items: Dict[str, int] = {}  # extracted in this run, not resumed from a spill
+        self.timeouts: Dict[str, int] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        entry = self.phases.setdefault(phase, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+    def to_dict(self) -> Dict:
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 3),
+            "phases": {
+                phase: {"count": count, "seconds": round(total, 3), "max_seconds": round(longest, 3)}
+                for phase, (count, total, longest) in self.phases.items()
+            },
+            "items": dict(self.items),
+            "timeouts": dict(self.timeouts),
+        }
+
+_current_run: contextvars.ContextVar[Optional[RunTimings]] = contextvars.ContextVar("metrics_run", default=None)
+
+def start_run() -> RunTimings:
+    run = RunTimings()
+    _current_run.set(run)
+    return run
+
+class Timer:
+    """Times one phase; usable as a context manager or stopped explicitly with done()."""
+
+    def __init__(self, phase: str):
+        self.phase = phase
+        self.started = time.perf_counter()
+        self.finished = False
+
+    def done(self) -> float:
+        if self.finished:
+            return 0.0
+        self.finished = True
+        seconds = time.perf_counter() - self.started
+        REGISTRY.observe("scraper_phase_seconds", seconds, phase=self.phase)
+        run = _current_run.get()
+        if run is not None:
+            run.add(self.phase, seconds)
+        return seconds
+
+    def __enter__(self) -> "Timer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.done()
+
+def phase(name: str) -> Timer:
+    return Timer(name)
+
+def count_items(kind: str, count: int) -> None:
+    if count:
+        REGISTRY.inc("scraper_items_total", count, kind=kind)
+        run = _current_run.get()
+        if run is not None:
+            run.items[kind] = run.items.get(kind, 0) + count
+
+def count_timeout(operation: str) -> None:
+    REGISTRY.inc("scraper_timeouts_total", operation=operation)
+    run = _current_run.get()
+    if run is not None:
+        run.timeouts[operation] = run.timeouts.get(operation, 0) + 1
+
+def count_retry(operation: str) -> None:
+    REGISTRY.inc("scraper_retries_total", operation=operation)
+
+def count_run(outcome: str) -> None:
+    REGISTRY.inc("scraper_runs_total", outcome=outcome)
+
+def flush(db_path: str = None) -> None:
+    """Publish this process's registry for the /metrics endpoint."""
+    connect(db_path).close()
+    with storage.transaction(db_path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO metrics_snapshots (process, data, updated_at) VALUES (?, ?, ?)",
+            (PROCESS, json.dumps(REGISTRY.to_dict()), time.time()),
+        )
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels: Tuple, extra: Tuple = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+def render(db_path: str = None) -> str:
+    """Prometheus text exposition of all processes' metrics."""
+    merged = Registry()
+    conn = connect(db_path)
+    try:
+        conn.execute("DELETE FROM metrics_snapshots WHERE updated_at < ?", (time.time() - SNAPSHOT_MAX_AGE,))
+        conn.commit()
+        rows = conn.execute("SELECT process, data FROM metrics_snapshots").fetchall()
+    finally:
+        conn.close()
+    for row in rows:
+        if row["process"] != PROCESS:
+            merged.merge(json.loads(row["data"]))
+    # This process's live values replace its last flushed snapshot
+    merged.merge(REGISTRY.to_dict())
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (metric, labels), value in sorted(merged.counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(labels)} {_format(value)}")
+        else:
+            for (metric, labels), data in sorted(merged.histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(BUCKETS, data):
+                    lines.append(f"{name}_bucket{_labels(labels, (('le', _format(bound)),))} {_format(count)}")
+                lines.append(f"{name}_bucket{_labels(labels, (('le', '+Inf'),))} {_format(data[len(BUCKETS)])}")
+                lines.append(f"{name}_sum{_labels(labels)} {_format(data[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {_format(data[len(BUCKETS)])}")
+    return "\n".join(lines) + "\n"
@@ -1,40 +1,140 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+# API response shapes. The scraper builds plain dicts from app.records; these
+# models only validate and document the result at the API boundary.
 
 class UserProfile(BaseModel):
     username: str
     bio: str
 
 class Tweet(BaseModel):
+    tweet_id: Optional[str] = None  # missing from results saved before ids were recorded
     tweet_content: str
-    tweet_screenshot: str
+    tweet_date: str = ""
+    tweet_screenshot: str = ""
+    quoted_content: Optional[str] = None
+    quoted_username: Optional[str] = None
 
 class Retweet(BaseModel):
-    retweet_content: str
+    tweet_id: Optional[str] = None
+    retweet_content: str = ""
     retweet_username: str
-    retweet_profile_bio: str
-    retweet_screenshot: str
+    retweet_profile_bio: str = ""
     retweet_main_content: str
-
-class Like(BaseModel):
-    liked_tweet_content: str
-    liked_tweet_username: str
-    liked_tweet_profile_bio: str
-    liked_tweet_screenshot: str
-    liked_main_content: str
+    retweet_date: str = ""
+    retweet_screenshot: str = ""
 
 class Follower(BaseModel):
+    follower_username: Optional[str] = None
     follower_name: str
     follower_bio: str
 
 class Following(BaseModel):
+    following_username: Optional[str] = None
     following_name: str
     following_bio: str
 
+class IncrementalSummary(BaseModel):
+    known_ids: int
+    new_tweets: int
+    new_retweets: int
+
+class RateLimitSummary(BaseModel):
+    identity: str
+    requests: int
+    wait_seconds: float
+    max_wait_seconds: float
+    signals: int = 0
+    backoff_seconds: float = 0.0
+    breaker_open_until: Optional[float] = None
+    budget_exhausted_until: Optional[float] = None
+
+class AssetCacheSummary(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+    bytes_saved: int
+    bytes_fetched: int
+
+class PhaseTiming(BaseModel):
+    count: int
+    seconds: float
+    max_seconds: float
+
+class RunTimings(BaseModel):
+    total_seconds: float
+    phases: Dict[str, PhaseTiming] = {}
+    items: Dict[str, int] = {}
+    timeouts: Dict[str, int] = {}
+
+class RetainedTrace(BaseModel):
+    run_id: str
+    size: int
+    reasons: List[str] = []
+    url: str
+
+class ProfileSummary(BaseModel):
+    run_id: str
+    seconds: float
+    cpu_samples: int
+    browser_samples: int
+    files: Dict[str, str] = {}
+
+class RoundTripSection(BaseModel):
+    calls: int
+    seconds: float
+
+class RoundTripCallSite(BaseModel):
+    section: str
+    function: str
+    selector: str
+    method: str
+    calls: int
+    seconds: float
+
+class RoundTripReport(BaseModel):
+    total: int
+    seconds: float
+    per_item: Dict[str, float] = {}
+    sections: Dict[str, RoundTripSection] = {}
+    top: List[RoundTripCallSite] = []
+
 class TwitterScrapeResponse(BaseModel):
-    user_profile: UserProfile
-    tweets: List[Tweet]
-    retweets: List[Retweet]
-    likes: Optional[List[Like]] = []
-    following: Optional[List[Following]] = []
-    followers: Optional[List[Follower]] = [] 
\ No newline at end of file
+    run_id: Optional[str] = None
+    user_profile: Optional[UserProfile] = None
+    tweets: List[Tweet] = []
+    retweets: List[Retweet] = []
+    following: List[Following] = []
+    followers: List[Follower] = []
+    incremental: Optional[IncrementalSummary] = None
+    rate_limit: Optional[RateLimitSummary] = None
+    asset_cache: Optional[AssetCacheSummary] = None
+    timings: Optional[RunTimings] = None
+    round_trips: Optional[RoundTripReport] = None
+    trace: Optional[RetainedTrace] = None
+    profile: Optional[ProfileSummary] = None
+
+class ScrapeJobRequest(BaseModel):
+    username: str
+    max_tweets: Optional[int] = Field(None, ge=0)
+    max_retweets: Optional[int] = Field(None, ge=0)
+    max_followers: Optional[int] = Field(None, ge=0)
+    max_following: Optional[int] = Field(None, ge=0)
+    incremental: bool = False
+    profile: bool = False  # needs the X-Admin-Token header
+
+class ScrapeJob(BaseModel):
+    id: int
+    username: str
+    params: Dict = {}
+    status: str
+    attempts: int = 0
+    worker: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    not_before: Optional[float] = None
+    summary: Optional[Dict] = None
+    error: Optional[str] = None
+    result_url: Optional[str] = None
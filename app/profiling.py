@@ -0,0 +1,230 @@
+import os
+import sys
+import hmac
+import json
+import time
+import shutil
+import threading
+import tracemalloc
+import contextvars
+from collections import Counter
+from typing import Dict, List, Optional
+from app import storage
+
+# Configuration
+# Profiling is requested per scrape (?profile=1 or a job's "profile": true) and
+# only honoured for callers presenting SCRAPER_ADMIN_TOKEN; without a token it is off
+ADMIN_TOKEN = os.environ.get("SCRAPER_ADMIN_TOKEN") or None
+PROFILES_DIR = os.environ.get("SCRAPER_RUN_PROFILES_DIR", os.path.join(storage.DATA_DIR, 'run_profiles'))
+SAMPLE_INTERVAL = float(os.environ.get("SCRAPER_PROFILE_INTERVAL_MS", "10")) / 1000
+TRACEBACK_FRAMES = int(os.environ.get("SCRAPER_PROFILE_FRAMES", "16"))  # tracemalloc traceback depth
+MAX_PROFILES = int(os.environ.get("SCRAPER_PROFILE_KEEP", "50"))  # stored runs, oldest dropped first
+TOP_ALLOCATIONS = 50
+
+# Files stored per profiled run
+FILES = {
+    "cpu.folded": "text/plain",  # sampled Python stacks, flamegraph.pl / speedscope collapsed format
+    "memory.folded": "text/plain",  # bytes still allocated at the end of the run, by traceback
+    "memory_top.txt": "text/plain",  # tracemalloc's largest allocation sites
+    "browser.json": "application/json",  # Chromium Performance.getMetrics samples per page and phase
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS run_profiles (
+    run_id TEXT PRIMARY KEY,
+    job_id INTEGER,
+    username TEXT,
+    dir TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_run_profiles_job ON run_profiles(job_id);
+"""
+
+_schema_ready = set()
+
+def connect(db_path: str = None):
+    """Open the profile database, creating the profiling index on first use."""
+    conn = storage.connect(db_path)
+    if (db_path or storage.DB_PATH) not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(db_path or storage.DB_PATH)
+    return conn
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN and token and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()))
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval; wall-clock, so awaits show up as idle loop frames."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class RunProfile:
+    """CPU samples, Python allocations and Chromium metrics of one profiled scrape."""
+
+    def __init__(self, username: str):
+        self.username = username
+        self.started = time.time()
+        self.sampler = StackSampler(threading.get_ident())
+        self.started_tracemalloc = False
+        self.cdp_sessions: Dict[str, object] = {}
+        self.browser_samples: List[Dict] = []
+        self.finished = False
+
+    def start(self) -> "RunProfile":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+            self.started_tracemalloc = True
+        self.sampler.start()
+        return self
+
+    async def attach(self, context, page, name: str) -> None:
+        """Open a CDP session on a (raw, unwrapped) page so its Performance metrics can be sampled."""
+        session = await context.new_cdp_session(page)
+        await session.send("Performance.enable")
+        self.cdp_sessions[name] = session
+
+    async def sample_browser(self, label: str) -> None:
+        for name, session in list(self.cdp_sessions.items()):
+            try:
+                response = await session.send("Performance.getMetrics")
+            except Exception:
+                # The page was closed; its last sample is already recorded
+                self.cdp_sessions.pop(name, None)
+                continue
+            self.browser_samples.append({
+                "page": name, "label": label, "at": round(time.time() - self.started, 3),
+                "metrics": {metric["name"]: metric["value"] for metric in response.get("metrics", [])},
+            })
+
+    def stop(self) -> Dict[str, str]:
+        """Stop sampling and render the output files' contents."""
+        self.finished = True
+        self.sampler.stop()
+        files = {"cpu.folded": self.sampler.folded(), "browser.json": json.dumps(self.browser_samples, indent=2)}
+        if self.started_tracemalloc:
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ))
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            folded = []
+            for stat in snapshot.statistics("traceback"):
+                frames = ";".join(f"{os.path.basename(frame.filename)}:{frame.lineno}" for frame in stat.traceback)
+                folded.append(f"{frames} {stat.size}\n")
+            files["memory.folded"] = "".join(folded)
+            top = snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+            files["memory_top.txt"] = (f"traced: {current / 1e6:.1f} MB at the end, {peak / 1e6:.1f} MB peak\n\n"
+                                       + "".join(f"{stat}\n" for stat in top))
+        return files
+
+_current: contextvars.ContextVar[Optional[RunProfile]] = contextvars.ContextVar("profiling_run", default=None)
+_active_lock = threading.Lock()
+
+def start_run(username: str) -> Optional[RunProfile]:
+    """Start profiling the current task; None when another run in this process is already profiled."""
+    # tracemalloc and the thread sampler are process-wide, so profiled runs don't overlap
+    if not _active_lock.acquire(blocking=False):
+        return None
+    profile = RunProfile(username).start()
+    _current.set(profile)
+    return profile
+
+def current() -> Optional[RunProfile]:
+    # The variable outlives the run in the task that awaited it (a worker's job loop)
+    profile = _current.get()
+    return profile if profile is not None and not profile.finished else None
+
+async def attach(context, page, name: str) -> None:
+    profile = current()
+    if profile is not None:
+        try:
+            await profile.attach(context, page, name)
+        except Exception as e:
+            print(f"Could not open CDP session for profiling: {str(e)}")
+
+async def sample_browser(label: str) -> None:
+    profile = current()
+    if profile is not None:
+        await profile.sample_browser(label)
+
+def finish(profile: RunProfile, run_id: str, job_id: Optional[int] = None, db_path: str = None) -> Dict:
+    """Stop profiling, store the files under PROFILES_DIR/<run_id> and index them with the job."""
+    try:
+        files = profile.stop()
+    finally:
+        _active_lock.release()
+    directory = os.path.join(PROFILES_DIR, run_id)
+    os.makedirs(directory, exist_ok=True)
+    for name, content in files.items():
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(content)
+    summary = {
+        "run_id": run_id,
+        "seconds": round(time.time() - profile.started, 3),
+        "cpu_samples": profile.sampler.samples,
+        "browser_samples": len(profile.browser_samples),
+        "files": {name: f"/profiles/{run_id}/{name}" for name in files},
+    }
+    connect(db_path).close()
+    with storage.transaction(db_path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO run_profiles (run_id, job_id, username, dir, summary, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (run_id, job_id, profile.username, directory, json.dumps(summary), time.time()),
+        )
+        stale = conn.execute("SELECT run_id, dir FROM run_profiles ORDER BY created_at DESC LIMIT -1 OFFSET ?",
+                             (MAX_PROFILES,)).fetchall()
+        for row in stale:
+            conn.execute("DELETE FROM run_profiles WHERE run_id = ?", (row["run_id"],))
+    for row in stale:
+        shutil.rmtree(row["dir"], ignore_errors=True)
+    return summary
+
+def get_job_profiles(job_id: int, db_path: str = None) -> List[Dict]:
+    conn = connect(db_path)
+    try:
+        rows = conn.execute("SELECT * FROM run_profiles WHERE job_id = ? ORDER BY created_at DESC", (job_id,)).fetchall()
+    finally:
+        conn.close()
+    return [{**json.loads(row["summary"]), "username": row["username"], "created_at": row["created_at"]} for row in rows]
+
+def get_profile_file(run_id: str, name: str, db_path: str = None) -> Optional[str]:
+    if name not in FILES:
+        return None
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT dir FROM run_profiles WHERE run_id = ?", (run_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    path = os.path.join(row["dir"], name)
+    return path if os.path.exists(path) else None
@@ -0,0 +1,327 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+from app import storage
+
+# Configuration
+RATE = float(os.environ.get("SCRAPER_RATE", "1.0"))  # navigations/scrolls per second per identity
+BURST = float(os.environ.get("SCRAPER_BURST", "5"))  # requests allowed back to back after idling
+# Share buckets between worker processes through the profile database
+SHARED = os.environ.get("SCRAPER_RATE_SHARED", "0") == "1"
+DEFAULT_IDENTITY = "default"
+
+# Backoff and circuit breaker configuration
+BACKOFF_BASE = 5.0  # seconds before the first retry after a rate-limit signal
+BACKOFF_MAX = 120.0  # longest in-run backoff; anything longer opens the breaker
+BREAKER_THRESHOLD = 3  # signals in a row that open the breaker
+BREAKER_COOLDOWN = 300.0  # first open period; doubles each time it re-opens
+BREAKER_MAX_COOLDOWN = 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    identity TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS rate_breakers (
+    identity TEXT PRIMARY KEY,
+    failures INTEGER NOT NULL DEFAULT 0,
+    cooldown REAL NOT NULL DEFAULT 0,
+    open_until REAL NOT NULL DEFAULT 0,
+    reason TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+"""
+
+_schema_ready = set()
+
+def connect(db_path: str = None):
+    """Open the profile database, creating the rate-limit tables on first use."""
+    conn = storage.connect(db_path)
+    if (db_path or storage.DB_PATH) not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(db_path or storage.DB_PATH)
+    return conn
+
+class TokenBucket:
+    """In-process token bucket.
+
+    reserve() takes the tokens immediately, letting the balance go negative, and
+    returns how long the caller must wait before using them. Concurrent callers
+    therefore queue up in order without holding a lock while they sleep.
+    """
+
+    def __init__(self, rate: float = RATE, burst: float = BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= cost
+            return max(0.0, -self.tokens / self.rate)
+
+class SharedTokenBucket:
+    """Token bucket stored in SQLite, so every process scraping as one identity shares it."""
+
+    def __init__(self, identity: str, rate: float = RATE, burst: float = BURST, db_path: str = None):
+        self.identity = identity
+        self.rate = rate
+        self.burst = burst
+        self.db_path = db_path
+        connect(db_path).close()
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Blocking (SQLite write lock); async callers go through acquire(), which runs it in a thread."""
+        with storage.transaction(self.db_path) as conn:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE identity = ?", (self.identity,)).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row["tokens"] + (now - row["updated_at"]) * self.rate)
+            tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (identity, tokens, updated_at) VALUES (?, ?, ?)",
+                (self.identity, tokens, now),
+            )
+        return max(0.0, -tokens / self.rate)
+
+_buckets: Dict[str, object] = {}
+_budgets: Dict[str, tuple] = {}  # identity -> (rate, burst) overrides
+_buckets_lock = threading.Lock()
+
+def configure(identity: str, rate: float, burst: float) -> None:
+    """Give one identity its own rate and burst instead of the defaults."""
+    with _buckets_lock:
+        _budgets[identity] = (rate, burst)
+        bucket = _buckets.get(identity)
+        if bucket is not None:
+            bucket.rate, bucket.burst = rate, burst
+
+def get_bucket(identity: str):
+    """The bucket for an identity, created on first use."""
+    with _buckets_lock:
+        bucket = _buckets.get(identity)
+        if bucket is None:
+            rate, burst = _budgets.get(identity, (RATE, BURST))
+            bucket = SharedTokenBucket(identity, rate, burst) if SHARED else TokenBucket(rate, burst)
+            _buckets[identity] = bucket
+        return bucket
+
+def cookie_identity(cookies_file: str) -> str:
+    """Identity key for a cookie or storage-state file: the logged-in account id when present."""
+    try:
+        with open(cookies_file, "r") as f:
+            data = json.load(f)
+        cookies = data.get("cookies", []) if isinstance(data, dict) else data
+        for cookie in cookies:
+            if cookie.get("name") == "twid" and cookie.get("value"):
+                # twid looks like "u=1234567890" (sometimes URL-encoded)
+                return cookie["value"].replace("%3D", "=").strip('"')
+    except (OSError, ValueError, AttributeError):
+        pass
+    return os.path.splitext(os.path.basename(cookies_file))[0] or DEFAULT_IDENTITY
+
+def breaker_state(identity: str, db_path: str = None) -> Dict:
+    """Circuit breaker for an identity: closed, open (until open_until) or half_open.
+
+    Half-open means the open period has passed but the identity has not completed
+    a clean run since; the next run is the probe.
+    """
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT * FROM rate_breakers WHERE identity = ?", (identity,)).fetchone()
+    finally:
+        conn.close()
+    if row is None or (row["failures"] == 0 and row["open_until"] == 0):
+        return {"identity": identity, "state": "closed", "failures": 0, "open_until": None, "reason": ""}
+    if row["open_until"] > time.time():
+        state = "open"
+    elif row["open_until"] > 0:
+        state = "half_open"
+    else:
+        state = "closed"
+    return {
+        "identity": identity,
+        "state": state,
+        "failures": row["failures"],
+        "open_until": row["open_until"] or None,
+        "reason": row["reason"],
+    }
+
+def open_until(identity: str, db_path: str = None) -> Optional[float]:
+    """When the identity's breaker closes again, or None if requests may go ahead."""
+    state = breaker_state(identity, db_path)
+    return state["open_until"] if state["state"] == "open" else None
+
+def record_failure(identity: str, reason: str, reset_at: Optional[float] = None, db_path: str = None) -> Optional[float]:
+    """Count a rate-limit signal; returns open_until if it opened the breaker."""
+    now = time.time()
+    connect(db_path).close()
+    with storage.transaction(db_path) as conn:
+        row = conn.execute("SELECT * FROM rate_breakers WHERE identity = ?", (identity,)).fetchone()
+        failures = (row["failures"] if row else 0) + 1
+        cooldown = row["cooldown"] if row else 0.0
+        until = row["open_until"] if row else 0.0
+        probe_failed = row is not None and 0 < row["open_until"] <= now
+        long_reset = reset_at is not None and reset_at - now > BACKOFF_MAX
+        opened = None
+        if failures >= BREAKER_THRESHOLD or probe_failed or long_reset:
+            cooldown = min(BREAKER_MAX_COOLDOWN, cooldown * 2 if cooldown else BREAKER_COOLDOWN)
+            until = max(now + cooldown, reset_at or 0)
+            opened = until
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO rate_breakers (identity, failures, cooldown, open_until, reason, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (identity, failures, cooldown, until, reason, now),
+        )
+    return opened
+
+def record_success(identity: str, db_path: str = None) -> None:
+    """Close the breaker after a run that saw no rate-limit signals."""
+    connect(db_path).close()
+    with storage.transaction(db_path) as conn:
+        conn.execute("DELETE FROM rate_breakers WHERE identity = ?", (identity,))
+
+@dataclass
+class RunLimits:
+    """Rate-limit accounting for one scrape run."""
+    identity: str
+    acquired: int = 0
+    waited: float = 0.0
+    max_wait: float = 0.0
+    signals: int = 0  # rate-limit signals seen (429, exhausted quota, error pages)
+    backoffs: int = 0  # backoffs in a row; reset once a request goes through cleanly
+    backoff_waited: float = 0.0
+    tripped_until: Optional[float] = None  # set when the breaker opened during the run
+    pending: Optional[tuple] = None  # (reason, reset_at) waiting to be handled by acquire()
+    # Counts requests against the identity's hourly budget (blocking; run in a thread);
+    # returns when the budget frees up once it is used up
+    charge: Optional[Callable[[int], Optional[float]]] = None
+    charged: int = 0  # requests already counted through charge
+    budget_until: Optional[float] = None  # set when the hourly budget ran out during the run
+
+    def signal(self, reason: str, reset_at: Optional[float] = None) -> None:
+        """Note a rate-limit signal; safe to call from synchronous event handlers."""
+        self.signals += 1
+        if self.pending is None:
+            self.pending = (reason, reset_at)
+
+    @property
+    def tripped(self) -> bool:
+        """The run must stop: its breaker opened or its hourly budget ran out."""
+        return self.tripped_until is not None or self.budget_until is not None
+
+    def to_dict(self) -> Dict:
+        data = {
+            "identity": self.identity,
+            "requests": self.acquired,
+            "wait_seconds": round(self.waited, 3),
+            "max_wait_seconds": round(self.max_wait, 3),
+            "signals": self.signals,
+            "backoff_seconds": round(self.backoff_waited, 3),
+        }
+        if self.tripped_until is not None:
+            data["breaker_open_until"] = self.tripped_until
+        if self.budget_until is not None:
+            data["budget_exhausted_until"] = self.budget_until
+        return data
+
+# Set per scrape; asyncio tasks inherit it, so concurrent scrapes in one process stay separate
+_current_run: contextvars.ContextVar[Optional[RunLimits]] = contextvars.ContextVar("rate_limit_run", default=None)
+
+def start_run(identity: str, charge: Optional[Callable[[int], Optional[float]]] = None) -> RunLimits:
+    """Start accounting for a scrape run in the current context."""
+    run = RunLimits(identity=identity, charge=charge)
+    _current_run.set(run)
+    return run
+
+def current_run() -> Optional[RunLimits]:
+    return _current_run.get()
+
+def tripped() -> bool:
+    """True once the current run's identity has been cut off by its circuit breaker or hourly budget."""
+    run = _current_run.get()
+    return run is not None and run.tripped
+
+def observe_response(run: RunLimits, response) -> None:
+    """page.on("response") handler: turn 429s and exhausted quotas on X API calls into signals."""
+    try:
+        if "/i/api/" not in response.url:
+            return
+        headers = response.headers
+        reset = headers.get("x-rate-limit-reset")
+        reset_at = float(reset) if reset and reset.isdigit() else None
+        if response.status == 429:
+            run.signal("http_429", reset_at)
+        elif headers.get("x-rate-limit-remaining") == "0":
+            run.signal("quota_exhausted", reset_at)
+    except Exception:
+        pass
+
+async def backoff(run: RunLimits) -> None:
+    """Handle the run's pending signal: exponential backoff, or trip the breaker."""
+    reason, reset_at = run.pending
+    run.pending = None
+    run.backoffs += 1
+    # The breaker row is shared through SQLite; keep the loop (and page events) running meanwhile
+    opened = await asyncio.to_thread(record_failure, run.identity, reason, reset_at)
+    if opened is not None:
+        run.tripped_until = opened
+        print(f"Rate limited ({reason}) as {run.identity}; circuit open until {time.strftime('%H:%M:%S', time.localtime(opened))}")
+        return
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (run.backoffs - 1)) * random.uniform(0.8, 1.2)
+    if reset_at is not None:
+        # The server told us when the window resets; don't wait longer than that
+        delay = min(delay, max(0.0, reset_at - time.time()) + 1.0)
+    print(f"Rate limited ({reason}) as {run.identity}; backing off {delay:.1f}s")
+    run.backoff_waited += delay
+    await asyncio.sleep(delay)
+
+async def acquire(cost: float = 1.0) -> float:
+    """Wait for the current identity's budget to allow one more request; returns the seconds waited.
+
+    A pending rate-limit signal is handled first. Each request is charged to the
+    identity's hourly budget as it goes out. Once the breaker has tripped or the
+    budget is used up this returns immediately; callers stop their loops via tripped().
+    """
+    run = _current_run.get()
+    if run is not None:
+        if run.pending is not None and not run.tripped:
+            await backoff(run)
+        elif run.pending is None:
+            run.backoffs = 0
+        if run.tripped:
+            return 0.0
+    bucket = get_bucket(run.identity if run else DEFAULT_IDENTITY)
+    if isinstance(bucket, SharedTokenBucket):
+        # BEGIN IMMEDIATE may wait up to the busy timeout behind other workers; keep the loop (and page events) running
+        wait = await asyncio.to_thread(bucket.reserve, cost)
+    else:
+        wait = bucket.reserve(cost)
+    if wait > 0:
+        await asyncio.sleep(wait)
+    if run is not None:
+        run.acquired += 1
+        run.waited += wait
+        run.max_wait = max(run.max_wait, wait)
+        if run.charge is not None:
+            run.charged += 1
+            # This request still goes out; the ones after it wait for the next hour
+            run.budget_until = await asyncio.to_thread(run.charge, 1)
+            if run.budget_until is not None:
+                print(f"Hourly budget of {run.identity} used up; stopping until "
+                      f"{time.strftime('%H:%M:%S', time.localtime(run.budget_until))}")
+    return wait
@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# Compact record types used inside the scraping loops. Slotted dataclasses store
+# their fields in a fixed layout instead of a per-item dict with repeated long
+# keys; they are converted to the JSON shape only when a result is assembled.
+
+@dataclass(slots=True)
+class TweetRecord:
+    tweet_id: str
+    tweet_content: str
+    tweet_date: str
+    tweet_screenshot: str = ""
+    quoted_content: Optional[str] = None
+    quoted_username: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, str]:
+        data = {
+            "tweet_id": self.tweet_id,
+            "tweet_content": self.tweet_content,
+            "tweet_date": self.tweet_date,
+            "tweet_screenshot": self.tweet_screenshot,
+        }
+        if self.quoted_content is not None:
+            data["quoted_content"] = self.quoted_content
+            data["quoted_username"] = self.quoted_username or ""
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TweetRecord":
+        return cls(
+            tweet_id=data.get("tweet_id", ""),
+            tweet_content=data.get("tweet_content", ""),
+            tweet_date=data.get("tweet_date", ""),
+            tweet_screenshot=data.get("tweet_screenshot", ""),
+            quoted_content=data.get("quoted_content"),
+            quoted_username=data.get("quoted_username"),
+        )
+
+@dataclass(slots=True)
+class RetweetRecord:
+    tweet_id: str
+    retweet_username: str
+    retweet_main_content: str
+    retweet_date: str = ""
+    retweet_content: str = ""  # pure retweets have no additional content
+    retweet_profile_bio: str = ""  # bio fetching is disabled to prevent hanging
+    retweet_screenshot: str = ""
+
+    def to_dict(self) -> Dict[str, str]:
+        return {
+            "tweet_id": self.tweet_id,
+            "retweet_content": self.retweet_content,
+            "retweet_username": self.retweet_username,
+            "retweet_profile_bio": self.retweet_profile_bio,
+            "retweet_main_content": self.retweet_main_content,
+            "retweet_date": self.retweet_date,
+            "retweet_screenshot": self.retweet_screenshot,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RetweetRecord":
+        return cls(
+            tweet_id=data.get("tweet_id", ""),
+            retweet_username=data.get("retweet_username", ""),
+            retweet_main_content=data.get("retweet_main_content", ""),
+            retweet_date=data.get("retweet_date", ""),
+            retweet_content=data.get("retweet_content", ""),
+            retweet_profile_bio=data.get("retweet_profile_bio", ""),
+            retweet_screenshot=data.get("retweet_screenshot", ""),
+        )
+
+# user_type -> output keys for handle, display name and bio
+SOCIAL_KEYS = {
+    "followers": ("follower_username", "follower_name", "follower_bio"),
+    "following": ("following_username", "following_name", "following_bio"),
+}
+
+@dataclass(slots=True)
+class SocialUserRecord:
+    username: str
+    name: str
+    bio: str
+
+    def to_dict(self, user_type: str) -> Dict[str, str]:
+        handle_key, name_key, bio_key = SOCIAL_KEYS[user_type]
+        return {handle_key: self.username, name_key: self.name, bio_key: self.bio}
+
+    @classmethod
+    def from_dict(cls, data: Dict, user_type: str) -> "SocialUserRecord":
+        handle_key, name_key, bio_key = SOCIAL_KEYS[user_type]
+        return cls(username=data.get(handle_key, ""), name=data.get(name_key, ""), bio=data.get(bio_key, ""))
@@ -0,0 +1,59 @@
+import os
+import json
+from typing import Dict, List
+
+# Configuration
+# SCRAPER_RENDER_PROFILE: "low" hides media and avatars, turns off animation and
+# autoplay and uses a tall, narrow viewport so each scroll loads more tweets;
+# "full" renders like a desktop browser; "auto" (default) is low unless screenshots are on
+MODE = os.environ.get("SCRAPER_RENDER_PROFILE", "auto")
+FULL_VIEWPORT = {"width": 1920, "height": 1080}
+# X keeps its desktop markup down to about 700px; below that it switches to the mobile layout
+LOW_VIEWPORT = {"width": 720, "height": 3200}
+
+# Media stays in the DOM (the extractors never read it) but is neither painted nor laid out
+LOW_RENDER_CSS = """
+img, video, picture, canvas, svg image,
+[data-testid="tweetPhoto"], [data-testid="videoPlayer"], [data-testid="videoComponent"],
+[data-testid="card.wrapper"], [data-testid="Tweet-User-Avatar"], [data-testid^="UserAvatar-Container"] {
+    display: none !important;
+}
+[style*="background-image"] { background-image: none !important; }
+*, *::before, *::after {
+    animation: none !important;
+    transition: none !important;
+    scroll-behavior: auto !important;
+}
+"""
+
+# Runs before X's scripts in every frame: installs the stylesheet and pauses anything that starts playing
+INIT_SCRIPT = """
+(() => {
+    const css = %s;
+    const install = () => {
+        const style = document.createElement('style');
+        style.textContent = css;
+        (document.head || document.documentElement).appendChild(style);
+    };
+    if (document.documentElement) install();
+    else document.addEventListener('DOMContentLoaded', install, {once: true});
+    document.addEventListener('play', (event) => event.target.pause(), true);
+})();
+""" % json.dumps(LOW_RENDER_CSS)
+
+def is_low(screenshots: bool) -> bool:
+    return MODE == "low" or (MODE == "auto" and not screenshots)
+
+def launch_args(low: bool) -> List[str]:
+    if not low:
+        return []
+    # Images are never fetched or decoded; media never autoplays
+    return ['--blink-settings=imagesEnabled=false', '--autoplay-policy=user-gesture-required']
+
+def context_options(low: bool) -> Dict:
+    if not low:
+        return {"viewport": dict(FULL_VIEWPORT)}
+    return {"viewport": dict(LOW_VIEWPORT), "reduced_motion": "reduce"}
+
+async def apply(context) -> None:
+    await context.add_init_script(INIT_SCRIPT)
@@ -0,0 +1,190 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response, FileResponse
+
+# orjson and brotli are optional - fall back to the stdlib encoder and gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compression configuration
+MIN_COMPRESS_SIZE = 1024  # bytes - smaller bodies are sent as-is
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # good ratio on bio-heavy JSON without the cost of quality 11
+
+# Conditional GET configuration
+REVALIDATE = "no-cache"  # clients may cache but must revalidate (cheap 304s)
+IMMUTABLE_FILE = "public, max-age=86400"  # screenshot names carry a timestamp
+PRIVATE_FILE = "private, no-store"  # admin-only downloads must not land in shared caches
+ETAG_CHUNK_SIZE = 64 * 1024
+ETAG_CACHE_SIZE = 4096  # entries; screenshot names carry timestamps, so paths keep coming
+
+# path -> (mtime_ns, size, etag), least recently used first; hashes are only recomputed when a file changes
+_etag_cache: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+_etag_lock = threading.Lock()  # file_etag runs in the threadpool
+
+class FastJSONResponse(JSONResponse):
+    """Compact JSON response rendered with orjson when it is installed."""
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the content encoding the client prefers by q-value (br > gzip on ties)."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        pieces = part.strip().split(";")
+        name = pieces[0].strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in pieces[1:]:
+            param = param.strip()
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+
+    # Highest q wins; on a tie br beats gzip. Codings not listed take the q of "*"
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for name in candidates:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """Compress a response body with the given content encoding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+def negotiate_compression(request: Request, response: Response) -> Response:
+    """Compress an already-rendered response in place if the client supports it."""
+    response.headers["Vary"] = "Accept-Encoding"
+    body = response.body
+    if len(body) < MIN_COMPRESS_SIZE or "content-encoding" in response.headers:
+        return response
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if not encoding:
+        return response
+    response.body = compress_body(body, encoding)
+    response.headers["Content-Encoding"] = encoding
+    etag = response.headers.get("etag")
+    if etag:
+        # Each encoding is a different representation and needs its own strong ETag
+        response.headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+    response.headers["Content-Length"] = str(len(response.body))
+    return response
+
+def compressed_json_response(request: Request, content: Any, status_code: int = 200,
+                             headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize content with the fast encoder and compress it for the client."""
+    response = FastJSONResponse(content=content, status_code=status_code, headers=headers)
+    return negotiate_compression(request, response)
+
+def compressed_bytes_response(request: Request, body: bytes, media_type: str = "application/json",
+                              status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Wrap pre-serialized bytes (e.g. a stored JSON file) and compress them for the client."""
+    response = Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+    return negotiate_compression(request, response)
+
+def file_etag(path: str) -> Tuple[str, float]:
+    """Return a strong ETag (content hash) and mtime for a file, cached by mtime and size."""
+    stat = os.stat(path)
+    with _etag_lock:
+        cached = _etag_cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            _etag_cache.move_to_end(path)
+            return cached[2], stat.st_mtime
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(ETAG_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()}"'
+    with _etag_lock:
+        _etag_cache[path] = (stat.st_mtime_ns, stat.st_size, etag)
+        _etag_cache.move_to_end(path)
+        while len(_etag_cache) > ETAG_CACHE_SIZE:
+            _etag_cache.popitem(last=False)
+    return etag, stat.st_mtime
+
+def listing_etag(paths: Iterable[str], variant: str = "") -> Tuple[str, float]:
+    """Return an ETag and newest mtime for a set of files without reading them."""
+    digest = hashlib.sha1(variant.encode())
+    newest = 0.0
+    for path in paths:
+        stat = os.stat(path)
+        newest = max(newest, stat.st_mtime)
+        digest.update(f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    return f'"{digest.hexdigest()}"', newest
+
+def _strip_encoding_suffix(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for suffix in ('-gzip"', '-br"'):
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Evaluate If-None-Match (preferred) and If-Modified-Since against a resource."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return any(_strip_encoding_suffix(tag) == etag for tag in if_none_match.split(","))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return int(last_modified) <= int(since)
+    return False
+
+def validator_headers(etag: str, last_modified: float, cache_control: str = REVALIDATE) -> Dict[str, str]:
+    """Headers that let clients revalidate a resource with a conditional GET."""
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+
+def not_modified_response(etag: str, last_modified: float, cache_control: str = REVALIDATE) -> Response:
+    """Empty 304 response carrying the current validators."""
+    headers = validator_headers(etag, last_modified, cache_control)
+    headers["Vary"] = "Accept-Encoding"
+    return Response(status_code=304, headers=headers)
+
+def conditional_file_response(request: Request, path: str, media_type: str,
+                              cache_control: str = IMMUTABLE_FILE) -> Response:
+    """Serve a file from disk, answering 304 when the client copy is still fresh."""
+    etag, last_modified = file_etag(path)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified, cache_control)
+    return FileResponse(path, media_type=media_type, headers=validator_headers(etag, last_modified, cache_control))
@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import inspect
+from typing import Dict, List, Tuple
+from app import metrics
+
+# Locator-returning methods are lazy in Playwright and cost no round trip; only
+# coroutine methods (count, inner_text, get_attribute, evaluate, goto, ...) do.
+LOCATOR_FACTORIES = ("locator", "nth", "filter", "get_by_role", "get_by_text", "get_by_test_id",
+                     "get_by_label", "get_by_placeholder", "get_by_alt_text", "get_by_title")
+LOCATOR_PROPERTIES = ("first", "last")
+INPUT_DEVICES = ("keyboard", "mouse")
+TOP_CALL_SITES = 20  # call sites listed in the per-run report
+ENABLED = os.environ.get("SCRAPER_ROUND_TRIPS", "1") != "0"
+
+CallKey = Tuple[str, str, str, str]  # section, calling function, selector, method
+
+class RoundTrips:
+    """Counts and times every protocol call made through the wrapped pages of one run.
+
+    section is set by the scraper as it moves between phases, so calls can be
+    divided by the items each phase extracted.
+    """
+
+    def __init__(self):
+        self.section = "setup"
+        self.calls: Dict[CallKey, List[float]] = {}  # key -> [count, seconds]
+
+    def record(self, function: str, selector: str, method: str, seconds: float) -> None:
+        entry = self.calls.setdefault((self.section, function, selector, method), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def report(self, items: Dict[str, int]) -> Dict:
+        """Round trips per section and per extracted item, plus the busiest call sites."""
+        sections: Dict[str, List[float]] = {}
+        for (section, _, _, _), (count, seconds) in self.calls.items():
+            entry = sections.setdefault(section, [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+        per_item = {}
+        for section, (count, _) in sections.items():
+            # Retweets are extracted in the same pass as tweets
+            extracted = items.get(section, 0) + (items.get("retweets", 0) if section == "tweets" else 0)
+            if extracted:
+                per_item[section] = round(count / extracted, 2)
+        top = sorted(self.calls.items(), key=lambda kv: kv[1][0], reverse=True)[:TOP_CALL_SITES]
+        return {
+            "total": sum(count for count, _ in sections.values()),
+            "seconds": round(sum(seconds for _, seconds in sections.values()), 3),
+            "per_item": per_item,
+            "sections": {
+                section: {"calls": count, "seconds": round(seconds, 3)}
+                for section, (count, seconds) in sections.items()
+            },
+            "top": [
+                {"section": section, "function": function, "selector": selector, "method": method,
+                 "calls": count, "seconds": round(seconds, 3)}
+                for (section, function, selector, method), (count, seconds) in top
+            ],
+        }
+
+    def publish(self) -> None:
+        """Add this run's round trips to the process metrics."""
+        for (section, _, _, _), (count, _) in self.calls.items():
+            metrics.REGISTRY.inc("scraper_round_trips_total", count, section=section)
+
+class _Counting:
+    """Transparent proxy that times coroutine methods of a Playwright object."""
+
+    __slots__ = ("_target", "_calls", "_selector")
+
+    def __init__(self, target, calls: RoundTrips, selector: str):
+        self._target = target
+        self._calls = calls
+        self._selector = selector
+
+    def _wrap_locator(self, locator, selector: str) -> "CountingLocator":
+        return CountingLocator(locator, self._calls, selector)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if name in LOCATOR_PROPERTIES:
+            return self._wrap_locator(attr, f"{self._selector} >> {name}")
+        if name in INPUT_DEVICES:
+            return _Counting(attr, self._calls, name)
+        if name in LOCATOR_FACTORIES:
+            def factory(*args, **kwargs):
+                # Indexes are left out so every nth() of one selector shares a call site
+                detail = args[0] if args and name != "nth" else name
+                selector = f"{self._selector} >> {detail}" if self._selector else str(detail)
+                return self._wrap_locator(attr(*args, **kwargs), selector)
+            return factory
+        if inspect.iscoroutinefunction(attr):
+            def call(*args, **kwargs):
+                # The caller's frame is still on the stack here, even when the coroutine
+                # is later awaited inside asyncio.wait_for's task
+                caller = sys._getframe(1).f_code.co_name
+                return self._timed(caller, name, attr(*args, **kwargs))
+            return call
+        return attr
+
+    async def _timed(self, caller: str, method: str, coroutine):
+        started = time.perf_counter()
+        try:
+            result = await coroutine
+        finally:
+            self._calls.record(caller, self._selector or "page", method, time.perf_counter() - started)
+        if method == "all":
+            return [self._wrap_locator(locator, self._selector) for locator in result]
+        return result
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self._selector!r} of {self._target!r}>"
+
+class CountingPage(_Counting):
+    __slots__ = ()
+
+    def __init__(self, page, calls: RoundTrips):
+        super().__init__(page, calls, "")
+
+class CountingLocator(_Counting):
+    __slots__ = ()
+
+def wrap_page(page, calls: RoundTrips):
+    """A counting proxy for page, or the page itself when SCRAPER_ROUND_TRIPS=0."""
+    return CountingPage(page, calls) if ENABLED else page
+
+def unwrap(page):
+    """The Playwright page behind a counting proxy, for APIs that need the real object (CDP sessions)."""
+    return page._target if isinstance(page, _Counting) else page
@@ -5,26 +5,41 @@ import random
 import hashlib
 import time
 import glob
+import functools
 from typing import List, Dict, Optional, Tuple, Set
 from playwright.async_api import async_playwright, TimeoutError, Page
 from pathlib import Path
+from app import storage, snapshots, graph, search, ratelimit, identities, assetcache, metrics, roundtrips, events, har, tracing, profiling, containment, render
+from app.spill import SpillWriter, open_run
+from app.records import TweetRecord, RetweetRecord, SocialUserRecord
+from app.session import open_session
 
 # Configuration
 SCREENSHOTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'screenshots')
 os.makedirs(SCREENSHOTS_DIR, exist_ok=True)
+# Per-tweet screenshots are off by default: they can hang on slow pages, and with them
+# off the browser uses the low-render profile (app.render)
+SCREENSHOTS = os.environ.get("SCRAPER_SCREENSHOTS", "0") == "1"
 
-# Use relative path for cookies file
-COOKIES_FILE = os.path.join(os.path.dirname(__file__), 'twitter_cookies.json')
+# Site root; point at a local fixture (fake_x_server.py) for offline runs and benchmarks
+BASE_URL = os.environ.get("SCRAPER_BASE_URL", "https://twitter.com").rstrip("/")
+
+# Cookies come from the identity pool (app.identities); this single file is its fallback
+COOKIES_FILE = identities.FALLBACK_COOKIES_FILE
 
 # Bio cache to avoid refetching same user's bio - DISABLED (bio fetching disabled to prevent hanging)
 # bio_cache = {}
 
-# Rate limiting configuration
-SCROLL_DELAY = 1  # seconds between scrolls  
-REQUEST_DELAY = 0.5  # seconds between requests
+# Rate limiting configuration - request pacing comes from the per-identity token
+# bucket in app.ratelimit; these only give lazy-loaded content time to render
+SCROLL_DELAY = 1  # minimum seconds between scrolls
 MAX_RETRIES = 2
 TIMEOUT = 3000  # 3 seconds
 
+# Incremental re-scrape configuration
+INCREMENTAL_KNOWN_IDS = 500  # most recent stored status ids to compare against
+INCREMENTAL_STOP_RUN = 5  # consecutive already-known tweets that end the scroll
+
 async def safe_wait_for_selector(page: Page, selector: str, timeout: int = TIMEOUT, description: str = "element") -> bool:
     """Safely wait for a selector with proper error handling."""
     try:
@@ -35,9 +50,11 @@ async def safe_wait_for_selector(page: Page, selector: str, timeout: int = TIMEO
         return True
     except asyncio.TimeoutError:
         print(f"Timeout waiting for {description} (selector: {selector})")
+        metrics.count_timeout("wait_for_selector")
         return False
     except TimeoutError:
         print(f"Timeout waiting for {description} (selector: {selector})")
+        metrics.count_timeout("wait_for_selector")
         return False
     except Exception as e:
         print(f"Error waiting for {description}: {str(e)}")
@@ -50,6 +67,7 @@ async def safe_screenshot(element, path: str, description: str = "element") -> s
         return path
     except asyncio.TimeoutError:
         print(f"Screenshot timeout for {description}")
+        metrics.count_timeout("screenshot")
         return ""
     except Exception as e:
         print(f"Could not take screenshot for {description}: {str(e)}")
@@ -61,6 +79,7 @@ async def safe_operation(operation, timeout_seconds=10, description="operation")
         return await asyncio.wait_for(operation, timeout=timeout_seconds)
     except asyncio.TimeoutError:
         print(f"Operation timeout: {description}")
+        metrics.count_timeout("operation")
         return None
     except Exception as e:
         print(f"Operation error: {description} - {str(e)}")
@@ -76,9 +95,39 @@ async def safe_browser_close(browser):
     except Exception as e:
         print(f"Error closing browser: {str(e)}")
 
-async def rate_limit_delay(delay: float = REQUEST_DELAY) -> None:
-    """Add delay for rate limiting."""
-    await asyncio.sleep(delay)
+async def rate_limit_delay(settle: float = 0.0) -> None:
+    """Draw one request from the identity's rate budget.
+
+    Sleeps only as long as the shared bucket requires, topped up to settle seconds
+    when the caller also needs time for content to load.
+    """
+    waited = await ratelimit.acquire()
+    if waited < settle:
+        await asyncio.sleep(settle - waited)
+
+async def detect_error_page(page: Page) -> bool:
+    """Detect X's "Something went wrong" timeline state.
+
+    Reports it as a rate-limit signal for the current run (handled by the next
+    rate_limit_delay) and clicks Retry so the following scroll can load again.
+    """
+    try:
+        if await page.locator('div[data-testid="primaryColumn"] >> text=Something went wrong').count() == 0:
+            return False
+    except Exception:
+        return False
+    events.warning("error_page")
+    run = ratelimit.current_run()
+    if run:
+        run.signal("error_page")
+    try:
+        retry = page.locator('div[data-testid="primaryColumn"] button:has-text("Retry")')
+        if await retry.count() > 0:
+            await retry.first.click(timeout=2000)
+            metrics.count_retry("error_page")
+    except Exception:
+        pass
+    return True
 
 def generate_secure_tweet_id(tweet_element_html: str, fallback_content: str = "") -> str:
     """Generate a secure, unique tweet ID using hashing."""
@@ -159,8 +208,8 @@ async def scrape_user_profile(page: Page, username: str) -> Dict[str, str]:
     """Scrape user profile information with improved error handling."""
     try:
         print(f"Navigating to profile page for @{username}...")
-        await page.goto(f"https://twitter.com/{username}", wait_until="domcontentloaded", timeout=TIMEOUT)
         await rate_limit_delay()
+        await page.goto(f"{BASE_URL}/{username}", wait_until="domcontentloaded", timeout=TIMEOUT)
         
         if not await safe_wait_for_selector(page, 'div[data-testid="UserName"]', description="profile"):
             print(f"Could not load profile for @{username}")
@@ -225,7 +274,7 @@ async def get_tweet_content(tweet_element) -> str:
         if await content_element.count() > 0:
             return await content_element.inner_text()
     except Exception as e:
-        print(f"Could not get tweet text: {str(e)}")
+        events.debug("tweet_text_failed", error=str(e))
     return ""
 
 async def get_quoted_tweet_info(tweet_element) -> Optional[Dict[str, str]]:
@@ -241,7 +290,7 @@ async def get_quoted_tweet_info(tweet_element) -> Optional[Dict[str, str]]:
                 "quoted_username": quoted_username
             }
     except Exception as e:
-        print(f"Could not get quoted tweet info: {str(e)}")
+        events.debug("quoted_tweet_failed", error=str(e))
     return None
 
 async def get_main_tweet_content(tweet_element) -> str:
@@ -438,7 +487,7 @@ async def is_repost(tweet_element) -> bool:
                     social_text = await social_context.inner_text()
                     retweet_indicators = ["reposted", "retweeted", "retweet", "shared"]
                     if any(indicator in social_text.lower() for indicator in retweet_indicators):
-                        print(f"Found retweet via social context: {social_text}")
+                        events.debug("repost_detected", via="social_context", text=social_text)
                         return True
             except Exception:
                 continue
@@ -456,7 +505,7 @@ async def is_repost(tweet_element) -> bool:
             try:
                 element = tweet_element.locator(indicator)
                 if await element.count() > 0:
-                    print(f"Found retweet via indicator: {indicator}")
+                    events.debug("repost_detected", via="indicator", indicator=indicator)
                     return True
             except Exception:
                 continue
@@ -471,7 +520,7 @@ async def is_repost(tweet_element) -> bool:
                 ]
                 for phrase in retweet_phrases:
                     if phrase in article_text.lower():
-                        print(f"Found retweet via text pattern: {phrase}")
+                        events.debug("repost_detected", via="text_pattern", phrase=phrase)
                         return True
         except Exception:
             pass
@@ -487,16 +536,27 @@ async def is_repost(tweet_element) -> bool:
             for selector in nested_selectors:
                 nested_tweet = tweet_element.locator(selector)
                 if await nested_tweet.count() > 0:
-                    print("Found retweet via nested structure")
+                    events.debug("repost_detected", via="nested_structure")
                     return True
         except Exception:
             pass
 
     except Exception as e:
-        print(f"Error checking repost status: {str(e)}")
+        events.warning("repost_check_failed", error=str(e))
     
     return False
 
+async def is_pinned(tweet_element) -> bool:
+    """Check if tweet is the profile's pinned tweet (shown first regardless of age)."""
+    try:
+        social_context = tweet_element.locator('div[data-testid="socialContext"]').first
+        if await social_context.count() > 0:
+            social_text = await social_context.inner_text()
+            return "pinned" in social_text.lower()
+    except Exception:
+        pass
+    return False
+
 async def is_quote_tweet(tweet_element) -> bool:
     """Check if tweet is a quote tweet"""
     try:
@@ -556,12 +616,12 @@ async def get_retweet_info(tweet_element, page: Page) -> Optional[Dict[str, str]
                 if username:
                     break
             except (asyncio.TimeoutError, Exception) as e:
-                print(f"Timeout/error in username extraction with selector {selector}: {str(e)}")
+                events.debug("retweet_username_failed", selector=selector, error=str(e))
                 continue
 
         # NO BIO FETCHING - leave empty as requested
         bio = ""
-        print(f"Skipped bio fetching for @{username} (disabled to prevent hanging)")
+        events.debug("retweet_bio_skipped", username=username)
 
         return {
             "retweet_content": "",  # Pure retweets have no additional content
@@ -571,29 +631,44 @@ async def get_retweet_info(tweet_element, page: Page) -> Optional[Dict[str, str]
         }
 
     except Exception as e:
-        print(f"Could not get retweet info: {str(e)}")
+        events.warning("retweet_info_failed", error=str(e))
         return None
 
-async def scrape_tweets(page: Page, username: str, max_tweets: int = 100, max_retweets: int = 100) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
-    """Scrape tweets and retweets with improved efficiency and error handling."""
-    tweets = []
-    retweets = []
+async def scrape_tweets(page: Page, username: str, max_tweets: int = 100, max_retweets: int = 100,
+                        known_ids: Optional[Set[str]] = None, spill: Optional[SpillWriter] = None) -> Tuple[List[TweetRecord], List[RetweetRecord]]:
+    """Scrape tweets and retweets with improved efficiency and error handling.
+
+    If known_ids is given (incremental mode), known tweets are skipped and scrolling
+    stops after INCREMENTAL_STOP_RUN consecutive known tweets, ignoring pinned ones.
+    If spill is given, each item is appended to it as soon as it is extracted and
+    items recovered from an interrupted run are not extracted again.
+    """
+    tweets: List[TweetRecord] = [TweetRecord.from_dict(d) for d in spill.resumed_items("tweets")] if spill else []
+    retweets: List[RetweetRecord] = [RetweetRecord.from_dict(d) for d in spill.resumed_items("retweets")] if spill else []
     processed_ids: Set[str] = set()
+    if spill:
+        processed_ids |= spill.resumed_keys("tweets") | spill.resumed_keys("retweets")
+    known_run = 0
+    reached_known = False
+    scroll_timer = None
+    guard = None
     
     try:
-        print(f"\nStarting to scrape tweets for user: {username} (max {max_tweets} tweets, {max_retweets} retweets)")
+        events.info("tweets_started", username=username, max_tweets=max_tweets, max_retweets=max_retweets)
         
         # Clean up existing screenshots to prevent duplicates
         cleanup_existing_screenshots(username)
         
         # Navigate to profile
-        await page.goto(f"https://twitter.com/{username}", wait_until="domcontentloaded", timeout=TIMEOUT)
+        await rate_limit_delay()
+        await page.goto(f"{BASE_URL}/{username}", wait_until="domcontentloaded", timeout=TIMEOUT)
         
         if not await wait_for_profile_load(page, username):
-            print("Profile could not be loaded")
+            events.warning("profile_not_loaded", username=username)
             return tweets, retweets
 
-        print("Profile loaded successfully")
+        events.debug("profile_loaded", username=username)
+        guard = containment.PageGuard(page, "tweets", "status", lambda: rate_limit_delay(SCROLL_DELAY)) if containment.ENABLED else None
         
         # Scrolling variables
         last_height = await page.evaluate("document.body.scrollHeight")
@@ -602,27 +677,32 @@ async def scrape_tweets(page: Page, username: str, max_tweets: int = 100, max_re
         scroll_attempts = 0
         max_scroll_attempts = 50  # Restored from 10 to 50
 
-        while scroll_attempts < max_scroll_attempts:
+        while scroll_attempts < max_scroll_attempts and not ratelimit.tripped():
             scroll_attempts += 1
+            # One timing per scroll iteration, however it ends (continue, break or error)
+            if scroll_timer:
+                scroll_timer.done()
+            scroll_timer = metrics.phase("tweet_scroll")
             
             try:
-                # Wait for content to load
+                # Each scroll iteration is one request against the budget; wait for content to load
                 await rate_limit_delay(SCROLL_DELAY)
                 
                 # Get all visible tweets with timeout protection
                 try:
                     tweet_elements = await asyncio.wait_for(
-                        page.locator('article[data-testid="tweet"]').all(),
+                        page.locator(containment.LIVE_TWEET_SELECTOR).all(),
                         timeout=5
                     )
-                    print(f"[DEBUG] Found {len(tweet_elements)} tweet elements on scroll {scroll_attempts}")
+                    events.debug("tweet_elements", scroll=scroll_attempts, count=len(tweet_elements))
                 except (asyncio.TimeoutError, Exception) as e:
-                    print(f"[DEBUG] Timeout/error getting tweet elements on scroll {scroll_attempts}: {str(e)}")
+                    events.warning("tweet_elements_failed", scroll=scroll_attempts, error=str(e))
                     tweet_elements = []
                 
                 # If no tweets found, wait and try again before giving up
                 if not tweet_elements:
-                    print(f"No tweets found on attempt {scroll_attempts}, waiting and retrying...")
+                    events.info("no_tweets_retrying", scroll=scroll_attempts)
+                    metrics.count_retry("tweet_locate")
                     await asyncio.sleep(3)  # Wait longer
                     
                     # Try a different scroll method with timeout
@@ -635,20 +715,24 @@ async def scrape_tweets(page: Page, username: str, max_tweets: int = 100, max_re
                         
                         # Try again with timeout
                         tweet_elements = await asyncio.wait_for(
-                            page.locator('article[data-testid="tweet"]').all(),
+                            page.locator(containment.LIVE_TWEET_SELECTOR).all(),
                             timeout=5
                         )
-                        print(f"[DEBUG] After retry: Found {len(tweet_elements)} tweet elements")
+                        events.debug("tweet_elements", scroll=scroll_attempts, count=len(tweet_elements), retry=True)
                     except (asyncio.TimeoutError, Exception) as e:
-                        print(f"[DEBUG] Retry scroll/detection timeout: {str(e)}")
+                        events.warning("tweet_retry_failed", scroll=scroll_attempts, error=str(e))
+                        if isinstance(e, asyncio.TimeoutError):
+                            metrics.count_timeout("tweet_locate")
                         tweet_elements = []
                     
                     if not tweet_elements:
-                        print("Still no tweets found, but continuing...")
+                        if await detect_error_page(page):
+                            continue
+                        events.info("still_no_tweets", scroll=scroll_attempts)
                         no_new_items_count += 1
                         # Don't break here, continue to scroll more
                         if no_new_items_count >= max_no_new_items:
-                            print("Multiple attempts failed, ending tweets scraping")
+                            events.info("tweets_ended", reason="no_tweets")
                             break
                         continue
 
@@ -665,9 +749,27 @@ async def scrape_tweets(page: Page, username: str, max_tweets: int = 100, max_re
                             continue
                         
                         if tweet_id in processed_ids:
+                            if guard:
+                                guard.processed(tweet_id)
                             continue
                         
                         processed_ids.add(tweet_id)
+                        if guard:
+                            guard.processed(tweet_id)
+                        
+                        # Incremental mode: skip tweets we already have and stop at a run of them
+                        if known_ids:
+                            if tweet_id in known_ids:
+                                if await is_pinned(tweet):
+                                    continue
+                                known_run += 1
+                                if known_run >= INCREMENTAL_STOP_RUN:
+                                    events.info("tweets_ended", reason="known_tweets", known_run=known_run)
+                                    reached_known = True
+                                    break
+                                continue
+                            known_run = 0
+                        
                         processed_in_batch += 1
                         
                         # Check if it's a retweet (simplified)
@@ -676,148 +778,167 @@ async def scrape_tweets(page: Page, username: str, max_tweets: int = 100, max_re
                         if is_retweet:
                             # Check retweet limit
                             if len(retweets) >= max_retweets:
-                                print(f"Reached maximum retweets limit ({max_retweets}), skipping further retweets")
+                                events.debug("retweet_limit_reached", max_retweets=max_retweets)
                                 continue
                                 
-                            print(f"Processing retweet #{len(retweets)+1} (ID: {tweet_id})")
+                            events.debug("retweet_processing", n=len(retweets) + 1, tweet_id=tweet_id)
                             
                             # Get retweet date with timeout
                             try:
-                                print(f"Getting date for retweet {tweet_id}...")
                                 retweet_date = await asyncio.wait_for(
                                     get_tweet_date(tweet),
                                     timeout=3
                                 )
-                                print(f"Date extracted for retweet {tweet_id}: {retweet_date}")
+                                events.debug("retweet_date", tweet_id=tweet_id, date=retweet_date)
                             except asyncio.TimeoutError:
-                                print(f"Timeout getting date for retweet {tweet_id}")
+                                events.warning("retweet_date_timeout", tweet_id=tweet_id)
+                                metrics.count_timeout("tweet_date")
                                 retweet_date = "Unknown"
                             except Exception as e:
-                                print(f"Error getting date for retweet {tweet_id}: {str(e)}")
+                                events.warning("retweet_date_failed", tweet_id=tweet_id, error=str(e))
                                 retweet_date = "Unknown"
                             
-                            # Screenshot disabled to prevent hanging
-                            screenshot_filename = generate_unique_screenshot_filename(username, "retweet", len(retweets)+1)
-                            screenshot_path = os.path.join(SCREENSHOTS_DIR, screenshot_filename)
-                            # screenshot_path = await safe_screenshot(tweet, screenshot_path, "retweet")
-                            screenshot_path = ""  # Disabled to prevent hanging
-                            print(f"Screenshot disabled for retweet {tweet_id}")
+                            screenshot_path = ""
+                            if SCREENSHOTS:
+                                screenshot_filename = generate_unique_screenshot_filename(username, "retweet", len(retweets)+1)
+                                screenshot_path = await safe_screenshot(tweet, os.path.join(SCREENSHOTS_DIR, screenshot_filename), "retweet")
 
                             # Get retweet info with timeout and debugging
                             try:
-                                print(f"Getting retweet info for {tweet_id}...")
                                 retweet_info = await asyncio.wait_for(
                                     get_retweet_info(tweet, page),
                                     timeout=15  # Longer timeout as this includes bio fetching
                                 )
-                                print(f"Retweet info extracted for {tweet_id}")
+                                events.debug("retweet_info", tweet_id=tweet_id)
                             except asyncio.TimeoutError:
-                                print(f"Timeout getting retweet info for {tweet_id}")
+                                events.warning("retweet_info_timeout", tweet_id=tweet_id)
+                                metrics.count_timeout("retweet_info")
                                 retweet_info = None
                             except Exception as e:
-                                print(f"Error getting retweet info for {tweet_id}: {str(e)}")
+                                events.warning("retweet_info_failed", tweet_id=tweet_id, error=str(e))
                                 retweet_info = None
                             
                             if retweet_info:
-                                retweet_info["retweet_date"] = retweet_date
-                                retweet_info["retweet_screenshot"] = screenshot_path
-                                retweets.append(retweet_info)
-                                print(f"Successfully added retweet {len(retweets)} with date: {retweet_date}")
+                                record = RetweetRecord(
+                                    tweet_id=tweet_id,
+                                    retweet_username=retweet_info["retweet_username"],
+                                    retweet_main_content=retweet_info["retweet_main_content"],
+                                    retweet_date=retweet_date,
+                                    retweet_screenshot=screenshot_path
+                                )
+                                retweets.append(record)
+                                metrics.count_items("retweets", 1)
+                                if spill:
+                                    spill.append("retweets", record.to_dict())
+                                events.debug("retweet_added", n=len(retweets), tweet_id=tweet_id, date=retweet_date)
                             else:
-                                print(f"Could not extract retweet info for {tweet_id}")
+                                events.debug("retweet_info_missing", tweet_id=tweet_id)
                             continue
 
                         # Check tweet limit
                         if len(tweets) >= max_tweets:
-                            print(f"Reached maximum tweets limit ({max_tweets}), skipping further tweets")
+                            events.debug("tweet_limit_reached", max_tweets=max_tweets)
                             continue
 
                         # Process as regular tweet with simpler handling
-                        print(f"Processing tweet #{len(tweets)+1} (ID: {tweet_id})")
+                        events.debug("tweet_processing", n=len(tweets) + 1, tweet_id=tweet_id)
                         
                         # Get content with timeout protection
                         try:
-                            print(f"Getting content for tweet {tweet_id}...")
                             content = await asyncio.wait_for(
                                 get_main_tweet_content(tweet),
                                 timeout=5
                             )
-                            print(f"Content extracted for tweet {tweet_id}: {len(content) if content else 0} chars")
+                            events.debug("tweet_content", tweet_id=tweet_id, chars=len(content) if content else 0)
                         except asyncio.TimeoutError:
-                            print(f"Timeout getting content for tweet {tweet_id}")
+                            events.warning("tweet_content_timeout", tweet_id=tweet_id)
+                            metrics.count_timeout("tweet_content")
                             content = None
                         except Exception as e:
-                            print(f"Error getting content for tweet {tweet_id}: {str(e)}")
+                            events.warning("tweet_content_failed", tweet_id=tweet_id, error=str(e))
                             content = None
                         
                         if content:
                             # Get tweet date with timeout
                             try:
-                                print(f"Getting date for tweet {tweet_id}...")
                                 tweet_date = await asyncio.wait_for(
                                     get_tweet_date(tweet),
                                     timeout=3
                                 )
-                                print(f"Date extracted for tweet {tweet_id}: {tweet_date}")
+                                events.debug("tweet_date", tweet_id=tweet_id, date=tweet_date)
                             except asyncio.TimeoutError:
-                                print(f"Timeout getting date for tweet {tweet_id}")
+                                events.warning("tweet_date_timeout", tweet_id=tweet_id)
+                                metrics.count_timeout("tweet_date")
                                 tweet_date = "Unknown"
                             except Exception as e:
-                                print(f"Error getting date for tweet {tweet_id}: {str(e)}")
+                                events.warning("tweet_date_failed", tweet_id=tweet_id, error=str(e))
                                 tweet_date = "Unknown"
                             
-                            # Screenshot disabled to prevent hanging
-                            screenshot_filename = generate_unique_screenshot_filename(username, "tweet", len(tweets)+1)
-                            screenshot_path = os.path.join(SCREENSHOTS_DIR, screenshot_filename)
-                            # screenshot_path = await safe_screenshot(tweet, screenshot_path, "tweet")
-                            screenshot_path = ""  # Disabled to prevent hanging
-                            print(f"Screenshot disabled for tweet {tweet_id}")
-
-                            tweet_data = {
-                                "tweet_content": content,
-                                "tweet_date": tweet_date,
-                                "tweet_screenshot": screenshot_path
-                            }
+                            screenshot_path = ""
+                            if SCREENSHOTS:
+                                screenshot_filename = generate_unique_screenshot_filename(username, "tweet", len(tweets)+1)
+                                screenshot_path = await safe_screenshot(tweet, os.path.join(SCREENSHOTS_DIR, screenshot_filename), "tweet")
+
+                            record = TweetRecord(
+                                tweet_id=tweet_id,
+                                tweet_content=content,
+                                tweet_date=tweet_date,
+                                tweet_screenshot=screenshot_path
+                            )
 
                             # Check for quoted tweet
                             try:
                                 quoted_info = await get_quoted_tweet_info(tweet)
                                 if quoted_info:
-                                    tweet_data.update(quoted_info)
+                                    record.quoted_content = quoted_info["quoted_content"]
+                                    record.quoted_username = quoted_info["quoted_username"]
                             except Exception as e:
-                                print(f"Error getting quoted tweet info: {str(e)}")
+                                events.warning("quoted_tweet_failed", tweet_id=tweet_id, error=str(e))
 
-                            tweets.append(tweet_data)
-                            print(f"Successfully added tweet {len(tweets)} with date: {tweet_date}")
+                            tweets.append(record)
+                            metrics.count_items("tweets", 1)
+                            if spill:
+                                spill.append("tweets", record.to_dict())
+                            events.debug("tweet_added", n=len(tweets), tweet_id=tweet_id, date=tweet_date)
                         else:
                             # Handle tweets without detectable content
-                            print(f"Tweet {tweet_id} has no detectable content, skipping")
+                            events.debug("tweet_without_content", tweet_id=tweet_id)
 
                     except Exception as e:
-                        print(f"Error processing tweet element: {str(e)}")
+                        events.warning("tweet_element_failed", error=str(e))
                         continue
 
                 # Check progress
                 current_count = len(tweets) + len(retweets)
-                print(f"Batch {scroll_attempts}: Processed {processed_in_batch} new items. Total: {len(tweets)} tweets, {len(retweets)} retweets")
+                events.info("tweets_batch", scroll=scroll_attempts, new=processed_in_batch, tweets=len(tweets), retweets=len(retweets))
+                
+                if reached_known:
+                    break
                 
                 # Check if we've reached both limits
                 if len(tweets) >= max_tweets and len(retweets) >= max_retweets:
-                    print(f"Reached both limits: {len(tweets)} tweets (max: {max_tweets}), {len(retweets)} retweets (max: {max_retweets})")
+                    events.info("tweets_ended", reason="limits", tweets=len(tweets), retweets=len(retweets))
                     break
                 
                 if current_count == initial_count:
+                    if await detect_error_page(page):
+                        continue
                     no_new_items_count += 1
-                    print(f"No new items found (attempt {no_new_items_count}/{max_no_new_items})")
+                    events.debug("no_new_tweets", attempt=no_new_items_count, max=max_no_new_items)
                 else:
                     no_new_items_count = 0
 
                 if no_new_items_count >= max_no_new_items:
-                    print("Reached end of timeline (no new items)")
+                    events.info("tweets_ended", reason="end_of_timeline")
                     break
 
+                # Empty the cells just extracted; after a reload the new batch is already in view
+                if guard and await guard.after_batch():
+                    last_height = await page.evaluate("document.body.scrollHeight")
+                    continue
+
                 # Scroll down with multiple methods (with timeout protection)
-                print(f"Scrolling for more content... (attempt {scroll_attempts})")
+                events.debug("tweets_scroll", scroll=scroll_attempts)
                 
                 try:
                     # Try multiple scrolling approaches with timeouts
@@ -842,9 +963,9 @@ async def scrape_tweets(page: Page, username: str, max_tweets: int = 100, max_re
                         pass
                     
                 except (asyncio.TimeoutError, Exception) as e:
-                    print(f"Scroll operation timeout/error: {str(e)}")
-                
-                await rate_limit_delay(SCROLL_DELAY)
+                    events.warning("scroll_failed", error=str(e))
+                    if isinstance(e, asyncio.TimeoutError):
+                        metrics.count_timeout("scroll")
 
                 # Check if page height changed (with timeout)
                 try:
@@ -853,7 +974,9 @@ async def scrape_tweets(page: Page, username: str, max_tweets: int = 100, max_re
                         timeout=3
                     )
                 except (asyncio.TimeoutError, Exception) as e:
-                    print(f"Page height check timeout: {str(e)}")
+                    events.warning("height_check_failed", error=str(e))
+                    if isinstance(e, asyncio.TimeoutError):
+                        metrics.count_timeout("scroll")
                     new_height = last_height  # Assume no change
                 
                 if new_height == last_height:
@@ -869,70 +992,89 @@ async def scrape_tweets(page: Page, username: str, max_tweets: int = 100, max_re
                             timeout=3
                         )
                     except (asyncio.TimeoutError, Exception) as e:
-                        print(f"Aggressive scroll timeout: {str(e)}")
+                        events.warning("aggressive_scroll_failed", error=str(e))
+                        if isinstance(e, asyncio.TimeoutError):
+                            metrics.count_timeout("scroll")
                         new_height = last_height
                     
                     if new_height == last_height:
                         no_new_items_count += 1
-                        print("Page height unchanged, may have reached end")
+                        events.debug("height_unchanged")
                     else:
                         last_height = new_height
-                        print("Additional scroll worked, continuing...")
+                        events.debug("aggressive_scroll_worked")
                 else:
                     last_height = new_height
 
             except Exception as e:
-                print(f"Error during scroll {scroll_attempts}: {str(e)}")
+                events.warning("tweets_scroll_failed", scroll=scroll_attempts, error=str(e))
                 no_new_items_count += 1
 
             # Emergency break conditions
             if no_new_items_count >= max_no_new_items:
-                print("Stopping due to no new items")
+                events.info("tweets_ended", reason="no_new_items")
                 break
 
     except Exception as e:
-        print(f"Error scraping tweets: {str(e)}")
-
-    print(f"\nScraping completed after {scroll_attempts} scroll attempts!")
-    print(f"Final results: {len(tweets)} tweets and {len(retweets)} retweets")
+        events.error("tweets_failed", error=str(e))
+    finally:
+        if scroll_timer:
+            scroll_timer.done()
+
+    if guard:
+        events.info("memory_containment", section="tweets", **guard.summary())
+    events.info("tweets_done", scrolls=scroll_attempts, tweets=len(tweets), retweets=len(retweets))
     return tweets, retweets
 
 async def scrape_likes(page, username: str) -> List[Dict]:
     # Commented out for now as it needs further investigation
     return []
 
-async def scrape_social_users(page: Page, username: str, user_type: str, max_users: int = 300) -> List[Dict[str, str]]:
-    """Generic function to scrape followers or following with improved efficiency."""
-    users = []
+async def scrape_social_users(page: Page, username: str, user_type: str, max_users: int = 300,
+                              spill: Optional[SpillWriter] = None, ended: Optional[Dict[str, str]] = None) -> List[SocialUserRecord]:
+    """Generic function to scrape followers or following with improved efficiency.
+
+    If ended is given, the reason scrolling stopped is stored in it under user_type;
+    only storage.END_OF_LIST means the whole list was read.
+    """
+    users: List[SocialUserRecord] = [SocialUserRecord.from_dict(d, user_type) for d in spill.resumed_items(user_type)] if spill else []
+    reason = "error"
     try:
         # Navigate to the appropriate page
-        url = f"https://twitter.com/{username}/{user_type}"
-        print(f"Navigating to {url} (max: {max_users} users)")
-        await page.goto(url, wait_until="domcontentloaded", timeout=TIMEOUT)
+        url = f"{BASE_URL}/{username}/{user_type}"
+        events.info("social_started", user_type=user_type, url=url, max_users=max_users)
         await rate_limit_delay()
+        await page.goto(url, wait_until="domcontentloaded", timeout=TIMEOUT)
 
         # Wait for content to load
         if not await safe_wait_for_selector(page, 'div[data-testid="cellInnerDiv"]', timeout=3000, description=f"{user_type} cells"):
-            print(f"No {user_type} cells found")
+            events.warning("social_cells_missing", user_type=user_type)
+            reason = "no_cells"
             return users
 
         # Initialize tracking variables
-        processed_usernames: Set[str] = set()
+        processed_usernames: Set[str] = spill.resumed_keys(user_type) if spill else set()
+        guard = containment.PageGuard(page, user_type, "handle", rate_limit_delay) if containment.ENABLED else None
         no_new_users_count = 0
+        error_stalls = 0  # failed scrolls in the current run of batches without new users
         max_no_new_users = 5  # Increased to get more followers/following
         scroll_attempts = 0
         max_scroll_attempts = 30
 
-        while scroll_attempts < max_scroll_attempts:
+        while scroll_attempts < max_scroll_attempts and not ratelimit.tripped():
             scroll_attempts += 1
             try:
                 # Get all visible user cells
-                cells = await page.locator('div[data-testid="cellInnerDiv"]').all()
+                cells = await page.locator(containment.LIVE_CELL_SELECTOR).all()
                 
                 if not cells:
+                    if await detect_error_page(page):
+                        await rate_limit_delay()
+                        continue
                     no_new_users_count += 1
                     if no_new_users_count >= max_no_new_users:
-                        print(f"No more {user_type} cells found after multiple attempts")
+                        reason = "no_cells"
+                        events.info("social_ended", user_type=user_type, reason=reason)
                         break
                     await rate_limit_delay()
                     continue
@@ -945,14 +1087,19 @@ async def scrape_social_users(page: Page, username: str, user_type: str, max_use
                         # Extract username
                         cell_username = await extract_username_from_cell(cell)
                         if not cell_username or cell_username in processed_usernames:
+                            if guard and cell_username:
+                                # Also empties cells of users recovered from a spill file
+                                guard.processed(cell_username)
                             continue
                         
                         # Check if we've reached the user limit
                         if len(users) >= max_users:
-                            print(f"Reached maximum {user_type} limit ({max_users}), stopping collection")
+                            events.debug("social_limit_reached", user_type=user_type, max_users=max_users)
                             break
                             
                         processed_usernames.add(cell_username)
+                        if guard:
+                            guard.processed(cell_username)
                         processed_in_batch += 1
                         
                         # Extract display name
@@ -961,61 +1108,71 @@ async def scrape_social_users(page: Page, username: str, user_type: str, max_use
                         # Extract bio
                         bio = await extract_bio_from_cell(cell)
                         
-                        # Create user data based on type
-                        if user_type == "followers":
-                            user_data = {
-                                "follower_name": display_name or cell_username,
-                                "follower_bio": bio
-                            }
-                        else:  # following
-                            user_data = {
-                                "following_name": display_name or cell_username,
-                                "following_bio": bio
-                            }
-                        
-                        users.append(user_data)
-                        print(f"Added {user_type[:-1]} #{len(users)}: @{cell_username}" + (f" ({display_name})" if display_name else ""))
-                        
-                        if bio:
-                            print(f"  Bio: {bio[:50]}..." if len(bio) > 50 else f"  Bio: {bio}")
+                        record = SocialUserRecord(username=cell_username, name=display_name or cell_username, bio=bio)
+                        users.append(record)
+                        metrics.count_items(user_type, 1)
+                        if spill:
+                            spill.append(user_type, record.to_dict(user_type))
+                        events.debug("social_user_added", user_type=user_type, n=len(users), username=cell_username, name=display_name, bio=bio[:50])
                         
                     except Exception as e:
-                        print(f"Error processing {user_type} cell: {str(e)}")
+                        events.warning("social_cell_failed", user_type=user_type, error=str(e))
                         continue
 
                 # Check progress and limits
                 current_count = len(users)
-                print(f"Batch {scroll_attempts}: Processed {processed_in_batch} new {user_type}. Total: {current_count}")
+                events.info("social_batch", user_type=user_type, scroll=scroll_attempts, new=processed_in_batch, total=current_count)
                 
                 # Check if we've reached the user limit
                 if len(users) >= max_users:
-                    print(f"Reached maximum {user_type} limit ({max_users}), stopping")
+                    reason = "limit"
+                    events.info("social_ended", user_type=user_type, reason=reason)
                     break
                 
                 if current_count == initial_count:
+                    if await detect_error_page(page):
+                        await rate_limit_delay()
+                        continue
                     no_new_users_count += 1
-                    print(f"No new {user_type} found (attempt {no_new_users_count}/{max_no_new_users})")
+                    events.debug("no_new_users", user_type=user_type, attempt=no_new_users_count, max=max_no_new_users)
                 else:
                     no_new_users_count = 0
+                    error_stalls = 0
 
                 if no_new_users_count >= max_no_new_users:
-                    print(f"Reached end of {user_type} list")
+                    # Stalls caused by failed scrolls don't prove the list is over
+                    reason = storage.END_OF_LIST if not error_stalls else "stalled"
+                    events.info("social_ended", user_type=user_type, reason=reason)
                     break
 
+                if guard and await guard.after_batch():
+                    continue
+
                 # Scroll down
+                await rate_limit_delay()
                 await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                await rate_limit_delay(SCROLL_DELAY)
+                await asyncio.sleep(SCROLL_DELAY)
 
             except Exception as e:
-                print(f"Error during {user_type} scroll {scroll_attempts}: {str(e)}")
+                events.warning("social_scroll_failed", user_type=user_type, scroll=scroll_attempts, error=str(e))
                 no_new_users_count += 1
-
-        print(f"Total {user_type} collected: {len(users)}")
+                error_stalls += 1
+        else:
+            reason = "rate_limited" if ratelimit.tripped() else "scroll_limit"
+            events.info("social_ended", user_type=user_type, reason=reason)
+
+        if guard:
+            events.info("memory_containment", section=user_type, **guard.summary())
+        events.info("social_done", user_type=user_type, total=len(users))
         return users
 
     except Exception as e:
-        print(f"Error scraping {user_type}: {str(e)}")
+        events.error("social_failed", user_type=user_type, error=str(e))
+        reason = "error"
         return users
+    finally:
+        if ended is not None:
+            ended[user_type] = reason
 
 async def extract_username_from_cell(cell) -> str:
     """Extract username from a user cell."""
@@ -1094,13 +1251,15 @@ async def extract_bio_from_cell(cell) -> str:
     
     return ""
 
-async def scrape_followers(page: Page, username: str, max_followers: int = 300) -> List[Dict[str, str]]:
+async def scrape_followers(page: Page, username: str, max_followers: int = 300, spill: Optional[SpillWriter] = None,
+                           ended: Optional[Dict[str, str]] = None) -> List[SocialUserRecord]:
     """Scrape followers using the generic social scraping function."""
-    return await scrape_social_users(page, username, "followers", max_followers)
+    return await scrape_social_users(page, username, "followers", max_followers, spill=spill, ended=ended)
 
-async def scrape_following(page: Page, username: str, max_following: int = 300) -> List[Dict[str, str]]:
+async def scrape_following(page: Page, username: str, max_following: int = 300, spill: Optional[SpillWriter] = None,
+                           ended: Optional[Dict[str, str]] = None) -> List[SocialUserRecord]:
     """Scrape following using the generic social scraping function."""
-    return await scrape_social_users(page, username, "following", max_following)
+    return await scrape_social_users(page, username, "following", max_following, spill=spill, ended=ended)
 
 async def scrape_retweets(page, username: str, max_retweets: int = 100) -> List[Dict]:
     retweets = []
@@ -1108,7 +1267,8 @@ async def scrape_retweets(page, username: str, max_retweets: int = 100) -> List[
         print(f"Starting to scrape retweets for {username} (max: {max_retweets})")
         # Navigate to profile with better error handling
         try:
-            await page.goto(f"https://twitter.com/{username}", wait_until="domcontentloaded", timeout=30000)
+            await rate_limit_delay()
+            await page.goto(f"{BASE_URL}/{username}", wait_until="domcontentloaded", timeout=30000)
             if not await wait_for_profile_load(page, username):
                 return retweets
                 
@@ -1239,12 +1399,105 @@ async def scrape_retweets(page, username: str, max_retweets: int = 100) -> List[
     print(f"Total retweets scraped: {len(retweets)}")
     return retweets
 
-async def scrape_twitter(username: str, max_tweets: int = 100, max_retweets: int = 100, max_followers: int = 1000, max_following: int = 1000) -> Dict:
+async def scrape_twitter(username: str, max_tweets: int = 100, max_retweets: int = 100, max_followers: int = 1000, max_following: int = 1000,
+                         incremental: bool = False, profile: bool = False) -> Dict:
+    if not profile:
+        return await _scrape_twitter(username, max_tweets, max_retweets, max_followers, max_following, incremental)
+    # CPU samples, Python allocations and Chromium metrics, stored with the run (callers check admin rights)
+    run_profile = profiling.start_run(username)
+    if run_profile is None:
+        print("Another run in this process is being profiled, scraping without profiling")
+        return await _scrape_twitter(username, max_tweets, max_retweets, max_followers, max_following, incremental)
+    result = None
+    try:
+        result = await _scrape_twitter(username, max_tweets, max_retweets, max_followers, max_following, incremental)
+    finally:
+        run_log = events.current_run()
+        try:
+            summary = await asyncio.to_thread(profiling.finish, run_profile, run_log.run_id, run_log.job_id)
+            print(f"Profile stored: {', '.join(summary['files'].values())}")
+            if result is not None:
+                result["profile"] = summary
+        except Exception as e:
+            print(f"Error storing profile: {str(e)}")
+    return result
+
+async def _scrape_twitter(username: str, max_tweets: int, max_retweets: int, max_followers: int, max_following: int,
+                          incremental: bool) -> Dict:
     result = {
         "user_profile": {"username": username, "bio": ""},
         "following": [],
-        "followers": []
+        "followers": [],
+        # Why each follower/following scroll stopped; only complete lists replace stored ones
+        "ended": {},
     }
+    timings = metrics.start_run()
+    calls = roundtrips.RoundTrips()
+    run_log = events.start_run(username)
+
+    # Every extracted item is spilled to disk so a crashed run can be read and resumed
+    spill = None
+    try:
+        spill = open_run(username)
+    except Exception as e:
+        print(f"Could not open spill file, keeping results in memory only: {str(e)}")
+    try:
+        await _scrape_run(result, timings, calls, run_log, spill, username, max_tweets, max_retweets, max_followers,
+                          max_following, incremental)
+    finally:
+        if spill:
+            # Kept spills become resumable by the next run for this user
+            spill.release()
+        # Every exit, including logged-out and navigation failures, keeps its run id, timings and events
+        _finish_run(result, timings, calls, run_log, username)
+    return result
+
+async def _scrape_run(result: Dict, timings: metrics.RunTimings, calls: roundtrips.RoundTrips, run_log: events.RunLog,
+                      spill: Optional[SpillWriter], username: str, max_tweets: int, max_retweets: int, max_followers: int, max_following: int,
+                      incremental: bool) -> None:
+    """One scrape, filling result in place; it returns early when the session or profile is unusable."""
+    # Incremental mode compares against the newest stored status ids
+    known_ids: Set[str] = set()
+    if incremental:
+        try:
+            known_ids = storage.get_known_status_ids(username, INCREMENTAL_KNOWN_IDS)
+            print(f"Incremental mode: {len(known_ids)} known status ids for @{username}")
+        except Exception as e:
+            print(f"Could not load known status ids, doing a full scrape: {str(e)}")
+    
+    # Lease a cookie identity from the pool; navigations and scrolls draw from its budget
+    holder = f"{os.getpid()}:{username}"
+    lease = identities.acquire(holder=holder)
+    state, blocked_until = ("available", None) if lease else identities.availability()
+    if state == "busy":
+        # Busy identities free up when a running scrape ends; wait briefly for a slot
+        deadline = time.monotonic() + identities.BUSY_WAIT
+        while lease is None and state == "busy" and time.monotonic() < deadline:
+            await asyncio.sleep(1)
+            lease = identities.acquire(holder=holder)
+            if lease is None:
+                state, blocked_until = identities.availability()
+    if lease is None:
+        if state == "unusable":
+            raise RuntimeError("No usable cookie identity; run login_manual.py to add one")
+        if state == "busy":
+            metrics.count_run("identity_busy")
+            raise identities.IdentitiesBusy(f"Every cookie identity is running {identities.MAX_CONCURRENT} scrapes")
+        # Don't spend a browser launch while every identity is rate limited or cooling down
+        print(f"No identity available until {time.strftime('%H:%M:%S', time.localtime(blocked_until))}, not scraping")
+        limits = ratelimit.start_run(ratelimit.DEFAULT_IDENTITY)
+        limits.tripped_until = blocked_until
+        result["rate_limit"] = limits.to_dict()
+        metrics.count_run("no_identity")
+        return
+    limits = ratelimit.start_run(lease.identity.key, charge=functools.partial(identities.charge, lease.identity))
+    print(f"Scraping as identity {lease.identity.name}")
+    events.info("run_started", username=username, identity=lease.identity.name, incremental=incremental)
+    run_error: Optional[str] = None
+    logged_out = False
+    session = None
+    asset_cache = None
+    run_trace = None
     
     try:
         async with async_playwright() as p:
@@ -1260,50 +1513,78 @@ async def scrape_twitter(username: str, max_tweets: int = 100, max_retweets: int
             ]
             # Remove empty strings
             launch_args = [arg for arg in launch_args if arg]
+            low_render = render.is_low(SCREENSHOTS)
+            launch_args += render.launch_args(low_render)
             
             print(f"🖥️  Display available: {has_display} (DISPLAY={os.environ.get('DISPLAY', 'None')})")
             print(f"🚀 Browser args: {launch_args}")
+            print(f"Render profile: {'low' if low_render else 'full'}")
             
-            browser = await p.chromium.launch(
-                headless=not has_display,  # Headless if no display, headed if display available
-                args=launch_args
-            )
-            
-            # Create context with larger viewport and modern user agent
-            context = await browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
-            )
-            
-            # Load cookies
-            if os.path.exists(COOKIES_FILE):
+            # Launch with the leased identity's session (storage state, persistent profile or cookies)
+            session = open_session(lease.identity)
+            har_record, har_replay = har.record_path(username), har.replay_path(username)
+            try:
+                with metrics.phase("browser_launch"):
+                    browser, context = await session.open(
+                        p,
+                        launch_options={
+                            "headless": not has_display,  # Headless if no display, headed if display available
+                            "args": launch_args,
+                        },
+                        # Viewport (and reduced motion) from the render profile, modern user agent
+                        context_options={
+                            **render.context_options(low_render),
+                            "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+                            **(har.record_options(har_record) if har_record else {}),
+                        },
+                    )
+                print(f"Session for {lease.identity.name} loaded ({session.mode})")
+                if low_render:
+                    await render.apply(context)
+                if har_replay:
+                    await har.replay(context, har_replay)
+                    print(f"Replaying network traffic from {har_replay}")
+            except Exception as e:
+                print(f"Error loading session from {lease.identity.path}: {str(e)}")
+                run_error = "session_unreadable"
+                if session.browser is not None:
+                    await safe_browser_close(session.browser)
+                return
+
+            if assetcache.ENABLED and not (har_record or har_replay):
+                # Serve X's static bundles from the shared disk cache (recordings keep the real traffic)
                 try:
-                    with open(COOKIES_FILE, "r") as f:
-                        cookies = json.load(f)
-                    await context.add_cookies(cookies)
-                    print("Cookies loaded successfully")
+                    asset_cache = await assetcache.AssetCache().install(context)
                 except Exception as e:
-                    print(f"Error loading cookies: {str(e)}")
-                    await browser.close()
-                    return result
-            else:
-                print("No cookies file found. Please run login_manual.py first")
-                await browser.close()
-                return result
+                    print(f"Asset cache unavailable, fetching assets from the network: {str(e)}")
+
+            if tracing.ENABLED:
+                # Recorded for every run, kept only if the run turns out slow, failing or empty
+                try:
+                    run_trace = tracing.RunTrace(run_log.run_id, username, run_log.job_id)
+                    await run_trace.start(context)
+                except Exception as e:
+                    print(f"Could not start tracing: {str(e)}")
+                    run_trace = None
             
             try:
                 # Create main page for profile info
-                page = await context.new_page()
+                raw_page = await context.new_page()
+                await profiling.attach(context, raw_page, "profile")
+                page = roundtrips.wrap_page(raw_page, calls)
                 page.set_default_timeout(30000)  # Set back to 30 seconds
+                page.on("response", lambda response: ratelimit.observe_response(limits, response))
                 
                 # First try to access Twitter directly
                 print("\nAccessing Twitter...")
+                login_timer = metrics.phase("login_check")
+                calls.section = "login_check"
                 try:
-                    await page.goto("https://twitter.com", wait_until="domcontentloaded")
+                    await rate_limit_delay()
+                    await page.goto(BASE_URL, wait_until="domcontentloaded")
                 except Exception as e:
                     print(f"Error accessing Twitter: {str(e)}")
-                    await browser.close()
-                    return result
+                    return
 
                 # Short wait for initial load
                 await asyncio.sleep(1)
@@ -1321,8 +1602,8 @@ async def scrape_twitter(username: str, max_tweets: int = 100, max_retweets: int
                         login_button = page.locator('a[href="/login"]')
                         if await login_button.count() > 0:
                             print("Not logged in (login button found). Please run login_manual.py again.")
-                            await browser.close()
-                            return result
+                            logged_out = True
+                            return
                     except Exception as e:
                         print(f"Could not check for login button: {str(e)}")
                     
@@ -1331,8 +1612,8 @@ async def scrape_twitter(username: str, max_tweets: int = 100, max_retweets: int
                         signup_button = page.locator('a[href="/i/flow/signup"]')
                         if await signup_button.count() > 0:
                             print("Not logged in (signup button found). Please run login_manual.py again.")
-                            await browser.close()
-                            return result
+                            logged_out = True
+                            return
                     except Exception as e:
                         print(f"Could not check for signup button: {str(e)}")
                     
@@ -1379,7 +1660,7 @@ async def scrape_twitter(username: str, max_tweets: int = 100, max_retweets: int
                     if not login_verified:
                         try:
                             current_url = page.url
-                            if "twitter.com/home" in current_url or "x.com/home" in current_url:
+                            if "twitter.com/home" in current_url or "x.com/home" in current_url or current_url.startswith(f"{BASE_URL}/home"):
                                 print("Login verified - on home page")
                                 login_verified = True
                         except Exception as e:
@@ -1397,16 +1678,19 @@ async def scrape_twitter(username: str, max_tweets: int = 100, max_retweets: int
                     print(f"Error during login verification: {str(e)}")
                     print("Attempting to continue anyway...")
                     # Don't return here, continue with scraping attempt
+                login_timer.done()
 
                 # Navigate directly to user's profile
                 print(f"\nNavigating to profile @{username}...")
+                navigation_timer = metrics.phase("profile_navigation")
+                calls.section = "profile_navigation"
                 try:
-                    await page.goto(f"https://twitter.com/{username}", wait_until="domcontentloaded")
+                    await rate_limit_delay()
+                    await page.goto(f"{BASE_URL}/{username}", wait_until="domcontentloaded")
                     await asyncio.sleep(1)
                 except Exception as e:
                     print(f"Error navigating to profile: {str(e)}")
-                    await browser.close()
-                    return result
+                    return
                 
                 # Verify profile exists and is accessible
                 try:
@@ -1422,8 +1706,7 @@ async def scrape_twitter(username: str, max_tweets: int = 100, max_retweets: int
                         if await error_element.count() > 0:
                             error_text = await error_element.inner_text()
                             print(f"Profile error: {error_text}")
-                            await browser.close()
-                            return result
+                            return
                             
                     # Verify profile content is visible with retry logic
                     profile_accessed = False
@@ -1452,10 +1735,12 @@ async def scrape_twitter(username: str, max_tweets: int = 100, max_retweets: int
                             else:
                                 if attempt < 2:  # Not the last attempt
                                     print(f"Profile detection attempt {attempt + 1}/3 failed, retrying...")
+                                    metrics.count_retry("profile_detection")
                                     await asyncio.sleep(2)
                         except Exception as e:
                             if attempt < 2:
                                 print(f"Profile verification attempt {attempt + 1}/3 failed: {e}, retrying...")
+                                metrics.count_retry("profile_detection")
                                 await asyncio.sleep(2)
                     
                     if not profile_accessed:
@@ -1464,86 +1749,221 @@ async def scrape_twitter(username: str, max_tweets: int = 100, max_retweets: int
                         
                 except Exception as e:
                     print(f"Error verifying profile: {str(e)}")
-                    await browser.close()
-                    return result
+                    return
+                navigation_timer.done()
 
                 # Get profile info
                 print(f"Fetching profile info for @{username}...")
-                result["user_profile"] = await scrape_user_profile(page, username)
+                calls.section = "user_profile"
+                with metrics.phase("user_profile"):
+                    result["user_profile"] = await scrape_user_profile(page, username)
                 print(f"Profile info fetched: {result['user_profile']}")
+                if spill:
+                    spill.append("user_profile", result["user_profile"])
                 
                 if not result["user_profile"]["bio"] and not result["user_profile"]["username"]:
                     print(f"Could not fetch profile info for @{username}")
-                    await browser.close()
-                    return result
+                    return
                 
                 # Get tweets and retweets
                 print(f"\nFetching tweets and retweets for @{username}...")
-                tweets, retweets = await scrape_tweets(page, username, max_tweets, max_retweets)
+                calls.section = "tweets"
+                with metrics.phase("tweets"):
+                    tweets, retweets = await scrape_tweets(page, username, max_tweets, max_retweets, known_ids=known_ids, spill=spill)
                 if tweets:
-                    result["tweets"] = tweets
+                    result["tweets"] = [t.to_dict() for t in tweets]
                     print(f"Found {len(tweets)} tweets")
                 else:
                     print("No tweets found or error occurred")
                     
                 if retweets:
-                    result["retweets"] = retweets
+                    result["retweets"] = [r.to_dict() for r in retweets]
                     print(f"Found {len(retweets)} retweets")
                 else:
                     print("No retweets found or error occurred")
+                await profiling.sample_browser("tweets")
                 
                 # Create a new page for social data (followers/following)
-                social_page = await context.new_page()
+                raw_social_page = await context.new_page()
+                await profiling.attach(context, raw_social_page, "social")
+                social_page = roundtrips.wrap_page(raw_social_page, calls)
                 social_page.set_default_timeout(30000)
+                social_page.on("response", lambda response: ratelimit.observe_response(limits, response))
                 
                 # Get followers first
                 print(f"\nFetching followers for @{username}...")
-                followers = await scrape_followers(social_page, username, max_followers)
+                calls.section = "followers"
+                with metrics.phase("followers"):
+                    followers = await scrape_followers(social_page, username, max_followers, spill=spill, ended=result["ended"]) if max_followers > 0 else []
                 if followers:
-                    result["followers"] = followers
+                    result["followers"] = [u.to_dict("followers") for u in followers]
                     print(f"Found {len(followers)} followers")
                 else:
                     print("No followers found or error occurred")
+                await profiling.sample_browser("followers")
                 
                 # Small delay between operations
                 await asyncio.sleep(1)
                 
                 # Get following
                 print(f"\nFetching following for @{username}...")
-                following = await scrape_following(social_page, username, max_following)
+                calls.section = "following"
+                with metrics.phase("following"):
+                    following = await scrape_following(social_page, username, max_following, spill=spill, ended=result["ended"]) if max_following > 0 else []
                 if following:
-                    result["following"] = following
+                    result["following"] = [u.to_dict("following") for u in following]
                     print(f"Found {len(following)} following")
                 else:
                     print("No following found or error occurred")
+                await profiling.sample_browser("following")
                 
                 await social_page.close()
                 
                 # Scraping completed
                 print("\nScraping completed successfully!")
+
+                # Keep refreshed cookies and localStorage for the next run
+                try:
+                    if await session.save():
+                        print(f"Session state saved to {lease.identity.path}")
+                except Exception as e:
+                    print(f"Could not save session state: {str(e)}")
                 
             except Exception as e:
                 print(f"Error during scraping: {str(e)}")
+                run_error = str(e)
             finally:
+                # Early exits return from here too: the trace must be saved before the browser closes
+                if run_trace is not None:
+                    await safe_operation(run_trace.stop(context), timeout_seconds=60, description="saving trace")
+                if har_record:
+                    # The HAR is only written when its context closes
+                    await safe_operation(context.close(), timeout_seconds=60, description="saving HAR")
                 print("\nClosing browser...")
                 await safe_browser_close(browser)
+                if har_record:
+                    try:
+                        redacted = await asyncio.to_thread(har.scrub, har_record)
+                        print(f"Network traffic saved to {har_record} ({redacted} secrets redacted)")
+                    except Exception as e:
+                        # Never leave an unscrubbed recording of the session's cookies behind
+                        print(f"Error scrubbing HAR {har_record}, deleting it: {str(e)}")
+                        if os.path.exists(har_record):
+                            os.remove(har_record)
                     
     except Exception as e:
         print(f"Critical error: {str(e)}")
+        run_error = str(e)
+    finally:
+        if spill:
+            spill.close()
+        if session is not None:
+            session.close()
+        try:
+            if logged_out:
+                run_error = "logged_out"
+            elif limits.tripped_until is not None:
+                run_error = "rate_limited"
+            await asyncio.to_thread(identities.release, lease, limits.acquired, error=run_error,
+                                    logged_out=logged_out, charged=limits.charged)
+        except Exception as e:
+            print(f"Error releasing identity {lease.identity.name}: {str(e)}")
+        # Free-form errors are collapsed so the outcome label stays low-cardinality
+        metrics.count_run(run_error if run_error in ("logged_out", "rate_limited", "session_unreadable")
+                          else "error" if run_error
+                          else "budget_exhausted" if limits.budget_until is not None else "ok")
+        if run_trace is not None:
+            try:
+                reasons = tracing.retain_reasons(result, time.perf_counter() - timings.started,
+                                                 sum(timings.timeouts.values()), run_error, max_tweets, max_followers)
+                kept = await asyncio.to_thread(run_trace.finish, reasons)
+                if kept:
+                    result["trace"] = {key: kept[key] for key in ("run_id", "size", "reasons")}
+                    result["trace"]["url"] = f"/traces/{kept['run_id']}"
+                    print(f"Trace kept ({', '.join(reasons)}): {result['trace']['url']}")
+            except Exception as e:
+                print(f"Error storing trace: {str(e)}")
     
-    # --- Save result as JSON file in scraped_profiles directory ---
+    # Assemble the final result from the spill file
+    if spill:
+        try:
+            spilled = spill.assemble()
+            for section in ("tweets", "retweets", "followers", "following"):
+                if spilled[section]:
+                    result[section] = spilled[section]
+        except Exception as e:
+            print(f"Error reading spill file, using in-memory results: {str(e)}")
+    
+    if asset_cache is not None:
+        try:
+            await asyncio.to_thread(asset_cache.flush)
+        except Exception as e:
+            print(f"Error updating asset cache index: {str(e)}")
+        result["asset_cache"] = asset_cache.summary()
+        print(f"Asset cache: {asset_cache.hits} hits, {asset_cache.misses} misses, "
+              f"{asset_cache.bytes_saved / 1e6:.1f} MB saved")
+
+    result["rate_limit"] = limits.to_dict()
+    print(f"Rate limit: {limits.acquired} requests as {limits.identity}, waited {limits.waited:.1f}s, "
+          f"{limits.signals} rate-limit signals")
     try:
-        scraped_profiles_dir = os.path.join(os.path.dirname(__file__), '..', 'scraped_profiles')
-        os.makedirs(scraped_profiles_dir, exist_ok=True)
-        json_path = os.path.join(scraped_profiles_dir, f"{username}.json")
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
-        print(f"Scraped profile saved to {json_path}")
+        if not limits.signals:
+            await asyncio.to_thread(ratelimit.record_success, limits.identity)
+    except Exception as e:
+        print(f"Error updating circuit breaker: {str(e)}")
+
+    # --- Save result to the profile database ---
+    save_timer = metrics.phase("save")
+    try:
+        revision = storage.save_result(username, result)
+        print(f"Scraped profile saved to {storage.DB_PATH} (revision {revision})")
+        if spill and limits.tripped:
+            # Keep the spill so the deferred retry resumes where this run stopped
+            spill.close()
+        elif spill:
+            spill.finish()
+        try:
+            version = snapshots.save_snapshot(username, result, incremental=bool(known_ids), limits={
+                "tweets": max_tweets, "retweets": max_retweets, "followers": max_followers, "following": max_following,
+            })
+            print(f"Snapshot v{version} stored for @{username}")
+        except Exception as e:
+            print(f"Error storing snapshot: {str(e)}")
+        try:
+            graph.update_account(username, result)
+        except Exception as e:
+            print(f"Error updating follower graph: {str(e)}")
+        try:
+            search.index_result(username, result)
+        except Exception as e:
+            print(f"Error updating search index: {str(e)}")
+        if incremental:
+            # Return the new items merged into the stored history
+            new_tweets, new_retweets = len(result.get("tweets", [])), len(result.get("retweets", []))
+            stored = storage.load_result(username)
+            result["tweets"] = stored["tweets"]
+            result["retweets"] = stored["retweets"]
+            result["incremental"] = {"known_ids": len(known_ids), "new_tweets": new_tweets, "new_retweets": new_retweets}
     except Exception as e:
         print(f"Error saving scraped profile: {str(e)}")
+    save_timer.done()
     # --- End save ---
-    
-    return result
+
+def _finish_run(result: Dict, timings: metrics.RunTimings, calls: roundtrips.RoundTrips, run_log: events.RunLog,
+                username: str) -> None:
+    result["run_id"] = run_log.run_id
+    result["timings"] = timings.to_dict()
+    if calls.calls:
+        result["round_trips"] = calls.report(timings.items)
+        print(f"Round trips: {result['round_trips']['total']} protocol calls, per item: {result['round_trips']['per_item']}")
+        calls.publish()
+    events.info("run_finished", username=username, seconds=result["timings"]["total_seconds"],
+                tweets=len(result.get("tweets") or []), followers=len(result.get("followers") or []))
+    try:
+        metrics.flush()
+        events.flush(run_log)
+    except Exception as e:
+        print(f"Error publishing metrics: {str(e)}")
 
 def manually_cleanup_screenshots(username: str) -> None:
     """Manually clean up screenshots for a specific user."""
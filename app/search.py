@@ -0,0 +1,220 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from app import storage
+
+# search_docs holds one row per searchable text; search_fts is an external-content
+# FTS5 index over it, kept in sync by triggers so upserts update the index in place.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_docs (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL COLLATE NOCASE,
+    kind TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    author TEXT NOT NULL DEFAULT '',
+    item_date TEXT NOT NULL DEFAULT '',
+    content TEXT NOT NULL,
+    UNIQUE (username, kind, ref)
+);
+CREATE INDEX IF NOT EXISTS idx_search_docs_date ON search_docs(item_date);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+    content,
+    content='search_docs',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS search_docs_ai AFTER INSERT ON search_docs BEGIN
+    INSERT INTO search_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS search_docs_ad AFTER DELETE ON search_docs BEGIN
+    INSERT INTO search_fts(search_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS search_docs_au AFTER UPDATE OF content ON search_docs BEGIN
+    INSERT INTO search_fts(search_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    INSERT INTO search_fts(rowid, content) VALUES (new.id, new.content);
+END;
+"""
+
+# Indexed kinds: tweet, quote, retweet, follower_bio, following_bio
+BIO_KINDS = {"followers": "follower_bio", "following": "following_bio"}
+
+_schema_ready = set()
+
+def connect(db_path: str = None):
+    """Open the profile database, creating the search index on first use."""
+    conn = storage.connect(db_path)
+    if (db_path or storage.DB_PATH) not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(db_path or storage.DB_PATH)
+    return conn
+
+def _item_docs(username: str, result: Dict) -> List[Tuple]:
+    """Rows (username, kind, ref, author, item_date, content) for tweets, quotes and retweets."""
+    docs = []
+    for tweet in result.get("tweets") or []:
+        ref = storage.item_status_id(tweet, "tweet_content", "tweet_date")
+        date = tweet.get("tweet_date", "") or ""
+        if tweet.get("tweet_content"):
+            docs.append((username, "tweet", ref, username, date, tweet["tweet_content"]))
+        if tweet.get("quoted_content"):
+            docs.append((username, "quote", ref, tweet.get("quoted_username", "") or "", date, tweet["quoted_content"]))
+    for retweet in result.get("retweets") or []:
+        if retweet.get("retweet_main_content"):
+            docs.append((
+                username,
+                "retweet",
+                storage.item_status_id(retweet, "retweet_main_content", "retweet_date"),
+                retweet.get("retweet_username", "") or "",
+                retweet.get("retweet_date", "") or "",
+                retweet["retweet_main_content"],
+            ))
+    return docs
+
+def index_result(username: str, result: Dict, db_path: str = None) -> int:
+    """Add a saved result to the index and return the number of documents written.
+
+    Tweets accumulate like in storage. Bios are replaced by the latest complete list and
+    upserted by handle from partial ones (see storage.complete_relations).
+    """
+    docs = _item_docs(username, result)
+    complete = storage.complete_relations(result)
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            """
+            INSERT INTO search_docs (username, kind, ref, author, item_date, content)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(username, kind, ref) DO UPDATE SET
+                author = excluded.author,
+                item_date = excluded.item_date,
+                content = excluded.content
+            WHERE search_docs.content != excluded.content
+               OR search_docs.author != excluded.author
+               OR search_docs.item_date != excluded.item_date
+            """,
+            docs,
+        )
+        written = len(docs)
+        for relation, kind in BIO_KINDS.items():
+            users = result.get(relation) or []
+            if not users:
+                continue
+            handle_key, name_key, bio_key = storage.SOCIAL_RELATIONS[relation]
+            bios = {}
+            for user in users:
+                member = user.get(handle_key) or user.get(name_key, "")
+                if member and user.get(bio_key):
+                    bios[member.lower()] = (username, kind, member, member, "", user[bio_key])
+            if relation in complete:
+                conn.execute("DELETE FROM search_docs WHERE username = ? AND kind = ?", (username, kind))
+            conn.executemany(
+                """
+                INSERT INTO search_docs (username, kind, ref, author, item_date, content)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(username, kind, ref) DO UPDATE SET content = excluded.content
+                WHERE search_docs.content != excluded.content
+                """,
+                list(bios.values()),
+            )
+            written += len(bios)
+        conn.execute("COMMIT")
+        return written
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def to_match_query(text: str) -> str:
+    """Turn user input into a safe FTS5 query: every word or "quoted phrase" must match.
+
+    A trailing * on a word keeps prefix matching.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', text or ""):
+        term = phrase or word
+        prefix = not phrase and term.endswith('*')
+        term = term.rstrip('*').replace('"', '')
+        if term:
+            terms.append(f'"{term}"' + ('*' if prefix else ''))
+    return " ".join(terms)
+
+def search(query: str, username: Optional[str] = None, kind: Optional[str] = None,
+           since: Optional[str] = None, until: Optional[str] = None,
+           page: int = 1, page_size: int = 20, db_path: str = None) -> Dict:
+    """Ranked (bm25) full-text search with optional user, kind and date filters.
+
+    since/until compare against ISO dates (YYYY-MM-DD or full timestamps); items
+    without a date (bios) are excluded when a date filter is given.
+    """
+    match = to_match_query(query)
+    response = {"query": query, "page": page, "page_size": page_size, "total": 0, "results": []}
+    if not match:
+        return response
+    filters = ["search_fts MATCH ?"]
+    params: List = [match]
+    if username:
+        filters.append("d.username = ?")
+        params.append(username.lstrip('@'))
+    if kind:
+        filters.append("d.kind = ?")
+        params.append(kind)
+    if since:
+        filters.append("d.item_date >= ?")
+        params.append(since)
+    if until:
+        # Make a bare date inclusive of the whole day
+        filters.append("d.item_date <= ?")
+        params.append(until + "T23:59:59.999Z" if len(until) == 10 else until)
+    where = " AND ".join(filters)
+    conn = connect(db_path)
+    try:
+        response["total"] = conn.execute(
+            f"SELECT COUNT(*) FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid WHERE {where}",
+            params,
+        ).fetchone()[0]
+        rows = conn.execute(
+            f"""
+            SELECT d.username, d.kind, d.ref, d.author, d.item_date,
+                   snippet(search_fts, 0, '[', ']', '...', 16) AS snippet,
+                   bm25(search_fts) AS score
+            FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid
+            WHERE {where}
+            ORDER BY score
+            LIMIT ? OFFSET ?
+            """,
+            params + [page_size, (page - 1) * page_size],
+        ).fetchall()
+    finally:
+        conn.close()
+    response["results"] = [
+        {
+            "username": row["username"],
+            "kind": row["kind"],
+            "ref": row["ref"],
+            "author": row["author"],
+            "date": row["item_date"],
+            "snippet": row["snippet"],
+            "score": round(-row["score"], 4),
+        }
+        for row in rows
+    ]
+    return response
+
+def rebuild_from_storage(db_path: str = None) -> int:
+    """Index every profile already in the database."""
+    conn = storage.connect(db_path)
+    try:
+        usernames = [row["username"] for row in conn.execute("SELECT username FROM profiles")]
+    finally:
+        conn.close()
+    for username in usernames:
+        index_result(username, storage.load_result(username, db_path) or {}, db_path)
+    return len(usernames)
+
+if __name__ == "__main__":
+    count = rebuild_from_storage()
+    print(f"Indexed {count} stored profiles for search")
@@ -0,0 +1,127 @@
+import os
+import json
+import fcntl
+import shutil
+from typing import Dict, Optional, Tuple
+from app.identities import Identity, load_cookies, FALLBACK_COOKIES_FILE, IDENTITIES_DIR
+from app.snapshots import atomic_write
+
+# Configuration
+# "storage_state": fresh context from the identity's saved cookies and localStorage (default)
+# "persistent": per-identity Chromium profile, seeded from playwright_profile/, so the
+#               service worker and script caches stay warm between runs
+# "cookies": the old behaviour, add_cookies only and nothing written back
+SESSION_MODE = os.environ.get("SCRAPER_SESSION_MODE", "storage_state")
+PROFILE_SEED_DIR = os.path.join(os.path.dirname(__file__), '..', 'playwright_profile')
+PROFILES_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'profiles')
+
+# Chromium's per-process locks and crash state must not be copied into a new profile
+_SEED_IGNORE = shutil.ignore_patterns("Singleton*", "lockfile", "LOCK", "*.lock", "Crashpad", "crash*")
+
+def load_state(identity: Identity) -> Dict:
+    """The identity's storage state; plain cookie lists are wrapped into one."""
+    with open(identity.path, "r") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return {"cookies": data.get("cookies", []), "origins": data.get("origins", [])}
+    return {"cookies": data, "origins": []}
+
+def save_path(identity: Identity, identities_dir: str = None) -> str:
+    """Where refreshed state is written: the identity's own file, except for the tracked
+    app/twitter_cookies.json fallback, which is left as a cookie list and migrated into the
+    pool directory on its first save (the pool then takes precedence over it)."""
+    if os.path.abspath(identity.path) == os.path.abspath(FALLBACK_COOKIES_FILE):
+        return os.path.join(identities_dir or IDENTITIES_DIR, f"{identity.name}.json")
+    return identity.path
+
+def profile_dir(identity: Identity, profiles_dir: str = None) -> str:
+    return os.path.join(profiles_dir or PROFILES_DIR, identity.name)
+
+def seed_profile(path: str, seed_dir: str = None) -> bool:
+    """Create a profile directory from the seed profile once. Returns True if it was created."""
+    if os.path.isdir(path):
+        return False
+    seed_dir = seed_dir or PROFILE_SEED_DIR
+    tmp_path = path + ".seeding"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    if os.path.isdir(seed_dir):
+        shutil.copytree(seed_dir, tmp_path, ignore=_SEED_IGNORE)
+    else:
+        os.makedirs(tmp_path)
+    os.replace(tmp_path, path)
+    return True
+
+def _lock_profile(path: str):
+    """Take the profile's lock without waiting; None if another run is using it."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    lock = open(path + ".lock", "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+class Session:
+    """Browser and context for one run, opened according to SESSION_MODE.
+
+    For persistent profiles, browser is the context itself, so existing
+    browser.close() calls keep working.
+    """
+
+    def __init__(self, identity: Identity, mode: str):
+        self.identity = identity
+        self.mode = mode
+        self.browser = None
+        self.context = None
+        self._lock = None
+
+    async def open(self, playwright, launch_options: Dict, context_options: Dict) -> Tuple[object, object]:
+        mode = self.mode
+        if mode == "persistent":
+            path = profile_dir(self.identity)
+            self._lock = _lock_profile(path)
+            if self._lock is None:
+                # Chromium allows one process per profile; run this one from storage state instead
+                print(f"Profile {path} is in use, using storage state for this run")
+                mode = self.mode = "storage_state"
+            else:
+                if seed_profile(path):
+                    print(f"Seeded browser profile {path} from {PROFILE_SEED_DIR}")
+                self.context = await playwright.chromium.launch_persistent_context(
+                    path, **launch_options, **context_options
+                )
+                self.browser = self.context
+                # The identity file is the source of truth for cookies; the profile supplies caches
+                await self.context.add_cookies(load_state(self.identity)["cookies"])
+                return self.browser, self.context
+
+        self.browser = await playwright.chromium.launch(**launch_options)
+        if mode == "storage_state":
+            self.context = await self.browser.new_context(storage_state=load_state(self.identity), **context_options)
+        else:
+            self.context = await self.browser.new_context(**context_options)
+            await self.context.add_cookies(load_cookies(self.identity))
+        return self.browser, self.context
+
+    async def save(self) -> bool:
+        """Write refreshed cookies and localStorage back to the identity file (see save_path) atomically."""
+        if self.mode == "cookies" or self.context is None:
+            return False
+        state = await self.context.storage_state()
+        if not state.get("cookies"):
+            # Never replace a working session with an empty one
+            return False
+        path = save_path(self.identity)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        atomic_write(path, json.dumps(state, ensure_ascii=False).encode("utf-8"))
+        self.identity.path = path
+        return True
+
+    def close(self) -> None:
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+def open_session(identity: Identity, mode: Optional[str] = None) -> Session:
+    return Session(identity, mode or SESSION_MODE)
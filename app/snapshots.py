@@ -0,0 +1,321 @@
+import os
+import json
+import gzip
+import time
+import tempfile
+from typing import Dict, List, Optional, Set, Tuple
+from app import storage
+
+# zstandard is optional - gzip is used when it is not installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Configuration
+SNAPSHOTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'snapshots')
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 9
+
+# Section -> (item key, names used in the stored diff)
+DIFF_SECTIONS = {
+    "tweets": ("tweet_id", "added", "removed"),
+    "retweets": ("tweet_id", "added", "removed"),
+    "followers": ("follower_username", "gained", "lost"),
+    "following": ("following_username", "gained", "lost"),
+}
+
+# Fallback keys for results saved before items carried ids/handles
+LEGACY_KEYS = {
+    "tweets": ("tweet_content", "tweet_date"),
+    "retweets": ("retweet_main_content", "retweet_date"),
+    "followers": ("follower_name",),
+    "following": ("following_name",),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    username TEXT NOT NULL COLLATE NOCASE,
+    version INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    path TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    stored_bytes INTEGER NOT NULL,
+    incremental INTEGER NOT NULL DEFAULT 0,
+    counts TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    keys TEXT NOT NULL,
+    diff TEXT NOT NULL,
+    PRIMARY KEY (username, version)
+);
+"""
+
+_schema_ready = set()
+
+def connect(db_path: str = None):
+    """Open the profile database, creating the snapshot index on first use."""
+    conn = storage.connect(db_path)
+    if (db_path or storage.DB_PATH) not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(db_path or storage.DB_PATH)
+    return conn
+
+def _compress(raw: bytes):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw), "zstd"
+    return gzip.compress(raw, compresslevel=GZIP_LEVEL), "gzip"
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Snapshot is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Write a file so readers see either the old content or the complete new one."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def item_keys(result: Dict, section: str) -> Set[str]:
+    """Identifiers of the items in one result section."""
+    key, _, _ = DIFF_SECTIONS[section]
+    keys = set()
+    for item in result.get(section) or []:
+        value = item.get(key) or "|".join(str(item.get(k, "")) for k in LEGACY_KEYS[section])
+        if value:
+            keys.add(value)
+    return keys
+
+def covered_keys(section: str, before: Set[str], current: Set[str], limit: Optional[int] = None,
+                 ended: Optional[str] = None) -> Tuple[Set[str], bool]:
+    """The previous keys a run could have seen again, and whether that is fewer than all of them.
+
+    Runs are capped (max_tweets, max_followers, ...), so an item missing from a capped
+    section may simply lie beyond the cap. Tweets are compared within the window the
+    run scrolled through (status ids are time-ordered: no older than its oldest tweet).
+    Follower lists cover the previous items only if they were scrolled to the end
+    (ended is the section's stop reason, see scraper.scrape_social_users); results
+    without a stop reason, and retweets, fall back to the cap.
+    """
+    if section == "tweets":
+        ids = [int(key) for key in current if key.isdigit()]
+        if not ids:
+            return set(), bool(before)
+        oldest = min(ids)
+        covered = {key for key in before if key.isdigit() and int(key) >= oldest}
+        return covered, len(covered) < len(before)
+    if ended is not None and ended != storage.END_OF_LIST:
+        return set(), bool(before)
+    if limit and len(current) >= limit:
+        return set(), bool(before)
+    return before, False
+
+def compute_diff(previous_keys: Optional[Dict[str, List[str]]], result: Dict,
+                 previous_profile: Optional[Dict] = None, incremental: bool = False,
+                 limits: Optional[Dict[str, int]] = None) -> Dict:
+    """Structural diff between the previous snapshot's item keys and a new result.
+
+    Sections the run did not collect are left out. Incremental runs only see new
+    tweets, so they never report removed tweets. Removals are only reported within
+    what the run covered (see covered_keys, which reads the stop reasons in
+    result["ended"]); sections where that was less than the previous snapshot are
+    marked "partial".
+    """
+    diff = {}
+    for section, (_, added_name, removed_name) in DIFF_SECTIONS.items():
+        current = item_keys(result, section)
+        if not current:
+            continue
+        before = set((previous_keys or {}).get(section, []))
+        added = sorted(current - before)
+        if previous_keys is None:
+            covered, partial = set(), False
+        elif incremental and section in ("tweets", "retweets"):
+            covered, partial = set(), True
+        else:
+            covered, partial = covered_keys(section, before, current, (limits or {}).get(section),
+                                            (result.get("ended") or {}).get(section))
+        diff[section] = {added_name: added, removed_name: sorted(covered - current)}
+        if partial:
+            diff[section]["partial"] = True
+    profile = result.get("user_profile") or {}
+    if previous_profile:
+        changes = {
+            field: {"old": previous_profile.get(field, ""), "new": profile.get(field, "")}
+            for field in ("username", "bio")
+            if profile.get(field) and profile.get(field) != previous_profile.get(field)
+        }
+        if changes:
+            diff["user_profile"] = changes
+    return diff
+
+def save_snapshot(username: str, result: Dict, incremental: bool = False, db_path: str = None,
+                  snapshots_dir: str = None, limits: Optional[Dict[str, int]] = None) -> int:
+    """Store a compressed snapshot of a result with its diff against the previous one.
+
+    limits holds the run's per-section caps (max_tweets, ...), if any. Returns the new version number.
+    """
+    raw = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    data, codec = _compress(raw)
+    counts = {section: len(result.get(section) or []) for section in DIFF_SECTIONS}
+    keys = {section: sorted(item_keys(result, section)) for section in DIFF_SECTIONS}
+    profile = result.get("user_profile") or {}
+
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        previous = conn.execute(
+            "SELECT version, keys, profile FROM snapshots WHERE username = ? ORDER BY version DESC LIMIT 1",
+            (username,),
+        ).fetchone()
+        version = previous["version"] + 1 if previous else 1
+        previous_keys = None
+        previous_profile = None
+        if previous:
+            previous_keys = json.loads(previous["keys"])
+            previous_profile = json.loads(previous["profile"])
+            # Carry forward what this run did not cover (sections it did not collect, tweets older
+            # than its window, capped sections), so the next diff compares like with like
+            for section in DIFF_SECTIONS:
+                before = set(previous_keys.get(section, []))
+                if not keys[section] or (incremental and section in ("tweets", "retweets")):
+                    keys[section] = sorted(set(keys[section]) | before)
+                else:
+                    covered, partial = covered_keys(section, before, set(keys[section]),
+                                                    (limits or {}).get(section),
+                                                    (result.get("ended") or {}).get(section))
+                    if partial:
+                        keys[section] = sorted(set(keys[section]) | (before - covered))
+        diff = compute_diff(previous_keys, result, previous_profile, incremental, limits)
+        # Failed profile fetches keep the last known name and bio
+        stored_profile = {
+            field: profile.get(field) or (previous_profile or {}).get(field, "")
+            for field in ("username", "bio")
+        }
+
+        safe = ''.join(c for c in username.replace('@', '') if c.isalnum() or c in '_-').lower()
+        extension = "zst" if codec == "zstd" else "gz"
+        path = os.path.join(snapshots_dir or SNAPSHOTS_DIR, safe, f"v{version:05d}.json.{extension}")
+        atomic_write(path, data)
+        conn.execute(
+            """
+            INSERT INTO snapshots (username, version, created_at, path, codec, raw_bytes, stored_bytes,
+                                   incremental, counts, profile, keys, diff)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (username, version, time.time(), path, codec, len(raw), len(data), int(incremental),
+             json.dumps(counts), json.dumps(stored_profile, ensure_ascii=False), json.dumps(keys, ensure_ascii=False),
+             json.dumps(diff, ensure_ascii=False)),
+        )
+        conn.execute("COMMIT")
+        return version
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def _summarize(diff: Dict) -> Dict[str, int]:
+    summary = {}
+    for section, (_, added_name, removed_name) in DIFF_SECTIONS.items():
+        if section in diff:
+            summary[f"{section}_{added_name}"] = len(diff[section][added_name])
+            summary[f"{section}_{removed_name}"] = len(diff[section][removed_name])
+    if "user_profile" in diff:
+        summary["profile_changed"] = len(diff["user_profile"])
+    return summary
+
+def list_snapshots(username: str, db_path: str = None) -> List[Dict]:
+    """Version history with counts and diff summaries, read from the index only."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT version, created_at, codec, raw_bytes, stored_bytes, incremental, counts, diff
+            FROM snapshots WHERE username = ? ORDER BY version
+            """,
+            (username,),
+        ).fetchall()
+    finally:
+        conn.close()
+    history = []
+    for row in rows:
+        counts = json.loads(row["counts"])
+        history.append({
+            "version": row["version"],
+            "created_at": row["created_at"],
+            "codec": row["codec"],
+            "raw_bytes": row["raw_bytes"],
+            "stored_bytes": row["stored_bytes"],
+            "incremental": bool(row["incremental"]),
+            "counts": counts,
+            "changes": _summarize(json.loads(row["diff"])),
+        })
+    return history
+
+def get_diff(username: str, from_version: int, to_version: int, db_path: str = None) -> Optional[Dict]:
+    """Net diff between two versions, composed from the stored per-version diffs."""
+    if from_version > to_version:
+        return None
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT version, diff FROM snapshots WHERE username = ? AND version > ? AND version <= ? ORDER BY version",
+            (username, from_version, to_version),
+        ).fetchall()
+    finally:
+        conn.close()
+    if not rows or rows[-1]["version"] != to_version:
+        return None
+    net = {section: {} for section in DIFF_SECTIONS}
+    profile_changes = {}
+    for row in rows:
+        diff = json.loads(row["diff"])
+        for section, (_, added_name, removed_name) in DIFF_SECTIONS.items():
+            if section not in diff:
+                continue
+            for key in diff[section][added_name]:
+                # Removed earlier and added back cancels out
+                net[section][key] = net[section].get(key, 0) + 1
+            for key in diff[section][removed_name]:
+                net[section][key] = net[section].get(key, 0) - 1
+        for field, change in diff.get("user_profile", {}).items():
+            old = profile_changes.get(field, change)["old"]
+            profile_changes[field] = {"old": old, "new": change["new"]}
+    composed = {"from_version": from_version, "to_version": to_version}
+    for section, (_, added_name, removed_name) in DIFF_SECTIONS.items():
+        composed[section] = {
+            added_name: sorted(k for k, v in net[section].items() if v > 0),
+            removed_name: sorted(k for k, v in net[section].items() if v < 0),
+        }
+    composed["user_profile"] = {f: c for f, c in profile_changes.items() if c["old"] != c["new"]}
+    return composed
+
+def load_snapshot(username: str, version: int, db_path: str = None) -> Optional[Dict]:
+    """Decompress and return one stored snapshot."""
+    conn = connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT path, codec FROM snapshots WHERE username = ? AND version = ?",
+            (username, version),
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None or not os.path.exists(row["path"]):
+        return None
+    with open(row["path"], 'rb') as f:
+        return json.loads(_decompress(f.read(), row["codec"]))
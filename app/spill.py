@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import fcntl
+from typing import Dict, List, Optional, Set
+
+# Configuration
+RUNS_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'runs')
+FSYNC_EVERY = 25  # records between fsyncs
+FSYNC_INTERVAL = 2.0  # seconds between fsyncs, whichever comes first
+RESUME_MAX_AGE = 6 * 3600  # partial runs older than this are not resumed
+
+# Result sections that are spilled item by item
+SECTIONS = ("tweets", "retweets", "followers", "following")
+
+# Key that identifies an item within its section, for resume de-duplication
+ITEM_KEYS = {
+    "tweets": "tweet_id",
+    "retweets": "tweet_id",
+    "followers": "follower_username",
+    "following": "following_username",
+}
+
+def spill_path(username: str, runs_dir: str = None) -> str:
+    """Path of the in-progress spill file for a user."""
+    safe = ''.join(c for c in username.replace('@', '') if c.isalnum() or c in '_-')
+    return os.path.join(runs_dir or RUNS_DIR, f"{safe.lower()}.jsonl")
+
+class SpillBusy(RuntimeError):
+    """Another run for the same user holds the spill file."""
+
+def _lock_spill(path: str):
+    """Take the spill's lock without waiting; None if another run in any process holds it."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    lock = open(path + ".lock", "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+def read_spill(path: str) -> Dict:
+    """Assemble a (possibly partial) result from a spill file.
+
+    A torn last line from a crash mid-write is ignored.
+    """
+    result = {"user_profile": None}
+    for section in SECTIONS:
+        result[section] = []
+    if not os.path.exists(path):
+        return result
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            kind = record.get("kind")
+            if kind in SECTIONS:
+                result[kind].append(record["item"])
+            elif kind == "user_profile":
+                result["user_profile"] = record["item"]
+            elif kind == "start":
+                result["started_at"] = record.get("ts")
+    return result
+
+class SpillWriter:
+    """Append-only JSONL log of everything extracted during one scrape run.
+
+    Each record is flushed to the OS immediately and fsynced in batches, so a
+    crash, timeout or OOM loses at most the records since the last fsync.
+    """
+
+    def __init__(self, path: str, fsync_every: int = FSYNC_EVERY, fsync_interval: float = FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.resumed = {section: [] for section in SECTIONS}
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = None  # held from open_run until finish() or release()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        # Terminate a line torn by a crash so the next record starts cleanly
+        if self._file.tell() > 0:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def append(self, kind: str, item: Optional[Dict] = None) -> None:
+        """Append one record and fsync if the batch is full."""
+        record = {"kind": kind, "ts": time.time()}
+        if item is not None:
+            record["item"] = item
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._pending += 1
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        """Force pending records to disk."""
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def resumed_items(self, section: str) -> List[Dict]:
+        """Items recovered from an interrupted earlier run (copied, safe to extend)."""
+        return list(self.resumed.get(section, []))
+
+    def resumed_keys(self, section: str) -> Set[str]:
+        """Identifiers of recovered items, used to skip them while scrolling."""
+        key = ITEM_KEYS[section]
+        return {item[key] for item in self.resumed.get(section, []) if item.get(key)}
+
+    def assemble(self) -> Dict:
+        """Build the result sections from everything written so far."""
+        self.sync()
+        return read_spill(self.path)
+
+    def close(self) -> None:
+        """Close the file; the lock is kept so no other run resumes from it before finish()."""
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def release(self) -> None:
+        """Let other runs open the spill (and resume from it, if it was kept)."""
+        self.close()
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+    def finish(self) -> None:
+        """Remove the spill once the result has been saved elsewhere."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            print(f"Warning: Could not remove spill file {self.path}: {e}")
+        self.release()
+
+def open_run(username: str, runs_dir: str = None) -> SpillWriter:
+    """Open the spill for a user's run, resuming an interrupted recent run if one exists.
+
+    The spill is per user, so it is locked for the run: overlapping runs for the same user
+    (inline /scrape has no one-job-per-user guard) get SpillBusy instead of sharing the file.
+    """
+    path = spill_path(username, runs_dir)
+    lock = _lock_spill(path)
+    if lock is None:
+        raise SpillBusy(f"another run for @{username} is writing {path}")
+    try:
+        return _open_locked(username, path, lock)
+    except Exception:
+        lock.close()
+        raise
+
+def _open_locked(username: str, path: str, lock) -> SpillWriter:
+    previous = read_spill(path)
+    resumable = os.path.exists(path) and time.time() - os.path.getmtime(path) <= RESUME_MAX_AGE
+    if os.path.exists(path) and not resumable:
+        os.remove(path)
+    writer = SpillWriter(path)
+    writer._lock = lock
+    if resumable:
+        for section in SECTIONS:
+            writer.resumed[section] = previous[section]
+        counts = ", ".join(f"{len(previous[s])} {s}" for s in SECTIONS)
+        print(f"Resuming interrupted run for @{username} from {path} ({counts})")
+    writer.append("start")
+    return writer
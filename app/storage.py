@@ -0,0 +1,358 @@
+import os
+import json
+import glob
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# Configuration
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+DB_PATH = os.environ.get("SCRAPER_DB", os.path.join(DATA_DIR, 'scraper.db'))
+LEGACY_PROFILES_DIR = os.path.join(os.path.dirname(__file__), '..', 'scraped_profiles')
+BUSY_TIMEOUT = 30  # seconds to wait for a competing writer
+
+SOCIAL_RELATIONS = {
+    "followers": ("follower_username", "follower_name", "follower_bio"),
+    "following": ("following_username", "following_name", "following_bio"),
+}
+# Stop reason (result["ended"]) of a follower/following scroll that read the whole list
+END_OF_LIST = "end_of_list"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    username TEXT PRIMARY KEY COLLATE NOCASE,
+    display_name TEXT NOT NULL DEFAULT '',
+    bio TEXT NOT NULL DEFAULT '',
+    revision INTEGER NOT NULL DEFAULT 0,
+    scraped_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tweets (
+    username TEXT NOT NULL COLLATE NOCASE,
+    status_id TEXT NOT NULL,
+    content TEXT NOT NULL DEFAULT '',
+    tweet_date TEXT NOT NULL DEFAULT '',
+    screenshot TEXT NOT NULL DEFAULT '',
+    quoted_content TEXT,
+    quoted_username TEXT,
+    position INTEGER NOT NULL DEFAULT 0,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (username, status_id)
+);
+CREATE INDEX IF NOT EXISTS idx_tweets_status ON tweets(status_id);
+CREATE INDEX IF NOT EXISTS idx_tweets_user_date ON tweets(username, tweet_date);
+
+CREATE TABLE IF NOT EXISTS retweets (
+    username TEXT NOT NULL COLLATE NOCASE,
+    status_id TEXT NOT NULL,
+    content TEXT NOT NULL DEFAULT '',
+    author TEXT NOT NULL DEFAULT '',
+    author_bio TEXT NOT NULL DEFAULT '',
+    main_content TEXT NOT NULL DEFAULT '',
+    retweet_date TEXT NOT NULL DEFAULT '',
+    screenshot TEXT NOT NULL DEFAULT '',
+    position INTEGER NOT NULL DEFAULT 0,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (username, status_id)
+);
+CREATE INDEX IF NOT EXISTS idx_retweets_status ON retweets(status_id);
+CREATE INDEX IF NOT EXISTS idx_retweets_user_date ON retweets(username, retweet_date);
+
+CREATE TABLE IF NOT EXISTS social_edges (
+    username TEXT NOT NULL COLLATE NOCASE,
+    relation TEXT NOT NULL CHECK (relation IN ('followers', 'following')),
+    member TEXT NOT NULL COLLATE NOCASE,
+    name TEXT NOT NULL DEFAULT '',
+    bio TEXT NOT NULL DEFAULT '',
+    position INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (username, relation, member)
+);
+CREATE INDEX IF NOT EXISTS idx_social_member ON social_edges(member, relation);
+"""
+
+_schema_ready = set()
+
+def connect(db_path: str = None) -> sqlite3.Connection:
+    """Open a connection in WAL mode, creating the schema on first use."""
+    db_path = db_path or DB_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if db_path not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(db_path)
+    return conn
+
+@contextmanager
+def transaction(db_path: str = None) -> Iterator[sqlite3.Connection]:
+    """Run a block inside a single write transaction."""
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def item_status_id(item: Dict, content_key: str, date_key: str) -> str:
+    """Return the tweet status id of an item, or a stable content hash for legacy items."""
+    status_id = item.get("tweet_id")
+    if status_id:
+        return str(status_id)
+    fingerprint = f"{item.get(content_key, '')}|{item.get(date_key, '')}"
+    return f"content_{hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]}"
+
+def _tweet_rows(username: str, tweets: List[Dict], now: float) -> List[Tuple]:
+    return [
+        (
+            username,
+            item_status_id(tweet, "tweet_content", "tweet_date"),
+            tweet.get("tweet_content", "") or "",
+            tweet.get("tweet_date", "") or "",
+            tweet.get("tweet_screenshot", "") or "",
+            tweet.get("quoted_content"),
+            tweet.get("quoted_username"),
+            position,
+            now,
+            now,
+        )
+        for position, tweet in enumerate(tweets)
+    ]
+
+def _retweet_rows(username: str, retweets: List[Dict], now: float) -> List[Tuple]:
+    return [
+        (
+            username,
+            item_status_id(retweet, "retweet_main_content", "retweet_date"),
+            retweet.get("retweet_content", "") or "",
+            retweet.get("retweet_username", "") or "",
+            retweet.get("retweet_profile_bio", "") or "",
+            retweet.get("retweet_main_content", "") or "",
+            retweet.get("retweet_date", "") or "",
+            retweet.get("retweet_screenshot", "") or "",
+            position,
+            now,
+            now,
+        )
+        for position, retweet in enumerate(retweets)
+    ]
+
+def _social_rows(username: str, relation: str, users: List[Dict]) -> List[Tuple]:
+    handle_key, name_key, bio_key = SOCIAL_RELATIONS[relation]
+    rows = {}
+    for position, user in enumerate(users):
+        name = user.get(name_key, "") or ""
+        # Older results only carry the display name
+        member = user.get(handle_key) or name
+        if member and member.lower() not in rows:
+            rows[member.lower()] = (username, relation, member, name, user.get(bio_key, "") or "", position)
+    return list(rows.values())
+
+def complete_relations(result: Dict) -> Set[str]:
+    """Social relations the result holds in full.
+
+    A scrape records why each list stopped in result["ended"]; only END_OF_LIST is
+    complete. Capped, rate-limited, out-of-scrolls or stalled lists are partial.
+    Results without "ended" (stored results, legacy dumps) count as complete.
+    """
+    ended = result.get("ended")
+    if ended is None:
+        return set(SOCIAL_RELATIONS)
+    return {relation for relation in SOCIAL_RELATIONS if ended.get(relation) == END_OF_LIST}
+
+def save_result(username: str, result: Dict, db_path: str = None, scraped_at: float = None) -> int:
+    """Upsert a scrape result in one transaction and return the new profile revision.
+
+    Tweets and retweets accumulate across runs. Complete follower and following lists
+    replace the stored ones; partial lists (see complete_relations) are merged into them,
+    so a capped or interrupted section never wipes history.
+    """
+    now = scraped_at or time.time()
+    profile = result.get("user_profile") or {}
+    with transaction(db_path) as conn:
+        conn.execute(
+            """
+            INSERT INTO profiles (username, display_name, bio, revision, scraped_at)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                display_name = COALESCE(NULLIF(excluded.display_name, ''), profiles.display_name),
+                bio = COALESCE(NULLIF(excluded.bio, ''), profiles.bio),
+                revision = profiles.revision + 1,
+                scraped_at = excluded.scraped_at
+            """,
+            (username, profile.get("username", "") or "", profile.get("bio", "") or "", now),
+        )
+        conn.executemany(
+            """
+            INSERT INTO tweets (username, status_id, content, tweet_date, screenshot,
+                                quoted_content, quoted_username, position, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(username, status_id) DO UPDATE SET
+                content = excluded.content,
+                tweet_date = excluded.tweet_date,
+                screenshot = excluded.screenshot,
+                quoted_content = excluded.quoted_content,
+                quoted_username = excluded.quoted_username,
+                position = excluded.position,
+                last_seen = excluded.last_seen
+            """,
+            _tweet_rows(username, result.get("tweets") or [], now),
+        )
+        conn.executemany(
+            """
+            INSERT INTO retweets (username, status_id, content, author, author_bio, main_content,
+                                  retweet_date, screenshot, position, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(username, status_id) DO UPDATE SET
+                content = excluded.content,
+                author = excluded.author,
+                author_bio = excluded.author_bio,
+                main_content = excluded.main_content,
+                retweet_date = excluded.retweet_date,
+                screenshot = excluded.screenshot,
+                position = excluded.position,
+                last_seen = excluded.last_seen
+            """,
+            _retweet_rows(username, result.get("retweets") or [], now),
+        )
+        complete = complete_relations(result)
+        for relation in SOCIAL_RELATIONS:
+            users = result.get(relation) or []
+            if not users:
+                continue
+            if relation in complete:
+                conn.execute("DELETE FROM social_edges WHERE username = ? AND relation = ?", (username, relation))
+            conn.executemany(
+                """
+                INSERT INTO social_edges (username, relation, member, name, bio, position)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(username, relation, member) DO UPDATE SET
+                    name = excluded.name,
+                    bio = excluded.bio,
+                    position = excluded.position
+                """,
+                _social_rows(username, relation, users),
+            )
+        revision = conn.execute("SELECT revision FROM profiles WHERE username = ?", (username,)).fetchone()[0]
+    return revision
+
+def get_profile_version(username: str, db_path: str = None) -> Optional[Tuple[int, float]]:
+    """Return (revision, scraped_at) for a stored profile, or None if unknown."""
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT revision, scraped_at FROM profiles WHERE username = ?", (username,)).fetchone()
+        return (row["revision"], row["scraped_at"]) if row else None
+    finally:
+        conn.close()
+
+def get_known_status_ids(username: str, limit: int = 500, db_path: str = None) -> Set[str]:
+    """Return the most recently seen numeric status ids (tweets and retweets) for a user."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT status_id FROM (
+                SELECT status_id, last_seen FROM tweets WHERE username = ?
+                UNION ALL
+                SELECT status_id, last_seen FROM retweets WHERE username = ?
+            )
+            WHERE status_id GLOB '[0-9]*'
+            ORDER BY last_seen DESC
+            LIMIT ?
+            """,
+            (username, username, limit),
+        ).fetchall()
+        return {row["status_id"] for row in rows}
+    finally:
+        conn.close()
+
+# Newest first; 'Unknown' and other non-ISO dates sort after real dates
+_DATE_ORDER = "CASE WHEN {col} GLOB '[0-9]*' THEN {col} END DESC NULLS LAST, position"
+
+def load_result(username: str, db_path: str = None) -> Optional[Dict]:
+    """Rebuild a scrape result in the original JSON shape from the database."""
+    conn = connect(db_path)
+    try:
+        profile = conn.execute("SELECT * FROM profiles WHERE username = ?", (username,)).fetchone()
+        if profile is None:
+            return None
+        tweets = []
+        for row in conn.execute(
+            f"SELECT * FROM tweets WHERE username = ? ORDER BY {_DATE_ORDER.format(col='tweet_date')}",
+            (username,),
+        ):
+            tweet = {
+                "tweet_id": row["status_id"],
+                "tweet_content": row["content"],
+                "tweet_date": row["tweet_date"],
+                "tweet_screenshot": row["screenshot"],
+            }
+            if row["quoted_content"] is not None:
+                tweet["quoted_content"] = row["quoted_content"]
+                tweet["quoted_username"] = row["quoted_username"] or ""
+            tweets.append(tweet)
+        retweets = [
+            {
+                "tweet_id": row["status_id"],
+                "retweet_content": row["content"],
+                "retweet_username": row["author"],
+                "retweet_profile_bio": row["author_bio"],
+                "retweet_main_content": row["main_content"],
+                "retweet_date": row["retweet_date"],
+                "retweet_screenshot": row["screenshot"],
+            }
+            for row in conn.execute(
+                f"SELECT * FROM retweets WHERE username = ? ORDER BY {_DATE_ORDER.format(col='retweet_date')}",
+                (username,),
+            )
+        ]
+        result = {
+            "user_profile": {"username": profile["display_name"] or profile["username"], "bio": profile["bio"]},
+            "following": [],
+            "followers": [],
+            "tweets": tweets,
+            "retweets": retweets,
+        }
+        for relation, (handle_key, name_key, bio_key) in SOCIAL_RELATIONS.items():
+            result[relation] = [
+                {handle_key: row["member"], name_key: row["name"], bio_key: row["bio"]}
+                for row in conn.execute(
+                    "SELECT member, name, bio FROM social_edges WHERE username = ? AND relation = ? ORDER BY position",
+                    (username, relation),
+                )
+            ]
+        return result
+    finally:
+        conn.close()
+
+def import_legacy_profiles(directory: str = LEGACY_PROFILES_DIR, db_path: str = None) -> int:
+    """Import old scraped_profiles/*.json dumps that are newer than what the database holds."""
+    imported = 0
+    # Oldest first, so dumps that differ only in handle case merge in scrape order
+    for path in sorted(glob.glob(os.path.join(directory, '*.json')), key=os.path.getmtime):
+        username = os.path.splitext(os.path.basename(path))[0]
+        mtime = os.path.getmtime(path)
+        version = get_profile_version(username, db_path)
+        if version and version[1] >= mtime:
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            save_result(username, result, db_path=db_path, scraped_at=mtime)
+            imported += 1
+        except Exception as e:
+            print(f"Could not import {path}: {str(e)}")
+    return imported
+
+if __name__ == "__main__":
+    count = import_legacy_profiles()
+    print(f"Imported {count} legacy profiles into {DB_PATH}")
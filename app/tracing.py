@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import zipfile
+import tempfile
+from typing import Dict, List, Optional, Set
+from app import storage, har
+
+# Configuration
+# SCRAPER_TRACE=1 records a Playwright trace of every run to a temporary file;
+# it is kept only when the run looks worth a post-mortem (see retain_reasons)
+ENABLED = os.environ.get("SCRAPER_TRACE", "0") == "1"
+TRACES_DIR = os.environ.get("SCRAPER_TRACES_DIR", os.path.join(storage.DATA_DIR, 'traces'))
+MAX_BYTES = int(os.environ.get("SCRAPER_TRACE_MB", "1024")) * 1024 * 1024  # retained traces, oldest dropped first
+SLOW_SECONDS = float(os.environ.get("SCRAPER_TRACE_SLOW_SECONDS", "900"))  # runs slower than this are kept
+SNAPSHOTS = os.environ.get("SCRAPER_TRACE_SNAPSHOTS", "1") != "0"  # DOM snapshots; most of a trace's size
+STALE_TEMP_SECONDS = 86400  # temporary traces left behind by a crashed process
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS traces (
+    run_id TEXT PRIMARY KEY,
+    job_id INTEGER,
+    username TEXT,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    reasons TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_traces_job ON traces(job_id);
+CREATE INDEX IF NOT EXISTS idx_traces_created ON traces(created_at);
+"""
+
+_schema_ready = set()
+
+def connect(db_path: str = None):
+    """Open the profile database, creating the trace index on first use."""
+    conn = storage.connect(db_path)
+    if (db_path or storage.DB_PATH) not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(db_path or storage.DB_PATH)
+    return conn
+
+def _temp_dir() -> str:
+    return os.path.join(TRACES_DIR, "tmp")
+
+def retain_reasons(result: Dict, seconds: float, timeouts: int, run_error: Optional[str],
+                   max_tweets: int, max_followers: int) -> List[str]:
+    """Why a run's trace should be kept; an empty list means it is discarded."""
+    reasons = []
+    if run_error:
+        reasons.append("error")
+    if seconds > SLOW_SECONDS:
+        reasons.append("slow")
+    if timeouts:
+        reasons.append("timeout")
+    if max_tweets > 0 and not result.get("tweets") and not result.get("retweets"):
+        reasons.append("empty_tweets")
+    if max_followers > 0 and not result.get("followers"):
+        reasons.append("empty_followers")
+    return reasons
+
+# Trace members holding protocol events (network log, API calls with their parameters), one JSON object per line
+EVENT_SUFFIXES = (".trace", ".network")
+BINARY_SUFFIXES = (".jpeg", ".jpg", ".png", ".webp", ".gif", ".woff", ".woff2")
+
+def _collect_secrets(node, secrets: Set[str]) -> None:
+    # Requests and responses in the network log, but also addCookies/setExtraHTTPHeaders
+    # parameters and storage state in the context options
+    if isinstance(node, dict):
+        headers, cookies = node.get("headers"), node.get("cookies")
+        if ((isinstance(headers, list) and all(isinstance(h, dict) for h in headers))
+                or (isinstance(cookies, list) and all(isinstance(c, dict) for c in cookies))):
+            har.scrub_message({"headers": headers if isinstance(headers, list) else [],
+                               "cookies": cookies if isinstance(cookies, list) else []}, secrets)
+        for value in node.values():
+            _collect_secrets(value, secrets)
+    elif isinstance(node, list):
+        for value in node:
+            _collect_secrets(value, secrets)
+
+def scrub(path: str) -> int:
+    """Redact the session's credentials in a trace zip in place, as har.scrub does for HARs.
+
+    Secret headers and cookies in the event files are replaced, then their values are
+    removed from every text member (event files, response bodies, DOM snapshots).
+    Returns the number of distinct secrets removed.
+    """
+    with zipfile.ZipFile(path) as archive:
+        members = [(info, archive.read(info)) for info in archive.infolist()]
+    secrets: Set[str] = set()
+    events: Dict[str, List] = {}
+    for info, data in members:
+        if info.filename.endswith(EVENT_SUFFIXES):
+            lines = [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+            for event in lines:
+                _collect_secrets(event, secrets)
+            events[info.filename] = lines
+    secrets = har.usable_secrets(secrets)
+    fd, scrubbed = tempfile.mkstemp(suffix=".zip", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(scrubbed, "w", zipfile.ZIP_DEFLATED) as archive:
+            for info, data in members:
+                if info.filename in events:
+                    text = "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in events[info.filename])
+                    data = har.redact(text, secrets).encode("utf-8")
+                elif not info.filename.lower().endswith(BINARY_SUFFIXES):
+                    try:
+                        data = har.redact(data.decode("utf-8"), secrets).encode("utf-8")
+                    except UnicodeDecodeError:
+                        pass  # images and other binary resources
+                archive.writestr(info.filename, data)
+        os.replace(scrubbed, path)
+    except Exception:
+        os.remove(scrubbed)
+        raise
+    return len(secrets)
+
+class RunTrace:
+    """Playwright trace of one browser context, recorded to a temporary file until the run is judged."""
+
+    def __init__(self, run_id: str, username: str, job_id: Optional[int] = None):
+        self.run_id = run_id
+        self.username = username
+        self.job_id = job_id
+        self.started = False
+        self.path: Optional[str] = None
+
+    async def start(self, context) -> None:
+        await context.tracing.start(screenshots=True, snapshots=SNAPSHOTS, sources=False)
+        self.started = True
+
+    async def stop(self, context) -> None:
+        """Write the trace; must run before the context or browser closes."""
+        if not self.started or self.path is not None:
+            return
+        os.makedirs(_temp_dir(), exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=f"{self.run_id}-", suffix=".zip", dir=_temp_dir())
+        os.close(fd)
+        try:
+            await context.tracing.stop(path=path)
+        except Exception:
+            os.remove(path)
+            raise
+        self.path = path
+
+    def finish(self, reasons: List[str], db_path: str = None) -> Optional[Dict]:
+        """Scrub, keep and index the trace when there are reasons, delete it otherwise."""
+        path, self.path = self.path, None
+        if path is None or not os.path.exists(path):
+            return None
+        if not reasons:
+            os.remove(path)
+            return None
+        try:
+            scrub(path)
+        except Exception:
+            # Never keep an unscrubbed recording of the session's cookies
+            os.remove(path)
+            raise
+        kept = os.path.join(TRACES_DIR, f"{self.run_id}.zip")
+        os.replace(path, kept)
+        entry = {"run_id": self.run_id, "job_id": self.job_id, "username": self.username,
+                 "size": os.path.getsize(kept), "reasons": reasons, "created_at": time.time()}
+        connect(db_path).close()
+        with storage.transaction(db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO traces (run_id, job_id, username, path, size, reasons, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.run_id, self.job_id, self.username, kept, entry["size"], json.dumps(reasons), entry["created_at"]),
+            )
+        evict(db_path=db_path)
+        return entry
+
+def evict(max_bytes: int = None, db_path: str = None) -> int:
+    """Drop the oldest retained traces until they fit in max_bytes. Returns traces removed."""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    removed_paths = []
+    connect(db_path).close()
+    with storage.transaction(db_path) as conn:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM traces").fetchone()[0]
+        for row in conn.execute("SELECT run_id, path, size FROM traces ORDER BY created_at").fetchall():
+            if total <= max_bytes:
+                break
+            conn.execute("DELETE FROM traces WHERE run_id = ?", (row["run_id"],))
+            removed_paths.append(row["path"])
+            total -= row["size"]
+    for path in removed_paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    if os.path.isdir(_temp_dir()):
+        cutoff = time.time() - STALE_TEMP_SECONDS
+        for name in os.listdir(_temp_dir()):
+            path = os.path.join(_temp_dir(), name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+    return len(removed_paths)
+
+def _row(row) -> Dict:
+    return {"run_id": row["run_id"], "job_id": row["job_id"], "username": row["username"], "size": row["size"],
+            "reasons": json.loads(row["reasons"]), "created_at": row["created_at"],
+            "url": f"/traces/{row['run_id']}"}
+
+def list_traces(job_id: Optional[int] = None, db_path: str = None) -> List[Dict]:
+    """Retained traces, newest first, optionally of one job."""
+    conn = connect(db_path)
+    try:
+        if job_id is None:
+            rows = conn.execute("SELECT * FROM traces ORDER BY created_at DESC").fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM traces WHERE job_id = ? ORDER BY created_at DESC", (job_id,)).fetchall()
+    finally:
+        conn.close()
+    return [_row(row) for row in rows]
+
+def get_trace(run_id: str, db_path: str = None) -> Optional[Dict]:
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT * FROM traces WHERE run_id = ?", (run_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None or not os.path.exists(row["path"]):
+        return None
+    return {**_row(row), "path": row["path"]}
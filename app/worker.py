@@ -0,0 +1,141 @@
+"""
+Scrape worker processes.
+
+Each process runs its own event loop and browser and pulls jobs from the
+SQLite queue in app.jobs, so scrapes run in parallel across cores and never
+share an event loop with the API.
+
+Usage: python -m app.worker [--processes N]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from app import jobs, identities, events
+from app.scraper import scrape_twitter
+
+# Configuration
+POLL_INTERVAL = 1.0  # seconds between queue polls when idle
+HEARTBEAT_INTERVAL = 15.0  # must stay well under jobs.LEASE_SECONDS
+RESTART_DELAY = 5.0  # seconds before replacing a worker process that died
+BUSY_RETRY = 5.0  # seconds before retrying a job that found every identity busy
+
+async def _keep_alive(job_id: int, worker: str) -> None:
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        try:
+            if not jobs.heartbeat(job_id, worker):
+                print(f"[{worker}] Lost the lease on job {job_id}")
+                return
+        except Exception as e:
+            print(f"[{worker}] Heartbeat failed for job {job_id}: {e}")
+        try:
+            # Keep the job's recent events readable from the API while it runs
+            events.flush_job(job_id)
+        except Exception as e:
+            print(f"[{worker}] Could not store events for job {job_id}: {e}")
+
+async def run_job(job: dict, worker: str) -> None:
+    """Run one claimed job and record its outcome."""
+    print(f"[{worker}] Job {job['id']}: scraping @{job['username']} {job['params']}")
+    events.bind_job(job["id"])
+    keep_alive = asyncio.create_task(_keep_alive(job["id"], worker))
+    try:
+        result = await scrape_twitter(job["username"], **job["params"])
+        rate_limit = result.get("rate_limit") or {}
+        until = rate_limit.get("breaker_open_until") or rate_limit.get("budget_exhausted_until")
+        if until:
+            # Partial progress stays in the spill file; the retry resumes from it
+            reason = ("rate limited; deferred until the circuit closes" if rate_limit.get("breaker_open_until")
+                      else "hourly budget used up; deferred until the next hour")
+            jobs.defer(job["id"], worker, until, reason)
+            print(f"[{worker}] Job {job['id']} deferred until {time.strftime('%H:%M:%S', time.localtime(until))}")
+            return
+        jobs.complete(job["id"], worker, jobs.summarize_result(result))
+        print(f"[{worker}] Job {job['id']} done")
+    except identities.IdentitiesBusy:
+        # Another worker took the last free slot; retry shortly without counting it as a failure
+        jobs.defer(job["id"], worker, time.time() + BUSY_RETRY, "all identities busy")
+        print(f"[{worker}] Job {job['id']} deferred: all identities busy")
+    except Exception as e:
+        print(f"[{worker}] Job {job['id']} failed: {e}")
+        jobs.fail(job["id"], worker, str(e))
+    finally:
+        keep_alive.cancel()
+        try:
+            events.flush_job(job["id"])
+        except Exception as e:
+            print(f"[{worker}] Could not store events for job {job['id']}: {e}")
+
+async def worker_loop(stop: asyncio.Event) -> None:
+    worker = jobs.worker_name()
+    print(f"[{worker}] Worker started")
+    while not stop.is_set():
+        job = None
+        try:
+            # Leave jobs queued while no identity is usable (rate limited, cooling down or busy)
+            if identities.available_at() is None:
+                job = jobs.claim(worker)
+        except Exception as e:
+            print(f"[{worker}] Could not claim a job: {e}")
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await run_job(job, worker)
+    print(f"[{worker}] Worker stopped")
+
+def _worker_main() -> None:
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # Finish the current job, then exit
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        await worker_loop(stop)
+    asyncio.run(main())
+
+def run(processes: int) -> None:
+    """Start worker processes and replace any that die until interrupted."""
+    # spawn gives every worker a clean interpreter with its own Playwright driver
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    def start():
+        process = context.Process(target=_worker_main, daemon=False)
+        process.start()
+        return process
+
+    print(f"Starting {processes} scrape worker process(es)")
+    workers = [start() for _ in range(processes)]
+    while not stopping:
+        time.sleep(RESTART_DELAY)
+        for index, process in enumerate(workers):
+            if not process.is_alive() and not stopping:
+                print(f"Worker pid {process.pid} exited with code {process.exitcode}, restarting")
+                workers[index] = start()
+
+    for process in workers:
+        if process.is_alive():
+            os.kill(process.pid, signal.SIGTERM)
+    for process in workers:
+        process.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run scrape workers that pull jobs from the local queue")
+    parser.add_argument('--processes', type=int, default=int(os.environ.get("SCRAPER_WORKERS", os.cpu_count() or 1)),
+                        help='number of worker processes (default: SCRAPER_WORKERS or CPU count)')
+    args = parser.parse_args()
+    run(max(1, args.processes))
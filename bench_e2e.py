@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark: runs scrape_twitter against fake_x_server.py
+and reports tweets/s, followers/s, wall time, CPU seconds per 100 tweets and
+peak RSS of the scraping process tree (Python, the Playwright driver and
+Chromium; the fixture server runs in its own process and is not counted).
+
+--render full,low repeats the runs under each render profile (app.render);
+with --tweets-only and --media-ratio 0.4 the CPU column compares what
+rendering costs per tweet.
+
+Everything the run writes (database, identity, spill files, snapshots) goes
+to a temporary directory. Request pacing defaults to a high rate so the
+numbers measure the scraper, not the token bucket; pass --rate 1 to include
+production pacing.
+
+Usage: python bench_e2e.py [--tweets 200] [--followers 500] [--latency-ms 50] [--runs 1] [--render full,low] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Dict, List, Set
+import fake_x_server
+
+SAMPLE_INTERVAL = 0.2  # seconds between RSS and CPU samples
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _children() -> Dict[int, List[int]]:
+    tree: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the parent pid follows its closing paren
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        tree.setdefault(ppid, []).append(int(entry))
+    return tree
+
+def _cpu_ticks(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return int(fields[11]) + int(fields[12])  # utime + stime
+    except (OSError, IndexError, ValueError):
+        return 0
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+class TreeRSSSampler(threading.Thread):
+    """Samples the summed RSS and CPU time of this process and its descendants, skipping excluded subtrees.
+
+    CPU is the last value seen per process, so a process that exits between
+    samples loses at most SAMPLE_INTERVAL of it.
+    """
+
+    def __init__(self, exclude: Set[int]):
+        super().__init__(daemon=True)
+        self.exclude = exclude
+        self.peak_kb = 0
+        self.peak_processes = 0
+        self.cpu_ticks: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def sample(self) -> None:
+        tree = _children()
+        pids, stack = [], [os.getpid()]
+        while stack:
+            pid = stack.pop()
+            if pid in self.exclude:
+                continue
+            pids.append(pid)
+            stack.extend(tree.get(pid, []))
+        total = sum(_rss_kb(pid) for pid in pids)
+        with self._lock:
+            if total > self.peak_kb:
+                self.peak_kb, self.peak_processes = total, len(pids)
+            for pid in pids:
+                self.cpu_ticks[pid] = max(self.cpu_ticks.get(pid, 0), _cpu_ticks(pid))
+
+    def cpu_seconds(self) -> float:
+        """CPU time of every process seen so far, including ones that have exited."""
+        self.sample()
+        with self._lock:
+            return sum(self.cpu_ticks.values()) / CLOCK_TICKS
+
+    def run(self) -> None:
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            self.sample()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+def start_server(args, port: int) -> subprocess.Popen:
+    command = [
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_x_server.py"),
+        "--port", str(port), "--tweets", str(args.tweets), "--retweet-ratio", str(args.retweet_ratio),
+        "--followers", str(args.followers), "--following", str(args.following), "--batch", str(args.batch),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms), "--window", str(args.window),
+        "--media-ratio", str(args.media_ratio),
+    ]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("fake X server did not start")
+
+def prepare_environment(args, workdir: str, base_url: str) -> None:
+    """Point every store at workdir; must run before the app modules are imported."""
+    identities_dir = os.path.join(workdir, "identities")
+    os.makedirs(identities_dir)
+    host = base_url.split("//", 1)[1].split(":", 1)[0]
+    state = {"cookies": [{"name": "auth_token", "value": "bench", "domain": host, "path": "/", "expires": -1,
+                          "httpOnly": True, "secure": False, "sameSite": "Lax"}], "origins": []}
+    with open(os.path.join(identities_dir, "bench.json"), "w") as f:
+        json.dump(state, f)
+    os.environ.update({
+        "SCRAPER_BASE_URL": base_url,
+        "SCRAPER_DB": os.path.join(workdir, "scraper.db"),
+        "SCRAPER_IDENTITIES_DIR": identities_dir,
+        "SCRAPER_RATE": str(args.rate),
+        "SCRAPER_BURST": str(max(args.rate, 5)),
+        "SCRAPER_HOURLY_BUDGET": "1000000",
+        "SCRAPER_SESSION_MODE": "storage_state",
+        "SCRAPER_ASSET_CACHE": "0",
+        "SCRAPER_LOG_LEVEL": args.log_level,
+    })
+    if not args.headed:
+        os.environ.pop("DISPLAY", None)
+
+def isolate_stores(workdir: str) -> None:
+    """Move the file stores that have no environment setting into workdir."""
+    from app import spill, snapshots, scraper
+    spill.RUNS_DIR = os.path.join(workdir, "runs")
+    snapshots.SNAPSHOTS_DIR = os.path.join(workdir, "snapshots")
+    scraper.SCREENSHOTS_DIR = os.path.join(workdir, "screenshots")
+    os.makedirs(scraper.SCREENSHOTS_DIR, exist_ok=True)
+
+def _rate(count: int, timings: Dict, phase: str) -> float:
+    seconds = timings.get("phases", {}).get(phase, {}).get("seconds", 0.0)
+    return round(count / seconds, 2) if seconds else 0.0
+
+async def run_once(username: str, args) -> Dict:
+    from app.scraper import scrape_twitter
+    started = time.perf_counter()
+    followers, following = (0, 0) if args.tweets_only else (args.followers, args.following)
+    result = await scrape_twitter(username, max_tweets=args.tweets, max_retweets=args.tweets,
+                                  max_followers=followers, max_following=following)
+    return summarize_run(username, result, time.perf_counter() - started)
+
+def summarize_run(username: str, result: Dict, wall: float) -> Dict:
+    """Throughput figures of one scrape_twitter result."""
+    timings = result.get("timings", {})
+    items = len(result.get("tweets", [])) + len(result.get("retweets", []))
+    return {
+        "username": username,
+        "wall_seconds": round(wall, 2),
+        "tweets": len(result.get("tweets", [])),
+        "retweets": len(result.get("retweets", [])),
+        "followers": len(result.get("followers", [])),
+        "following": len(result.get("following", [])),
+        "tweets_per_second": _rate(items, timings, "tweets"),
+        "followers_per_second": _rate(len(result.get("followers", [])), timings, "followers"),
+        "following_per_second": _rate(len(result.get("following", [])), timings, "following"),
+        "phases": {phase: entry["seconds"] for phase, entry in timings.get("phases", {}).items()},
+        "round_trips_per_item": (result.get("round_trips") or {}).get("per_item", {}),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark scrape_twitter against a local fake X")
+    fake_x_server.add_arguments(parser)
+    parser.add_argument('--runs', type=int, default=1, help='scrapes to run, each of a different profile (default: 1)')
+    parser.add_argument('--rate', type=float, default=100.0, help='token bucket rate in requests/s (default: 100)')
+    parser.add_argument('--headed', action='store_true', help='keep DISPLAY so Chromium runs headed')
+    parser.add_argument('--log-level', default="warning", help='SCRAPER_LOG_LEVEL for the runs (default: warning)')
+    parser.add_argument('--render', default="auto",
+                        help='comma-separated render profiles to run in turn: auto, low, full (default: auto)')
+    parser.add_argument('--tweets-only', action='store_true', help='skip followers and following, so CPU is all timeline')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+    modes = [mode.strip() for mode in args.render.split(",") if mode.strip()]
+
+    port = _free_port()
+    server = start_server(args, port)
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    try:
+        prepare_environment(args, workdir, f"http://127.0.0.1:{port}")
+        isolate_stores(workdir)
+
+        from app import render
+        sampler = TreeRSSSampler(exclude={server.pid})
+        sampler.start()
+        runs = []
+        for mode in modes:
+            render.MODE = mode
+            for i in range(args.runs):
+                cpu_before = sampler.cpu_seconds()
+                run = asyncio.run(run_once(f"bench{i}", args))
+                run["render"] = mode
+                run["cpu_seconds"] = round(sampler.cpu_seconds() - cpu_before, 2)
+                items = run["tweets"] + run["retweets"]
+                run["cpu_seconds_per_100_tweets"] = round(run["cpu_seconds"] * 100 / items, 2) if items else None
+                runs.append(run)
+        sampler.stop()
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"\nOffline scrape benchmark ({args.tweets} tweets, {args.followers} followers, "
+          f"{args.following} following per profile; {args.latency_ms:.0f} ms latency)")
+    print(f"{'run':<8} {'render':<6} {'wall s':>8} {'items':>7} {'tweets/s':>9} {'followers/s':>12} "
+          f"{'following/s':>12} {'cpu s':>7} {'cpu s/100 tweets':>17}")
+    for run in runs:
+        items = run["tweets"] + run["retweets"]
+        per_100 = run["cpu_seconds_per_100_tweets"]
+        print(f"{run['username']:<8} {run['render']:<6} {run['wall_seconds']:>8.1f} {items:>7} {run['tweets_per_second']:>9.2f} "
+              f"{run['followers_per_second']:>12.2f} {run['following_per_second']:>12.2f} {run['cpu_seconds']:>7.1f} "
+              f"{per_100 if per_100 is not None else '-':>17}")
+    print(f"peak RSS: {sampler.peak_kb / 1024:.1f} MB across {sampler.peak_processes} processes")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "runs": runs, "peak_rss_kb": sampler.peak_kb}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
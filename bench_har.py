@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Record/replay harness for repeatable scraper baselines.
+
+record   scrapes a real profile with network recording on (SCRAPER_HAR_RECORD)
+         and saves the scrubbed HAR plus a baseline file with the run's
+         parameters and result.
+replay   runs scrape_twitter fully offline from the HAR (route_from_har;
+         requests missing from it fail), in a temporary data directory, and
+         compares each result with the baseline. Exits 1 if they differ.
+         --save keeps the timings; --against compares them with an
+         earlier --save to catch slowdowns.
+compare  diffs two baseline or result files.
+
+Usage:
+  python bench_har.py record <username> --har data/har/<username>.har [--max-tweets 50 ...]
+  python bench_har.py replay --har data/har/<username>.har [--runs 3] [--save run.json] [--against old.json]
+  python bench_har.py compare <a.json> <b.json>
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+import bench_e2e
+
+SECTION_KEYS = {
+    "tweets": "tweet_id",
+    "retweets": "tweet_id",
+    "followers": "follower_username",
+    "following": "following_username",
+}
+SHOWN_DIFFERENCES = 5  # per section
+SLOWDOWN_TOLERANCE = 0.2  # --against flags runs more than 20% slower
+
+def baseline_path(har: str) -> str:
+    return os.path.splitext(har)[0] + ".baseline.json"
+
+def _load(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    # Baseline and --save files wrap the result; plain results are accepted too
+    return data.get("result", data)
+
+def compare_results(expected: Dict, actual: Dict) -> Dict:
+    """Per-section missing, extra and changed items, keyed like the spill file."""
+    report = {"profile_changed": (expected.get("user_profile") or {}) != (actual.get("user_profile") or {})}
+    for section, key in SECTION_KEYS.items():
+        before = {item.get(key): item for item in expected.get(section) or []}
+        after = {item.get(key): item for item in actual.get(section) or []}
+        changed = []
+        for item_key in before.keys() & after.keys():
+            fields = sorted(f for f in before[item_key].keys() | after[item_key].keys()
+                            if before[item_key].get(f) != after[item_key].get(f))
+            if fields:
+                changed.append({"key": item_key, "fields": fields})
+        report[section] = {
+            "expected": len(before),
+            "actual": len(after),
+            "missing": sorted(k for k in before.keys() - after.keys() if k is not None),
+            "extra": sorted(k for k in after.keys() - before.keys() if k is not None),
+            "changed": changed,
+        }
+    return report
+
+def is_identical(report: Dict) -> bool:
+    return not report["profile_changed"] and all(
+        not (report[s]["missing"] or report[s]["extra"] or report[s]["changed"]) for s in SECTION_KEYS
+    )
+
+def print_report(report: Dict) -> None:
+    if report["profile_changed"]:
+        print("  user_profile differs")
+    for section in SECTION_KEYS:
+        entry = report[section]
+        status = "ok" if not (entry["missing"] or entry["extra"] or entry["changed"]) else "DIFFERS"
+        print(f"  {section:<10} {entry['actual']:>5}/{entry['expected']:<5} {status}"
+              + (f"  missing {len(entry['missing'])}" if entry["missing"] else "")
+              + (f"  extra {len(entry['extra'])}" if entry["extra"] else "")
+              + (f"  changed {len(entry['changed'])}" if entry["changed"] else ""))
+        for key in entry["missing"][:SHOWN_DIFFERENCES]:
+            print(f"    - {key}")
+        for key in entry["extra"][:SHOWN_DIFFERENCES]:
+            print(f"    + {key}")
+        for change in entry["changed"][:SHOWN_DIFFERENCES]:
+            print(f"    ~ {change['key']}: {', '.join(change['fields'])}")
+
+async def _scrape(username: str, params: Dict) -> Dict:
+    from app.scraper import scrape_twitter
+    return await scrape_twitter(username, **params)
+
+def record(args) -> int:
+    os.environ["SCRAPER_HAR_RECORD"] = os.path.abspath(args.har)
+    os.environ.setdefault("SCRAPER_ASSET_CACHE", "0")
+    params = {"max_tweets": args.max_tweets, "max_retweets": args.max_retweets,
+              "max_followers": args.max_followers, "max_following": args.max_following}
+    result = asyncio.run(_scrape(args.username, params))
+    if not os.path.exists(args.har):
+        print("No HAR was written; see the scrape output above")
+        return 1
+    with open(baseline_path(args.har), "w", encoding="utf-8") as f:
+        json.dump({"username": args.username, "params": params, "result": result}, f, ensure_ascii=False, indent=2)
+    print(f"Recorded {args.har} and {baseline_path(args.har)}")
+    return 0
+
+def replay(args) -> int:
+    with open(baseline_path(args.har), "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    workdir = tempfile.mkdtemp(prefix="bench_har_")
+    # Recorded URLs are X's own; the identity only has to exist, its cookies are never checked
+    bench_e2e.prepare_environment(args, workdir, "https://twitter.com")
+    os.environ["SCRAPER_HAR_REPLAY"] = os.path.abspath(args.har)
+    bench_e2e.isolate_stores(workdir)
+
+    runs: List[Dict] = []
+    identical = True
+    for i in range(args.runs):
+        started = time.perf_counter()
+        result = asyncio.run(_scrape(baseline["username"], baseline["params"]))
+        summary = bench_e2e.summarize_run(baseline["username"], result, time.perf_counter() - started)
+        report = compare_results(baseline["result"], result)
+        identical = identical and is_identical(report)
+        print(f"\nReplay {i + 1}/{args.runs}: {summary['wall_seconds']:.1f}s, "
+              f"{summary['tweets_per_second']:.2f} tweets/s, {summary['followers_per_second']:.2f} followers/s")
+        print_report(report)
+        runs.append({**summary, "identical": is_identical(report)})
+        if args.save and i == args.runs - 1:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump({"har": args.har, "runs": runs, "result": result}, f, ensure_ascii=False, indent=2)
+
+    slower = False
+    if args.against:
+        with open(args.against, "r", encoding="utf-8") as f:
+            previous = json.load(f)["runs"]
+        before = min(run["wall_seconds"] for run in previous)
+        after = min(run["wall_seconds"] for run in runs)
+        change = (after - before) / before if before else 0.0
+        slower = change > SLOWDOWN_TOLERANCE
+        print(f"\nBest wall time {after:.1f}s vs {before:.1f}s in {args.against} ({change:+.0%})"
+              + ("  SLOWER" if slower else ""))
+    return 0 if identical and not slower else 1
+
+def compare(args) -> int:
+    report = compare_results(_load(args.expected), _load(args.actual))
+    print(f"{args.actual} vs {args.expected}:")
+    print_report(report)
+    return 0 if is_identical(report) else 1
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Record and replay scraping sessions as HAR baselines")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="scrape live and save a scrubbed HAR and baseline")
+    record_parser.add_argument("username")
+    record_parser.add_argument("--har", required=True)
+    record_parser.add_argument("--max-tweets", type=int, default=50)
+    record_parser.add_argument("--max-retweets", type=int, default=50)
+    record_parser.add_argument("--max-followers", type=int, default=100)
+    record_parser.add_argument("--max-following", type=int, default=100)
+    record_parser.set_defaults(handler=record)
+
+    replay_parser = commands.add_parser("replay", help="scrape offline from a HAR and compare with its baseline")
+    replay_parser.add_argument("--har", required=True)
+    replay_parser.add_argument("--runs", type=int, default=1)
+    replay_parser.add_argument("--rate", type=float, default=100.0, help="token bucket rate in requests/s (default: 100)")
+    replay_parser.add_argument("--headed", action="store_true")
+    replay_parser.add_argument("--log-level", default="warning")
+    replay_parser.add_argument("--save", help="write the run timings and last result here")
+    replay_parser.add_argument("--against", help="an earlier --save file to compare wall time with")
+    replay_parser.set_defaults(handler=replay)
+
+    compare_parser = commands.add_parser("compare", help="diff two baseline/result files")
+    compare_parser.add_argument("expected")
+    compare_parser.add_argument("actual")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of the extraction helpers against fake_dom.py: each helper
+runs on tweets and user cells rendered by fake_x_server.py, and the table
+shows per item how many Playwright calls it made, what those cost at the
+given per-call latency, and how much CPU the helper (plus the fake DOM)
+burned. No browser is needed, so a selector change shows up here before it
+shows up as a slower scrape.
+
+Latency is simulated by default (added up, not slept); --sleep awaits it so
+the wall column includes the event loop.
+
+Usage: python bench_helpers.py [--tweets 200] [--users 200] [--latency-ms 1.5] [--sleep] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Callable, Dict, List
+import fake_x_server
+from fake_dom import FakePage
+
+TWEET_SELECTOR = 'article[data-testid="tweet"]'
+CELL_SELECTOR = 'div[data-testid="UserCell"]'
+
+def _helpers() -> Dict[str, Callable]:
+    from app import scraper
+    return {
+        "get_main_tweet_content": scraper.get_main_tweet_content,
+        "get_tweet_id": scraper.get_tweet_id,
+        "is_repost": scraper.is_repost,
+        "extract_username_from_cell": scraper.extract_username_from_cell,
+        "extract_display_name_from_cell": lambda cell: scraper.extract_display_name_from_cell(cell, ""),
+    }
+
+def build_items(config: fake_x_server.Config, username: str, kind: str, count: int, latency: float,
+                sleep: bool) -> List:
+    """One FakePage per item, so lookups scan that item only, as on a page the scraper walks item by item."""
+    display = fake_x_server._display_name(fake_x_server._rng(config, username, "profile"))
+    items = []
+    for i in range(count):
+        if kind == "tweets":
+            html, selector = fake_x_server.render_tweet(config, username, display, i), TWEET_SELECTOR
+        else:
+            html, selector = fake_x_server.render_user_cell(config, username, kind, i), CELL_SELECTOR
+        items.append(FakePage(html, latency=latency, sleep=sleep).locator(selector).first)
+    return items
+
+async def measure(helper: Callable, items: List) -> Dict:
+    calls: Dict[str, int] = {}
+    simulated = cpu = 0.0
+    found = 0
+    started = time.perf_counter()
+    for item in items:
+        page = item._page
+        page.reset_counters()
+        cpu_started = time.process_time()
+        value = await helper(item)
+        cpu += time.process_time() - cpu_started
+        found += bool(value)
+        simulated += page.simulated_seconds
+        for method, n in page.calls.items():
+            calls[method] = calls.get(method, 0) + n
+    wall = time.perf_counter() - started
+    n = len(items) or 1
+    return {
+        "items": len(items),
+        "hit_rate": round(found / n, 3),
+        "calls_per_item": round(sum(calls.values()) / n, 2),
+        "calls_by_method": {method: round(count / n, 2) for method, count in sorted(calls.items())},
+        "simulated_ms_per_item": round(simulated * 1000 / n, 3),
+        "cpu_us_per_item": round(cpu * 1e6 / n, 1),
+        "wall_ms_per_item": round(wall * 1000 / n, 3),
+    }
+
+async def run(args) -> Dict:
+    config = fake_x_server.Config(tweets=args.tweets, retweet_ratio=args.retweet_ratio,
+                                  followers=args.users, seed=args.seed)
+    latency = args.latency_ms / 1000
+    tweets = build_items(config, "bench", "tweets", args.tweets, latency, args.sleep)
+    cells = build_items(config, "bench", "followers", args.users, latency, args.sleep)
+    results = {}
+    for name, helper in _helpers().items():
+        results[name] = await measure(helper, cells if "cell" in name else tweets)
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calls and simulated latency per item of the extraction helpers")
+    parser.add_argument('--tweets', type=int, default=200, help='tweets to render (default: 200)')
+    parser.add_argument('--users', type=int, default=200, help='user cells to render (default: 200)')
+    parser.add_argument('--retweet-ratio', type=float, default=0.2, help='share of tweets that are reposts (default: 0.2)')
+    parser.add_argument('--latency-ms', type=float, default=1.5, help='cost of one Playwright call in ms (default: 1.5)')
+    parser.add_argument('--sleep', action='store_true', help='await the latency instead of only adding it up')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"\nExtraction helpers at {args.latency_ms:g} ms per call "
+          f"({'slept' if args.sleep else 'simulated'}; {args.tweets} tweets, {args.users} user cells)")
+    print(f"{'helper':<32} {'calls/item':>10} {'sim ms/item':>12} {'cpu us/item':>12} {'wall ms/item':>13} {'hits':>6}")
+    for name, entry in results.items():
+        print(f"{name:<32} {entry['calls_per_item']:>10.2f} {entry['simulated_ms_per_item']:>12.3f} "
+              f"{entry['cpu_us_per_item']:>12.1f} {entry['wall_ms_per_item']:>13.3f} {entry['hit_rate']:>6.0%}")
+        print(f"{'':<34}" + ", ".join(f"{method} {count:g}" for method, count in entry["calls_by_method"].items()))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "helpers": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
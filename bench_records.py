@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the per-item representations used while scraping
+followers: plain dicts with long keys, slotted SocialUserRecord, and the
+Pydantic Follower model used at the API boundary.
+
+Usage: python bench_records.py [--count 100000]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from app.models import Follower
+from app.records import SocialUserRecord
+
+def make_fields(i: int):
+    # Distinct strings per item, like real extracted text
+    return f"user_{i:07d}", f"Display Name {i}", f"Bio text for follower number {i} #tag"
+
+def build_dicts(count: int):
+    items = []
+    for i in range(count):
+        handle, name, bio = make_fields(i)
+        items.append({"follower_username": handle, "follower_name": name, "follower_bio": bio})
+    return items
+
+def build_records(count: int):
+    items = []
+    for i in range(count):
+        handle, name, bio = make_fields(i)
+        items.append(SocialUserRecord(username=handle, name=name, bio=bio))
+    return items
+
+def build_pydantic(count: int):
+    items = []
+    for i in range(count):
+        handle, name, bio = make_fields(i)
+        items.append(Follower(follower_username=handle, follower_name=name, follower_bio=bio))
+    return items
+
+def measure(builder, count: int):
+    """Return (total bytes, container bytes, seconds) for building count items."""
+    # Field strings are identical across builders; measure them once to separate them out
+    gc.collect()
+    tracemalloc.start()
+    strings = []
+    for i in range(count):
+        strings.extend(make_fields(i))
+    string_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del strings
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    items = builder(count)
+    elapsed = time.perf_counter() - start
+    total = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return total, max(total - string_bytes, 0), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=100_000, help='number of followers to build')
+    args = parser.parse_args()
+
+    print(f"Building {args.count:,} followers\n")
+    print(f"{'representation':<22}{'total MB':>10}{'overhead MB':>13}{'B/item':>9}{'build s':>9}")
+    for label, builder in (("dict", build_dicts), ("SocialUserRecord", build_records), ("pydantic Follower", build_pydantic)):
+        total, overhead, elapsed = measure(builder, args.count)
+        print(f"{label:<22}{total / 1e6:>10.1f}{overhead / 1e6:>13.1f}{overhead / args.count:>9.0f}{elapsed:>9.2f}")
+
+if __name__ == "__main__":
+    main()
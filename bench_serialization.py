@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for JSON serialization and response compression
+using the stored scraped_profiles/*.json fixtures.
+
+Usage: python bench_serialization.py [--repeat 200] [--scale 20]
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import time
+from app.responses import FastJSONResponse, orjson, brotli, GZIP_LEVEL, BROTLI_QUALITY
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'scraped_profiles')
+
+def starlette_default(content) -> bytes:
+    """What JSONResponse.render does out of the box."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def pretty(content) -> bytes:
+    """What PrettyJSONResponse.render does."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=2, separators=(", ", ": ")).encode("utf-8")
+
+def fast(content) -> bytes:
+    return FastJSONResponse(content=None).render(content)
+
+def load_fixtures():
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.json'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            fixtures[os.path.basename(path)] = json.load(f)
+    return fixtures
+
+def build_large_payload(fixtures, scale: int):
+    """Merge all fixtures and repeat them to get a result with thousands of bios."""
+    merged = {"user_profile": {"username": "bench", "bio": ""}, "tweets": [], "retweets": [], "followers": [], "following": []}
+    for _ in range(scale):
+        for data in fixtures.values():
+            for key in ("tweets", "retweets", "followers", "following"):
+                merged[key].extend(data.get(key, []))
+    return merged
+
+def time_call(func, arg, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(arg)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def bench_payload(name, content, repeat: int):
+    print(f"\n== {name} ==")
+    encoders = [("starlette json", starlette_default), ("pretty indent=2", pretty)]
+    if orjson is not None:
+        encoders.append(("orjson", fast))
+    else:
+        encoders.append(("fast (stdlib fallback)", fast))
+    for label, func in encoders:
+        ms = time_call(func, content, repeat)
+        print(f"  {label:<24} {ms:8.3f} ms  {len(func(content)):>10,} bytes")
+
+    body = fast(content)
+    print(f"  {'bytes sent (identity)':<24} {'':>11}  {len(body):>10,} bytes")
+    ms = time_call(lambda b: gzip.compress(b, compresslevel=GZIP_LEVEL), body, max(1, repeat // 4))
+    gz = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    print(f"  {'gzip -' + str(GZIP_LEVEL):<24} {ms:8.3f} ms  {len(gz):>10,} bytes ({len(gz) / len(body):.1%})")
+    if brotli is not None:
+        ms = time_call(lambda b: brotli.compress(b, quality=BROTLI_QUALITY), body, max(1, repeat // 4))
+        br = brotli.compress(body, quality=BROTLI_QUALITY)
+        print(f"  {'brotli q' + str(BROTLI_QUALITY):<24} {ms:8.3f} ms  {len(br):>10,} bytes ({len(br) / len(body):.1%})")
+    else:
+        print("  brotli not installed - skipping")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200, help='iterations per measurement')
+    parser.add_argument('--scale', type=int, default=20, help='copies of all fixtures in the large payload')
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    if not fixtures:
+        print(f"No fixtures found in {FIXTURES_DIR}")
+        return
+    for name, content in fixtures.items():
+        bench_payload(name, content, args.repeat)
+
+    large = build_large_payload(fixtures, args.scale)
+    total_items = sum(len(large[k]) for k in ("tweets", "retweets", "followers", "following"))
+    bench_payload(f"all fixtures x{args.scale} ({total_items:,} items)", large, max(1, args.repeat // 10))
+
+if __name__ == "__main__":
+    main()
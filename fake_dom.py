@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+In-memory stand-in for the part of Playwright's async Page/Locator API the
+scraper's extraction helpers use, backed by parsed HTML.
+
+Supports the CSS the helpers' selectors need: tag, [attr], [attr="v"],
+[attr*="v"], [attr^="v"], [attr$="v"] (with the " i" flag), descendant and
+child combinators, selector lists, :not(), :has() (optionally "> ..."),
+:first-child, :last-child and Playwright's :has-text(), plus ">>" chains
+with text= and nth= parts. Locators are lazy and scoped like Playwright's:
+a selector inside an element matches its descendants, with ancestors outside
+the scope still counting for combinators.
+
+Every awaited call costs the configured latency, either slept (sleep=True)
+or only added to a simulated clock, and is counted per method. Single-element
+actions follow strict mode: no match raises FakeTimeoutError at once (a real
+page would wait for the timeout), more than one raises StrictModeViolation.
+
+Usage:
+    page = FakePage(html, latency=0.002)
+    articles = await page.locator('article[data-testid="tweet"]').all()
+"""
+import asyncio
+import re
+from html import escape
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Union
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+RAW_TEXT_TAGS = {"script", "style"}
+BLOCK_TAGS = {"address", "article", "aside", "blockquote", "div", "dl", "fieldset", "figure", "footer", "form",
+              "h1", "h2", "h3", "h4", "h5", "h6", "header", "li", "main", "nav", "ol", "p", "pre", "section",
+              "table", "tr", "ul"}
+
+class FakeTimeoutError(Exception):
+    pass
+
+class StrictModeViolation(Exception):
+    pass
+
+class SelectorError(ValueError):
+    pass
+
+class Element:
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Element"] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List[Union["Element", str]] = []
+        self.parent = parent
+
+    def elements(self) -> List["Element"]:
+        return [child for child in self.children if isinstance(child, Element)]
+
+    def descendants(self):
+        stack = list(reversed(self.elements()))
+        while stack:
+            element = stack.pop()
+            yield element
+            stack.extend(reversed(element.elements()))
+
+    def text_content(self) -> str:
+        return "".join(child if isinstance(child, str) else child.text_content() for child in self.children)
+
+    def inner_text(self) -> str:
+        parts: List[str] = []
+        self._inner_text(parts)
+        text = "".join(parts)
+        return "\n".join(line.strip() for line in text.split("\n") if line.strip())
+
+    def _inner_text(self, parts: List[str]) -> None:
+        if self.tag in RAW_TEXT_TAGS:
+            return
+        block = self.tag in BLOCK_TAGS
+        if block:
+            parts.append("\n")
+        for child in self.children:
+            if isinstance(child, str):
+                parts.append(re.sub(r"\s+", " ", child))
+            else:
+                child._inner_text(parts)
+        if block:
+            parts.append("\n")
+
+    def inner_html(self) -> str:
+        return "".join(escape(child, quote=False) if isinstance(child, str) else child.outer_html()
+                       for child in self.children)
+
+    def outer_html(self) -> str:
+        attrs = "".join(f' {name}="{escape(value)}"' for name, value in self.attrs.items())
+        if self.tag in VOID_TAGS:
+            return f"<{self.tag}{attrs}>"
+        return f"<{self.tag}{attrs}>{self.inner_html()}</{self.tag}>"
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element("#document", {})
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        element = Element(tag, {name: value if value is not None else "" for name, value in attrs}, self.current)
+        self.current.children.append(element)
+        if tag not in VOID_TAGS:
+            self.current = element
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.current = self.current.parent
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+def parse_html(html: str) -> Element:
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+# --- CSS selectors ---
+
+_ATTR = re.compile(r'\[\s*([\w-]+)\s*(?:([*^$|~]?=)\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s\]]+))\s*(i)?\s*)?\]')
+_TAG = re.compile(r"\*|[a-zA-Z][\w-]*")
+
+class Compound:
+    """One compound selector: tag, attribute tests and pseudo-classes."""
+
+    def __init__(self):
+        self.tag: Optional[str] = None
+        self.tests: List[Callable[[Element], bool]] = []
+
+    def matches(self, element: Element) -> bool:
+        if self.tag and self.tag != "*" and element.tag != self.tag:
+            return False
+        return all(test(element) for test in self.tests)
+
+def _attr_test(name: str, op: Optional[str], value: Optional[str], insensitive: bool):
+    def test(element: Element) -> bool:
+        actual = element.attrs.get(name)
+        if actual is None:
+            return False
+        if op is None:
+            return True
+        expected = value
+        if insensitive:
+            actual, expected = actual.lower(), expected.lower()
+        if op == "=":
+            return actual == expected
+        if op == "*=":
+            return expected in actual
+        if op == "^=":
+            return actual.startswith(expected)
+        if op == "$=":
+            return actual.endswith(expected)
+        if op == "~=":
+            return expected in actual.split()
+        return actual == expected or actual.startswith(expected + "-")
+    return test
+
+def _closing_paren(text: str, start: int) -> int:
+    depth, quote = 0, None
+    for i in range(start, len(text)):
+        ch = text[i]
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise SelectorError(f"unbalanced parentheses in {text!r}")
+
+def _split_top_level(text: str, separator: str) -> List[str]:
+    parts, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+        elif ch == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts]
+
+def _unquote(text: str) -> str:
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    return text
+
+def _parse_compound(text: str, pos: int):
+    compound = Compound()
+    match = _TAG.match(text, pos)
+    if match:
+        compound.tag = match.group(0).lower()
+        pos = match.end()
+    while pos < len(text) and text[pos] not in " >\t\n":
+        if text[pos] == "[":
+            match = _ATTR.match(text, pos)
+            if not match:
+                raise SelectorError(f"bad attribute selector at {text[pos:]!r}")
+            name, op, v1, v2, v3, flag = match.groups()
+            value = next((v for v in (v1, v2, v3) if v is not None), None)
+            compound.tests.append(_attr_test(name, op, value, bool(flag)))
+            pos = match.end()
+        elif text.startswith(":", pos):
+            match = re.compile(r":([\w-]+)").match(text, pos)
+            if not match:
+                raise SelectorError(f"bad pseudo-class at {text[pos:]!r}")
+            name, pos = match.group(1), match.end()
+            argument = None
+            if pos < len(text) and text[pos] == "(":
+                end = _closing_paren(text, pos)
+                argument, pos = text[pos + 1:end], end + 1
+            compound.tests.append(_pseudo_test(name, argument))
+        else:
+            raise SelectorError(f"unsupported selector syntax at {text[pos:]!r}")
+    return compound, pos
+
+def _pseudo_test(name: str, argument: Optional[str]):
+    if name == "not":
+        inner = parse_selector(argument)
+        return lambda element: not inner.matches(element)
+    if name == "has":
+        relative = argument.strip()
+        if relative.startswith(">"):
+            inner = parse_selector(relative[1:])
+            return lambda element: any(inner.matches(child) for child in element.elements())
+        inner = parse_selector(relative)
+        return lambda element: any(inner.matches(d) for d in element.descendants())
+    if name == "has-text":
+        needle = _unquote(argument).lower()
+        return lambda element: needle in element.inner_text().lower()
+    if name == "first-child":
+        return lambda element: element.parent is not None and element.parent.elements()[0] is element
+    if name == "last-child":
+        return lambda element: element.parent is not None and element.parent.elements()[-1] is element
+    raise SelectorError(f"unsupported pseudo-class :{name}")
+
+class Complex:
+    """Compounds joined by descendant (" ") and child (">") combinators, matched right to left."""
+
+    def __init__(self, compounds: List[Compound], combinators: List[str]):
+        self.compounds = compounds
+        self.combinators = combinators  # combinators[i] joins compounds[i] and compounds[i + 1]
+
+    def matches(self, element: Element, index: Optional[int] = None) -> bool:
+        index = len(self.compounds) - 1 if index is None else index
+        if not self.compounds[index].matches(element):
+            return False
+        if index == 0:
+            return True
+        ancestor = element.parent
+        if self.combinators[index - 1] == ">":
+            return ancestor is not None and ancestor.tag != "#document" and self.matches(ancestor, index - 1)
+        while ancestor is not None and ancestor.tag != "#document":
+            if self.matches(ancestor, index - 1):
+                return True
+            ancestor = ancestor.parent
+        return False
+
+class SelectorList:
+    def __init__(self, selectors: List[Complex]):
+        self.selectors = selectors
+
+    def matches(self, element: Element) -> bool:
+        return any(selector.matches(element) for selector in self.selectors)
+
+_cache: Dict[str, SelectorList] = {}
+
+def parse_selector(text: str) -> SelectorList:
+    cached = _cache.get(text)
+    if cached is not None:
+        return cached
+    selectors = []
+    for part in _split_top_level(text, ","):
+        compounds, combinators, pos = [], [], 0
+        while True:
+            while pos < len(part) and part[pos].isspace():
+                pos += 1
+            compound, pos = _parse_compound(part, pos)
+            compounds.append(compound)
+            combinator = " "
+            while pos < len(part) and (part[pos].isspace() or part[pos] == ">"):
+                if part[pos] == ">":
+                    combinator = ">"
+                pos += 1
+            if pos >= len(part):
+                break
+            combinators.append(combinator)
+        selectors.append(Complex(compounds, combinators))
+    _cache[text] = result = SelectorList(selectors)
+    return result
+
+def query_all(scope: Element, selector: str) -> List[Element]:
+    """Playwright-style query: CSS, or a ">>" chain of CSS, text= and nth= parts."""
+    current = [scope]
+    for part in (p.strip() for p in selector.split(">>")):
+        if part.startswith("nth="):
+            index = int(part[4:])
+            current = current[index:index + 1] if index >= 0 else current[index:][:1]
+            continue
+        found: List[Element] = []
+        seen = set()
+        for root in current:
+            if part.startswith("text="):
+                needle = _unquote(part[5:]).lower()
+                # The deepest elements containing the text, like Playwright's text engine
+                matches = [d for d in root.descendants() if needle in d.inner_text().lower()
+                           and not any(needle in c.inner_text().lower() for c in d.elements())]
+            else:
+                compiled = parse_selector(part)
+                matches = [d for d in root.descendants() if compiled.matches(d)]
+            for element in matches:
+                if id(element) not in seen:
+                    seen.add(id(element))
+                    found.append(element)
+        current = found
+    return current
+
+# --- Page and Locator ---
+
+class FakePage:
+    """A loaded document plus the per-call latency model and call counters."""
+
+    def __init__(self, html: str = "", latency: Union[float, Dict[str, float]] = 0.0, sleep: bool = False,
+                 url: str = "about:blank"):
+        self.document = parse_html(html)
+        self.latency = latency if isinstance(latency, dict) else {"default": latency}
+        self.sleep = sleep
+        self.url = url
+        self.calls: Dict[str, int] = {}
+        self.simulated_seconds = 0.0
+        self.default_timeout = 30000
+        self.keyboard = _FakeKeyboard(self)
+
+    async def _call(self, method: str) -> None:
+        self.calls[method] = self.calls.get(method, 0) + 1
+        delay = self.latency.get(method, self.latency.get("default", 0.0))
+        self.simulated_seconds += delay
+        if self.sleep and delay:
+            await asyncio.sleep(delay)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_counters(self) -> None:
+        self.calls = {}
+        self.simulated_seconds = 0.0
+
+    def set_content_sync(self, html: str) -> None:
+        self.document = parse_html(html)
+
+    def locator(self, selector: str) -> "FakeLocator":
+        return FakeLocator(self, None, selector)
+
+    def set_default_timeout(self, timeout: float) -> None:
+        self.default_timeout = timeout
+
+    def on(self, event: str, handler) -> None:
+        pass
+
+    async def set_content(self, html: str) -> None:
+        await self._call("set_content")
+        self.set_content_sync(html)
+
+    async def goto(self, url: str, **kwargs) -> None:
+        await self._call("goto")
+        self.url = url
+
+    async def content(self) -> str:
+        await self._call("content")
+        return self.document.inner_html()
+
+    async def wait_for_selector(self, selector: str, **kwargs) -> Optional["FakeLocator"]:
+        await self._call("wait_for_selector")
+        if not query_all(self.document, selector):
+            raise FakeTimeoutError(f"waiting for {selector!r}")
+        return self.locator(selector).first
+
+    async def evaluate(self, expression: str, arg=None):
+        await self._call("evaluate")
+        return None
+
+    async def close(self) -> None:
+        await self._call("close")
+
+class _FakeKeyboard:
+    def __init__(self, page: FakePage):
+        self._page = page
+
+    async def press(self, key: str, **kwargs) -> None:
+        await self._page._call("press")
+
+class FakeLocator:
+    """Lazy selector over a FakePage, resolved on every call like a Playwright locator."""
+
+    def __init__(self, page: FakePage, parent: Optional["FakeLocator"], selector: Optional[str] = None,
+                 index: Optional[int] = None):
+        self._page = page
+        self._parent = parent
+        self._selector = selector
+        self._index = index
+
+    def _resolve(self) -> List[Element]:
+        scopes = self._parent._resolve() if self._parent is not None else [self._page.document]
+        if self._index is not None:
+            picked = scopes[self._index:self._index + 1] if self._index >= 0 else scopes[self._index:][:1]
+            return picked
+        found: List[Element] = []
+        seen = set()
+        for scope in scopes:
+            for element in query_all(scope, self._selector):
+                if id(element) not in seen:
+                    seen.add(id(element))
+                    found.append(element)
+        return found
+
+    def _single(self) -> Element:
+        elements = self._resolve()
+        if not elements:
+            raise FakeTimeoutError(f"no element for {self!r}")
+        if len(elements) > 1:
+            raise StrictModeViolation(f"{self!r} resolved to {len(elements)} elements")
+        return elements[0]
+
+    def __repr__(self) -> str:
+        if self._parent is None:
+            return f"locator({self._selector!r})"
+        suffix = f"nth({self._index})" if self._index is not None else f"locator({self._selector!r})"
+        return f"{self._parent!r}.{suffix}"
+
+    def locator(self, selector: str) -> "FakeLocator":
+        return FakeLocator(self._page, self, selector)
+
+    def nth(self, index: int) -> "FakeLocator":
+        return FakeLocator(self._page, self, index=index)
+
+    @property
+    def first(self) -> "FakeLocator":
+        return self.nth(0)
+
+    @property
+    def last(self) -> "FakeLocator":
+        return self.nth(-1)
+
+    async def count(self) -> int:
+        await self._page._call("count")
+        return len(self._resolve())
+
+    async def all(self) -> List["FakeLocator"]:
+        await self._page._call("all")
+        return [self.nth(i) for i in range(len(self._resolve()))]
+
+    async def inner_text(self, **kwargs) -> str:
+        await self._page._call("inner_text")
+        return self._single().inner_text()
+
+    async def text_content(self, **kwargs) -> Optional[str]:
+        await self._page._call("text_content")
+        return self._single().text_content()
+
+    async def inner_html(self, **kwargs) -> str:
+        await self._page._call("inner_html")
+        return self._single().inner_html()
+
+    async def get_attribute(self, name: str, **kwargs) -> Optional[str]:
+        await self._page._call("get_attribute")
+        return self._single().attrs.get(name)
+
+    async def is_visible(self, **kwargs) -> bool:
+        await self._page._call("is_visible")
+        return len(self._resolve()) == 1
+
+    async def click(self, **kwargs) -> None:
+        await self._page._call("click")
+        self._single()
+
+    async def scroll_into_view_if_needed(self, **kwargs) -> None:
+        await self._page._call("scroll_into_view_if_needed")
+        self._single()
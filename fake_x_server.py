@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for x.com, for offline benchmarks and tests of the scraper.
+
+Serves generated home, profile, timeline, followers and following pages with
+the data-testid structure the scraper's selectors expect (UserName,
+UserDescription, article[data-testid="tweet"], socialContext, time[datetime],
+tweetText, cellInnerDiv, User-Name). Timelines scroll infinitely: a small
+script fetches the next batch when the page nears the bottom, after the
+configured latency. Content is deterministic per username and seed.
+
+Point the scraper at it with SCRAPER_BASE_URL=http://127.0.0.1:<port>.
+
+Usage: python fake_x_server.py [--port 8765] [--tweets 200] [--followers 500] [--latency-ms 50]
+"""
+import argparse
+import html
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+WORDS = ("latency throughput python scraper timeline browser cache memory queue worker profile "
+         "event loop async await socket render layout paint benchmark fixture selector cursor "
+         "sqlite index snapshot graph search metrics budget token bucket circuit session").split()
+NAMES = ("Ada Grace Linus Guido Barbara Ken Dennis Margaret Alan Edsger Donald Frances Radia "
+         "Sophie Tim Vint Hedy Katherine John Niklaus").split()
+EPOCH = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+class Config:
+    def __init__(self, tweets: int = 200, retweet_ratio: float = 0.2, followers: int = 500, following: int = 300,
+                 batch: int = 20, latency_ms: float = 50.0, jitter_ms: float = 0.0, window: int = 0,
+                 pinned: bool = True, media_ratio: float = 0.0, seed: int = 1):
+        self.tweets = tweets
+        self.retweet_ratio = retweet_ratio
+        self.followers = followers
+        self.following = following
+        self.batch = batch
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.window = window  # keep at most this many items in the DOM, like X's virtualized lists (0: keep all)
+        self.pinned = pinned
+        self.media_ratio = media_ratio  # share of tweets with a photo; any media also adds avatars
+        self.seed = seed
+
+def _rng(config: Config, *parts) -> random.Random:
+    return random.Random("|".join(str(p) for p in (config.seed,) + parts))
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+def _display_name(rng: random.Random) -> str:
+    return f"{rng.choice(NAMES)} {rng.choice(NAMES)}son"
+
+def _user_name_block(display: str, handle: str, status: Optional[str] = None, when: Optional[datetime] = None) -> str:
+    parts = [
+        f'<div data-testid="User-Name">'
+        f'<a href="/{handle}" role="link"><div><span><span>{html.escape(display)}</span></span></div></a>'
+        f'<a href="/{handle}" role="link" tabindex="-1"><div dir="ltr"><span>@{handle}</span></div></a>'
+    ]
+    if status is not None and when is not None:
+        label = when.strftime("%b %-d")
+        title = when.strftime("%-I:%M %p · %b %-d, %Y")
+        parts.append(
+            f'<a href="/{handle}/status/{status}" role="link">'
+            f'<time datetime="{when.strftime("%Y-%m-%dT%H:%M:%S.000Z")}" title="{title}">{label}</time></a>'
+        )
+    parts.append('</div>')
+    return "".join(parts)
+
+def render_tweet(config: Config, username: str, display: str, index: int) -> str:
+    """One timeline entry: a tweet, a repost of another account, or the pinned tweet."""
+    rng = _rng(config, username, "tweet", index)
+    status = str(1800000000000000000 - index * 7919)
+    when = EPOCH - timedelta(hours=index * 3, minutes=rng.randint(0, 59))
+    context = ""
+    author, author_display = username, display
+    if config.pinned and index == 0:
+        context = '<div data-testid="socialContext"><span>Pinned</span></div>'
+    elif rng.random() < config.retweet_ratio:
+        author = f"{rng.choice(NAMES).lower()}_{rng.randint(1, 9999)}"
+        author_display = _display_name(rng)
+        context = f'<div data-testid="socialContext"><span>{html.escape(display)} reposted</span></div>'
+    text = " ".join(_sentence(rng, 6, 18) for _ in range(rng.randint(1, 3)))
+    replies, reposts, likes = rng.randint(0, 50), rng.randint(0, 200), rng.randint(0, 2000)
+    avatar, photo = "", ""
+    if config.media_ratio > 0:
+        avatar = (f'<div data-testid="Tweet-User-Avatar"><img class="avatar" alt="" '
+                  f'src="/_media/avatar{index % MEDIA_VARIANTS}.png"></div>')
+        if rng.random() < config.media_ratio:
+            photo = (f'<div data-testid="tweetPhoto"><img class="photo" alt="Image" '
+                     f'src="/_media/photo{index % MEDIA_VARIANTS}.png"></div>')
+    return (
+        f'<div data-testid="cellInnerDiv"><article data-testid="tweet" role="article" tabindex="0">'
+        f'{context}{avatar}'
+        f'<div class="body">{_user_name_block(author_display, author, status, when)}'
+        f'<div data-testid="tweetText" lang="en" dir="auto"><span>{html.escape(text)}</span></div>{photo}'
+        # The group label leaves out reposts: the scraper treats any div labelled "repost" as a repost
+        f'<div role="group" aria-label="{replies} replies, {likes} likes">'
+        f'<button data-testid="reply" aria-label="{replies} Replies"><span>{replies}</span></button>'
+        f'<button data-testid="retweet" aria-label="{reposts} reposts"><span>{reposts}</span></button>'
+        f'<button data-testid="like" aria-label="{likes} Likes"><span>{likes}</span></button>'
+        f'</div></div></article></div>'
+    )
+
+def render_user_cell(config: Config, username: str, kind: str, index: int) -> str:
+    rng = _rng(config, username, kind, index)
+    handle = f"{kind[:4]}_{username}_{index}".lower()
+    display = _display_name(rng)
+    bio = _sentence(rng, 4, 16) if rng.random() < 0.8 else ""
+    return (
+        f'<div data-testid="cellInnerDiv"><div data-testid="UserCell" role="button">'
+        f'{_user_name_block(display, handle)}'
+        f'<button role="button"><span>Follow</span></button>'
+        + (f'<div dir="auto"><span>{html.escape(bio)}</span></div>' if bio else "")
+        + '</div></div>'
+    )
+
+# Tweet media: random-noise PNGs, so decoding them costs what a real photo would
+MEDIA_VARIANTS = 8
+MEDIA_SIZES = {"avatar": (96, 96), "photo": (1200, 675)}
+_media_cache: Dict[str, bytes] = {}
+_media_lock = threading.Lock()
+
+def _png(width: int, height: int, seed: str) -> bytes:
+    rng = random.Random(seed)
+    rows = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(height))
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 1)) + chunk(b"IEND", b"")
+
+def render_media(name: str) -> Optional[bytes]:
+    match = MEDIA.match(name)
+    if not match:
+        return None
+    with _media_lock:
+        if name not in _media_cache:
+            _media_cache[name] = _png(*MEDIA_SIZES[match.group(1)], seed=name)
+        return _media_cache[name]
+
+def _total(config: Config, kind: str) -> int:
+    return {"tweets": config.tweets, "followers": config.followers, "following": config.following}[kind]
+
+def render_batch(config: Config, username: str, kind: str, cursor: int) -> Tuple[str, int]:
+    """Items [cursor, cursor + batch) and the next cursor (-1 when exhausted)."""
+    display = _display_name(_rng(config, username, "profile"))
+    end = min(cursor + config.batch, _total(config, kind))
+    if kind == "tweets":
+        items = [render_tweet(config, username, display, i) for i in range(cursor, end)]
+    else:
+        items = [render_user_cell(config, username, kind, i) for i in range(cursor, end)]
+    return "".join(items), (end if end < _total(config, kind) else -1)
+
+# Loads the next batch as the page nears the bottom; with a window, the oldest
+# items are replaced by a spacer of the same height so scroll positions hold.
+SCROLL_SCRIPT = """
+<script>
+(function () {
+  const list = document.getElementById('timeline');
+  const spacer = document.getElementById('spacer');
+  const windowSize = Number(list.dataset.window);
+  let cursor = Number(list.dataset.cursor);
+  let loading = false;
+  async function more() {
+    if (loading || cursor < 0) return;
+    loading = true;
+    try {
+      const response = await fetch('/_timeline/' + list.dataset.user + '/' + list.dataset.kind + '?cursor=' + cursor);
+      cursor = Number(response.headers.get('x-next-cursor'));
+      list.insertAdjacentHTML('beforeend', await response.text());
+      while (windowSize && list.children.length > windowSize) {
+        const first = list.firstElementChild;
+        spacer.style.height = (spacer.offsetHeight + first.offsetHeight) + 'px';
+        first.remove();
+      }
+    } finally {
+      loading = false;
+    }
+  }
+  window.addEventListener('scroll', function () {
+    if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 1500) more();
+  }, {passive: true});
+})();
+</script>
+"""
+
+STYLE = """
+<style>
+body { margin: 0; font: 15px/20px sans-serif; }
+nav { position: fixed; left: 0; top: 0; width: 200px; }
+main { margin-left: 220px; width: 600px; }
+article { display: block; padding: 12px 16px; border-bottom: 1px solid #eee; min-height: 96px; }
+div[data-testid="UserCell"] { padding: 12px 16px; min-height: 64px; }
+img.avatar { float: left; width: 40px; height: 40px; border-radius: 50%; margin-right: 12px; }
+img.photo { display: block; width: 100%; margin-top: 8px; border-radius: 16px; }
+</style>
+"""
+
+def _page(title: str, body: str) -> str:
+    return (
+        f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{html.escape(title)}</title>{STYLE}</head>'
+        f'<body><div id="react-root">'
+        f'<nav><a data-testid="AppTabBar_Home_Link" href="/home">Home</a>'
+        f'<a data-testid="AppTabBar_Profile_Link" href="/bench">Profile</a></nav>'
+        f'<main><div data-testid="primaryColumn">{body}</div></main></div></body></html>'
+    )
+
+def render_home(config: Config) -> str:
+    return _page("Home / X", '<h2 aria-level="2">Home</h2>')
+
+def _timeline(config: Config, username: str, kind: str) -> str:
+    items, cursor = render_batch(config, username, kind, 0)
+    return (
+        f'<div id="spacer"></div>'
+        f'<section aria-label="Timeline"><div id="timeline" data-user="{username}" data-kind="{kind}" '
+        f'data-cursor="{cursor}" data-window="{config.window}">{items}</div></section>{SCROLL_SCRIPT}'
+    )
+
+def render_profile(config: Config, username: str) -> str:
+    rng = _rng(config, username, "profile")
+    display = _display_name(rng)
+    bio = _sentence(rng, 8, 20)
+    header = (
+        f'<h2 aria-level="2">{html.escape(display)}</h2>'
+        f'<div data-testid="UserName"><div><span>{html.escape(display)}</span></div>'
+        f'<div><span>@{username}</span></div></div>'
+        f'<div data-testid="UserDescription" dir="auto"><span>{html.escape(bio)}</span></div>'
+        f'<a href="/{username}/following"><span>{config.following}</span> Following</a>'
+        f'<a href="/{username}/followers"><span>{config.followers}</span> Followers</a>'
+    )
+    return _page(f"{display} (@{username}) / X", header + _timeline(config, username, "tweets"))
+
+def render_social(config: Config, username: str, kind: str) -> str:
+    return _page(f"People {kind} @{username} / X", _timeline(config, username, kind))
+
+HANDLE = re.compile(r"^/([A-Za-z0-9_]{1,30})(?:/(followers|following))?/?$")
+TIMELINE = re.compile(r"^/_timeline/([A-Za-z0-9_]{1,30})/(tweets|followers|following)$")
+MEDIA = re.compile(r"^(avatar|photo)\d+\.png$")
+
+def make_handler(config: Config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _delay(self) -> None:
+            delay = config.latency_ms + (random.uniform(0, config.jitter_ms) if config.jitter_ms else 0)
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+        def _send(self, status: int, body: str, headers: Optional[Dict[str, str]] = None) -> None:
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "no-store")
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            path = url.path
+            if path == "/healthz":
+                self._send(200, "ok")
+                return
+            if path == "/favicon.ico":
+                self._send(404, "")
+                return
+            if path.startswith("/_media/"):
+                # Static, like X's CDN: no latency and cacheable
+                data = render_media(path[len("/_media/"):])
+                if data is None:
+                    self._send(404, "")
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Cache-Control", "max-age=3600")
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            self._delay()
+            if path in ("/", "/home"):
+                self._send(200, render_home(config))
+                return
+            match = TIMELINE.match(path)
+            if match:
+                cursor = int(parse_qs(url.query).get("cursor", ["0"])[0])
+                items, next_cursor = render_batch(config, match.group(1), match.group(2), max(cursor, 0))
+                self._send(200, items, {"X-Next-Cursor": str(next_cursor)})
+                return
+            match = HANDLE.match(path)
+            if match:
+                username, kind = match.group(1), match.group(2)
+                self._send(200, render_social(config, username, kind) if kind else render_profile(config, username))
+                return
+            self._send(404, _page("Page not found / X", '<div data-testid="error-detail">This page doesn’t exist.</div>'))
+
+    return Handler
+
+def make_server(config: Config, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    return server
+
+def serve_in_thread(config: Config, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start a server on a background thread; port 0 picks a free one (see server.server_port)."""
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def config_from_args(args) -> Config:
+    return Config(tweets=args.tweets, retweet_ratio=args.retweet_ratio, followers=args.followers,
+                  following=args.following, batch=args.batch, latency_ms=args.latency_ms,
+                  jitter_ms=args.jitter_ms, window=args.window, pinned=not args.no_pinned,
+                  media_ratio=args.media_ratio, seed=args.seed)
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--tweets', type=int, default=200, help='timeline entries per profile (default: 200)')
+    parser.add_argument('--retweet-ratio', type=float, default=0.2, help='share of entries that are reposts (default: 0.2)')
+    parser.add_argument('--followers', type=int, default=500, help='followers per profile (default: 500)')
+    parser.add_argument('--following', type=int, default=300, help='following per profile (default: 300)')
+    parser.add_argument('--batch', type=int, default=20, help='items per page load or scroll (default: 20)')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='delay before each page or batch (default: 50)')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='extra random delay up to this (default: 0)')
+    parser.add_argument('--window', type=int, default=0, help='max items kept in the DOM, 0 keeps all (default: 0)')
+    parser.add_argument('--no-pinned', action='store_true', help='no pinned tweet at the top of timelines')
+    parser.add_argument('--media-ratio', type=float, default=0.0,
+                        help='share of tweets with a photo; above 0 tweets also get avatars (default: 0)')
+    parser.add_argument('--seed', type=int, default=1, help='content seed (default: 1)')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local fake X for offline scraper runs")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = make_server(config_from_args(args), args.host, args.port)
+    print(f"Fake X serving on http://{args.host}:{server.server_port} (SCRAPER_BASE_URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import time
 
@@ -8,8 +9,17 @@ from playwright.sync_api import sync_playwright
 # Define the paths
 PROFILE_DIR = "/root/back/playwright_profile"
 COOKIES_FILE = os.path.join(os.path.dirname(__file__), "app", "twitter_cookies.json")
+# python login_manual.py <name> saves the session into the identity pool instead
+IDENTITY_NAME = sys.argv[1] if len(sys.argv) > 1 else None
+IDENTITIES_DIR = os.environ.get("SCRAPER_IDENTITIES_DIR", os.path.join(os.path.dirname(__file__), "data", "identities"))
 
 def save_cookies(context):
+    if IDENTITY_NAME:
+        path = os.path.join(IDENTITIES_DIR, f"{IDENTITY_NAME}.json")
+        os.makedirs(IDENTITIES_DIR, exist_ok=True)
+        context.storage_state(path=path)
+        print(f"Session saved to identity pool as {path}")
+        return
     cookies = context.cookies()
     os.makedirs(os.path.dirname(COOKIES_FILE), exist_ok=True)
     with open(COOKIES_FILE, "w") as f:
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the follower graph: partial lists add edges, complete lists replace them
+"""
+import os
+import sys
+import tempfile
+from app import graph, storage
+
+def _result(followers=(), following=(), ended=None):
+    result = {
+        "followers": [{"follower_username": h} for h in followers],
+        "following": [{"following_username": h} for h in following],
+    }
+    if ended is not None:
+        result["ended"] = ended
+    return result
+
+def test_partial_list_adds_edges():
+    """A partial follower list keeps the edges seen before"""
+    print("Testing partial follower lists...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    graph.update_account("alice", _result(followers=["a", "b"]), db_path)
+    graph.update_account("alice", _result(followers=["c"], ended={"followers": "rate_limited"}), db_path)
+    assert graph.followers_of("alice", db_path=db_path)["handles"] == ["a", "b", "c"]
+    print("✓ Partial list tests passed")
+
+def test_complete_list_replaces_edges():
+    """A follower list scrolled to the end drops unfollows"""
+    print("\nTesting complete follower lists...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    graph.update_account("alice", _result(followers=["a", "b"]), db_path)
+    graph.update_account("alice", _result(followers=["b"], ended={"followers": storage.END_OF_LIST}), db_path)
+    assert graph.followers_of("alice", db_path=db_path)["handles"] == ["b"]
+    print("✓ Complete list tests passed")
+
+def test_edges_from_other_accounts_survive():
+    """Re-scraping one account only replaces what its own lists observed"""
+    print("\nTesting edges observed via other accounts...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    graph.update_account("bob", _result(following=["alice"]), db_path)
+    graph.update_account("alice", _result(followers=["carol"], following=["bob"]), db_path)
+    graph.update_account("alice", _result(followers=["carol"], ended={"followers": storage.END_OF_LIST}), db_path)
+    assert graph.followers_of("alice", db_path=db_path)["handles"] == ["bob", "carol"]
+    assert graph.mutuals("alice", db_path=db_path)["handles"] == ["bob"]
+    print("✓ Cross-account edge tests passed")
+
+def test_overlap():
+    """Shared followers with the Jaccard index"""
+    print("\nTesting overlap...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    graph.update_account("alice", _result(followers=["a", "b", "c"]), db_path)
+    graph.update_account("bob", _result(followers=["b", "c", "d"]), db_path)
+    page = graph.overlap("alice", "bob", db_path=db_path)
+    assert page["handles"] == ["b", "c"]
+    assert page["jaccard"] == 0.5
+    assert graph.overlap("alice", "nobody", db_path=db_path) is None
+    print("✓ Overlap tests passed")
+
+def main():
+    print("Running follower graph tests...\n")
+
+    try:
+        test_partial_list_adds_edges()
+        test_complete_list_replaces_edges()
+        test_edges_from_other_accounts_survive()
+        test_overlap()
+
+        print("\n✓ All tests passed!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
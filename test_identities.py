@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the cookie identity pool: leasing, busy vs blocked, and hourly budgets
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import functools
+import tempfile
+from app import identities, ratelimit
+
+def _pool(*names, config=None):
+    """A pool directory with one storage-state file per name, and its database."""
+    directory = tempfile.mkdtemp()
+    for name in names:
+        with open(os.path.join(directory, f"{name}.json"), "w") as f:
+            json.dump({"cookies": [], "origins": []}, f)
+    if config:
+        with open(os.path.join(directory, identities.POOL_CONFIG_FILE), "w") as f:
+            json.dump(config, f)
+    identities.IDENTITIES_DIR = directory
+    return directory, os.path.join(directory, "profiles.db")
+
+def test_leases_spread_and_busy():
+    """Leases go to the least-loaded identity; a full pool is busy, not rate limited"""
+    print("Testing leases...")
+    _, db_path = _pool("a", "b")
+    leases = [identities.acquire("test", db_path) for _ in range(2 * identities.MAX_CONCURRENT)]
+    assert all(leases)
+    assert sorted(lease.identity.name for lease in leases[:2]) == ["a", "b"]
+    assert identities.acquire("test", db_path) is None
+    assert identities.availability(db_path) == ("busy", None)
+    identities.release(leases[0], 5, db_path=db_path)
+    assert identities.availability(db_path) == ("available", None)
+    print("✓ Lease tests passed")
+
+def test_logged_out_identity_is_disabled():
+    """A logged-out session is unusable until its file is replaced"""
+    print("\nTesting disabled identities...")
+    directory, db_path = _pool("a")
+    lease = identities.acquire("test", db_path)
+    identities.release(lease, 1, error="logged_out", logged_out=True, db_path=db_path)
+    assert identities.availability(db_path) == ("unusable", float("inf"))
+    later = time.time() + 10
+    os.utime(os.path.join(directory, "a.json"), (later, later))
+    assert identities.availability(db_path) == ("available", None)
+    print("✓ Disabled identity tests passed")
+
+def test_failed_run_cools_down():
+    """An identity rests for ERROR_COOLDOWN after a run that failed outright"""
+    print("\nTesting cooldowns...")
+    _, db_path = _pool("a")
+    identities.release(identities.acquire("test", db_path), 1, error="boom", db_path=db_path)
+    state, until = identities.availability(db_path)
+    assert state == "blocked" and until > time.time() + identities.ERROR_COOLDOWN - 5
+    print("✓ Cooldown tests passed")
+
+def test_budget_is_charged_as_requests_are_made():
+    """A run stops once the hourly budget is used up, and release() does not count requests twice"""
+    print("\nTesting hourly budgets...")
+    _, db_path = _pool("a", config={"a": {"hourly_budget": 3, "rate": 1000, "burst": 1000}})
+    lease = identities.acquire("test", db_path)
+
+    async def run():
+        limits = ratelimit.start_run(lease.identity.key,
+                                     charge=functools.partial(identities.charge, lease.identity, db_path=db_path))
+        requests = 0
+        while not ratelimit.tripped() and requests < 10:
+            await ratelimit.acquire()
+            requests += 1
+        return limits
+
+    limits = asyncio.run(run())
+    assert limits.acquired == 3 and limits.charged == 3
+    assert limits.budget_until is not None and limits.tripped_until is None
+    assert limits.to_dict()["budget_exhausted_until"] == limits.budget_until
+    identities.release(lease, limits.acquired, charged=limits.charged, db_path=db_path)
+    state, until = identities.availability(db_path)
+    assert state == "blocked" and until == limits.budget_until
+    conn = identities.connect(db_path)
+    used = conn.execute("SELECT SUM(requests) FROM identity_usage").fetchone()[0]
+    conn.close()
+    assert used == 3, used
+    print("✓ Hourly budget tests passed")
+
+def main():
+    print("Running identity pool tests...\n")
+
+    try:
+        test_leases_spread_and_busy()
+        test_logged_out_identity_is_disabled()
+        test_failed_run_cools_down()
+        test_budget_is_charged_as_requests_are_made()
+
+        print("\n✓ All tests passed!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for the scrape job queue: de-duplication, claiming, leases and deferral
+"""
+import os
+import sys
+import time
+import tempfile
+from app import jobs, storage
+
+def _db():
+    return os.path.join(tempfile.mkdtemp(), "profiles.db")
+
+def test_enqueue_dedupes():
+    """An identical pending job is returned instead of queueing another"""
+    print("Testing enqueue de-duplication...")
+    db_path = _db()
+    first = jobs.enqueue("@alice", {"incremental": True}, db_path)
+    assert first["username"] == "alice" and first["status"] == "queued"
+    assert jobs.enqueue("alice", {"incremental": True}, db_path)["id"] == first["id"]
+    assert jobs.enqueue("alice", None, db_path)["id"] != first["id"]
+    try:
+        jobs.enqueue("alice", {"headless": False}, db_path)
+        assert False, "unknown parameter accepted"
+    except ValueError:
+        pass
+    print("✓ Enqueue tests passed")
+
+def test_one_run_per_user():
+    """A user's second job waits until the first one finishes"""
+    print("\nTesting claims...")
+    db_path = _db()
+    first = jobs.enqueue("alice", None, db_path)
+    jobs.enqueue("alice", {"incremental": True}, db_path)
+    other = jobs.enqueue("bob", None, db_path)
+    claimed = jobs.claim("w1", db_path)
+    assert claimed["id"] == first["id"] and claimed["status"] == "running" and claimed["attempts"] == 1
+    assert jobs.claim("w2", db_path)["id"] == other["id"]
+    assert jobs.claim("w3", db_path) is None
+    jobs.complete(first["id"], "w1", {"tweets": 3}, db_path)
+    assert jobs.get_job(first["id"], db_path)["summary"] == {"tweets": 3}
+    assert jobs.claim("w3", db_path)["username"] == "alice"
+    print("✓ Claim tests passed")
+
+def test_heartbeat_and_lost_workers():
+    """Only the owning worker can extend or finish a job; dead workers' jobs are requeued"""
+    print("\nTesting leases...")
+    db_path = _db()
+    job = jobs.enqueue("alice", None, db_path)
+    jobs.claim("w1", db_path)
+    assert jobs.heartbeat(job["id"], "w1", db_path)
+    assert not jobs.heartbeat(job["id"], "w2", db_path)
+    conn = jobs.connect(db_path)
+    conn.execute("UPDATE jobs SET heartbeat_at = ?", (time.time() - jobs.LEASE_SECONDS - 1,))
+    conn.commit()
+    conn.close()
+    reclaimed = jobs.claim("w2", db_path)
+    assert reclaimed["id"] == job["id"] and reclaimed["attempts"] == 2
+    jobs.fail(job["id"], "w1", "too late", db_path)
+    assert jobs.get_job(job["id"], db_path)["status"] == "running"
+    print("✓ Lease tests passed")
+
+def test_defer():
+    """A deferred job waits until its time and does not use up an attempt"""
+    print("\nTesting deferral...")
+    db_path = _db()
+    job = jobs.enqueue("alice", None, db_path)
+    jobs.claim("w1", db_path)
+    jobs.defer(job["id"], "w1", time.time() + 60, "rate limited", db_path)
+    deferred = jobs.get_job(job["id"], db_path)
+    assert deferred["status"] == "queued" and deferred["attempts"] == 0 and deferred["error"] == "rate limited"
+    assert jobs.claim("w1", db_path) is None
+    jobs.defer(job["id"], "w1", time.time() - 1, "ignored: not running", db_path)
+    conn = jobs.connect(db_path)
+    conn.execute("UPDATE jobs SET not_before = ?", (time.time() - 1,))
+    conn.commit()
+    conn.close()
+    assert jobs.claim("w1", db_path)["id"] == job["id"]
+    listing = jobs.list_jobs(db_path=db_path)
+    assert listing["counts"] == {"running": 1}
+    print("✓ Deferral tests passed")
+
+def test_scrape_endpoint_queues():
+    """In queue mode /scrape answers 202 with the job and where to poll it"""
+    print("\nTesting /scrape in queue mode...")
+    from fastapi.testclient import TestClient
+    from app import main as api
+    storage.DB_PATH = _db()
+    api.SCRAPE_MODE = "queue"
+    client = TestClient(api.app)
+    response = client.get("/scrape/alice")
+    assert response.status_code == 202
+    job = response.json()
+    assert response.headers["location"] == f"/jobs/{job['id']}"
+    assert client.get(response.headers["location"]).json()["status"] == "queued"
+    responses = client.get("/openapi.json").json()["paths"]["/scrape/{username}"]["get"]["responses"]
+    assert responses["202"]["content"]["application/json"]["schema"]["$ref"].endswith("/ScrapeJob")
+    print("✓ /scrape queue mode tests passed")
+
+def main():
+    print("Running job queue tests...\n")
+
+    try:
+        test_enqueue_dedupes()
+        test_one_run_per_user()
+        test_heartbeat_and_lost_workers()
+        test_defer()
+        test_scrape_endpoint_queues()
+
+        print("\n✓ All tests passed!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
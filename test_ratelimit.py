@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for per-identity rate limiting: token buckets and the circuit breaker
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+from app import ratelimit, storage
+
+def test_token_bucket():
+    """A burst goes through at once; after that requests are spaced at the rate"""
+    print("Testing the in-process token bucket...")
+    bucket = ratelimit.TokenBucket(rate=2.0, burst=3)
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0], waits
+    # Reservations queue up: the 4th waits half a second, the 5th a whole one
+    assert abs(waits[3] - 0.5) < 0.05 and abs(waits[4] - 1.0) < 0.05, waits
+    print("✓ Token bucket tests passed")
+
+def test_shared_bucket():
+    """Buckets for one identity in different processes draw from the same tokens"""
+    print("\nTesting the shared token bucket...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    first = ratelimit.SharedTokenBucket("alice", rate=1.0, burst=2, db_path=db_path)
+    second = ratelimit.SharedTokenBucket("alice", rate=1.0, burst=2, db_path=db_path)
+    other = ratelimit.SharedTokenBucket("bob", rate=1.0, burst=2, db_path=db_path)
+    assert first.reserve() == 0.0 and second.reserve() == 0.0
+    assert second.reserve() > 0.9
+    assert other.reserve() == 0.0
+    print("✓ Shared bucket tests passed")
+
+def test_acquire_counts_requests():
+    """acquire() paces the current run by its identity's bucket and records the waits"""
+    print("\nTesting acquire...")
+    ratelimit.configure("pacing-test", rate=20.0, burst=1)
+
+    async def run():
+        limits = ratelimit.start_run("pacing-test")
+        for _ in range(3):
+            await ratelimit.acquire()
+        return limits
+
+    limits = asyncio.run(run())
+    assert limits.acquired == 3
+    assert limits.waited > 0.05 and limits.max_wait > 0.0
+    assert limits.to_dict()["requests"] == 3
+    print("✓ Acquire tests passed")
+
+def test_breaker_opens_after_repeated_signals():
+    """BREAKER_THRESHOLD signals in a row open the breaker; a clean run closes it"""
+    print("\nTesting the circuit breaker...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    for _ in range(ratelimit.BREAKER_THRESHOLD - 1):
+        assert ratelimit.record_failure("alice", "http_429", db_path=db_path) is None
+    assert ratelimit.breaker_state("alice", db_path)["state"] == "closed"
+    until = ratelimit.record_failure("alice", "http_429", db_path=db_path)
+    assert until is not None
+    assert ratelimit.breaker_state("alice", db_path)["state"] == "open"
+    assert ratelimit.open_until("alice", db_path) == until
+    ratelimit.record_success("alice", db_path)
+    assert ratelimit.breaker_state("alice", db_path)["state"] == "closed"
+    assert ratelimit.open_until("alice", db_path) is None
+    print("✓ Circuit breaker tests passed")
+
+def test_long_reset_opens_immediately():
+    """A quota that resets beyond BACKOFF_MAX opens the breaker until the reset"""
+    print("\nTesting long resets...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    reset_at = time.time() + ratelimit.BREAKER_MAX_COOLDOWN * 2
+    assert ratelimit.record_failure("alice", "quota_exhausted", reset_at, db_path=db_path) == reset_at
+    print("✓ Long reset tests passed")
+
+def test_tripped_run_stops_acquiring():
+    """Once backoff opens the breaker, acquire() returns at once and the run reports it"""
+    print("\nTesting tripped runs...")
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, "profiles.db")
+    for _ in range(ratelimit.BREAKER_THRESHOLD - 1):
+        ratelimit.record_failure("tripped-test", "http_429", db_path=db_path)
+    original = storage.DB_PATH
+    storage.DB_PATH = db_path
+
+    async def run():
+        limits = ratelimit.start_run("tripped-test")
+        limits.signal("http_429")
+        await ratelimit.acquire()
+        return limits, ratelimit.tripped()
+
+    try:
+        limits, tripped = asyncio.run(run())
+    finally:
+        storage.DB_PATH = original
+    assert tripped and limits.tripped_until is not None
+    assert limits.acquired == 0
+    assert limits.to_dict()["breaker_open_until"] == limits.tripped_until
+    print("✓ Tripped run tests passed")
+
+def main():
+    print("Running rate limit tests...\n")
+
+    try:
+        test_token_bucket()
+        test_shared_bucket()
+        test_acquire_counts_requests()
+        test_breaker_opens_after_repeated_signals()
+        test_long_reset_opens_immediately()
+        test_tripped_run_stops_acquiring()
+
+        print("\n✓ All tests passed!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
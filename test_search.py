@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the full-text index: bio upserts from partial lists, replacement from complete ones
+"""
+import os
+import sys
+import tempfile
+from app import search, storage
+
+def _followers(**bios):
+    return [{"follower_username": h, "follower_bio": bio} for h, bio in bios.items()]
+
+def _bio_handles(query, db_path):
+    return sorted(r["ref"] for r in search.search(query, kind="follower_bio", db_path=db_path)["results"])
+
+def test_partial_list_upserts_bios():
+    """A partial follower list updates and adds bios without dropping the others"""
+    print("Testing partial bio upserts...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    search.index_result("alice", {"followers": _followers(a="painter", b="painter")}, db_path)
+    search.index_result("alice", {"followers": _followers(a="sculptor", c="painter"),
+                                  "ended": {"followers": "limit"}}, db_path)
+    assert _bio_handles("painter", db_path) == ["b", "c"]
+    assert _bio_handles("sculptor", db_path) == ["a"]
+    print("✓ Partial bio upsert tests passed")
+
+def test_complete_list_replaces_bios():
+    """A follower list scrolled to the end drops bios of accounts that left"""
+    print("\nTesting complete bio replace...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    search.index_result("alice", {"followers": _followers(a="painter", b="painter")}, db_path)
+    search.index_result("alice", {"followers": _followers(b="painter"),
+                                  "ended": {"followers": storage.END_OF_LIST}}, db_path)
+    assert _bio_handles("painter", db_path) == ["b"]
+    print("✓ Complete bio replace tests passed")
+
+def test_tweet_search_filters():
+    """Tweets accumulate and can be filtered by user and date"""
+    print("\nTesting tweet search...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    search.index_result("alice", {"tweets": [
+        {"tweet_id": "1", "tweet_content": "release notes for the scraper", "tweet_date": "2024-01-01T10:00:00.000Z"},
+    ]}, db_path)
+    search.index_result("alice", {"tweets": [
+        {"tweet_id": "2", "tweet_content": "scraper release party", "tweet_date": "2024-02-01T10:00:00.000Z"},
+    ]}, db_path)
+    assert search.search("release", db_path=db_path)["total"] == 2
+    since = search.search("release", since="2024-01-15", db_path=db_path)
+    assert [r["ref"] for r in since["results"]] == ["2"]
+    assert search.search("release", username="bob", db_path=db_path)["total"] == 0
+    assert search.search("relea*", until="2024-01-01", db_path=db_path)["total"] == 1
+    print("✓ Tweet search tests passed")
+
+def main():
+    print("Running search index tests...\n")
+
+    try:
+        test_partial_list_upserts_bios()
+        test_complete_list_replaces_bios()
+        test_tweet_search_filters()
+
+        print("\n✓ All tests passed!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for snapshot diffs: removals are only reported for what a run actually covered
+"""
+import os
+import sys
+import tempfile
+from app import snapshots, storage
+
+def _followers(*handles):
+    return [{"follower_username": h} for h in handles]
+
+def test_lost_followers_need_end_of_list():
+    """Only a follower list scrolled to the end reports lost followers"""
+    print("Testing follower removals...")
+    previous = {"followers": ["a", "b", "c"]}
+    for reason in ("limit", "rate_limited", "scroll_limit", "stalled", "error"):
+        result = {"followers": _followers("a"), "ended": {"followers": reason}}
+        diff = snapshots.compute_diff(previous, result)
+        assert diff["followers"] == {"gained": [], "lost": [], "partial": True}, (reason, diff)
+    result = {"followers": _followers("a", "d"), "ended": {"followers": storage.END_OF_LIST}}
+    diff = snapshots.compute_diff(previous, result)
+    assert diff["followers"] == {"gained": ["d"], "lost": ["b", "c"]}, diff
+    print("✓ Follower removal tests passed")
+
+def test_results_without_stop_reason_use_the_cap():
+    """Older results fall back to comparing the list length with the run's cap"""
+    print("\nTesting the cap fallback...")
+    previous = {"followers": ["a", "b"]}
+    result = {"followers": _followers("a")}
+    assert snapshots.compute_diff(previous, result, limits={"followers": 1})["followers"]["partial"]
+    assert snapshots.compute_diff(previous, result, limits={"followers": 10})["followers"]["lost"] == ["b"]
+    print("✓ Cap fallback tests passed")
+
+def test_tweets_compare_within_window():
+    """Tweets older than the run's oldest tweet are not reported as removed"""
+    print("\nTesting the tweet window...")
+    previous = {"tweets": ["100", "200", "300"]}
+    result = {"tweets": [{"tweet_id": "300"}, {"tweet_id": "250"}]}
+    diff = snapshots.compute_diff(previous, result)
+    assert diff["tweets"] == {"added": ["250"], "removed": [], "partial": True}, diff
+    print("✓ Tweet window tests passed")
+
+def test_partial_sections_carry_forward():
+    """Keys a partial run did not see stay in the snapshot, so the next diff is not misleading"""
+    print("\nTesting carried-forward keys...")
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, "profiles.db")
+    complete = {"ended": {"followers": storage.END_OF_LIST}}
+    snapshots.save_snapshot("alice", {"followers": _followers("a", "b", "c"), **complete},
+                            db_path=db_path, snapshots_dir=directory)
+    snapshots.save_snapshot("alice", {"followers": _followers("a"), "ended": {"followers": "rate_limited"}},
+                            db_path=db_path, snapshots_dir=directory)
+    snapshots.save_snapshot("alice", {"followers": _followers("a", "b"), **complete},
+                            db_path=db_path, snapshots_dir=directory)
+    changes = [entry["changes"] for entry in snapshots.list_snapshots("alice", db_path)]
+    assert changes[1] == {"followers_gained": 0, "followers_lost": 0}, changes
+    assert changes[2] == {"followers_gained": 0, "followers_lost": 1}, changes
+    assert snapshots.get_diff("alice", 1, 3, db_path)["followers"]["lost"] == ["c"]
+    assert snapshots.load_snapshot("alice", 2, db_path)["followers"] == _followers("a")
+    print("✓ Carried-forward key tests passed")
+
+def main():
+    print("Running snapshot tests...\n")
+
+    try:
+        test_lost_followers_need_end_of_list()
+        test_results_without_stop_reason_use_the_cap()
+        test_tweets_compare_within_window()
+        test_partial_sections_carry_forward()
+
+        print("\n✓ All tests passed!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
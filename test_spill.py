@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-run spill file: crash recovery, resume and the per-user lock
+"""
+import os
+import sys
+import tempfile
+from app import spill
+
+def test_torn_line_is_ignored():
+    """A record cut off by a crash does not break the rest of the file"""
+    print("Testing torn spill lines...")
+    runs_dir = tempfile.mkdtemp()
+    writer = spill.open_run("alice", runs_dir)
+    writer.append("tweets", {"tweet_id": "1"})
+    writer.close()
+    with open(writer.path, "a") as f:
+        f.write('{"kind": "tweets", "item": {"tweet')
+    writer.release()
+    assert [t["tweet_id"] for t in spill.read_spill(writer.path)["tweets"]] == ["1"]
+    print("✓ Torn line tests passed")
+
+def test_resume_interrupted_run():
+    """A kept spill is resumed by the next run, which can skip what it already has"""
+    print("\nTesting resume...")
+    runs_dir = tempfile.mkdtemp()
+    writer = spill.open_run("alice", runs_dir)
+    writer.append("followers", {"follower_username": "bob"})
+    writer.release()
+    resumed = spill.open_run("alice", runs_dir)
+    try:
+        assert resumed.resumed_keys("followers") == {"bob"}
+        assert resumed.resumed_items("followers") == [{"follower_username": "bob"}]
+    finally:
+        resumed.finish()
+    assert not os.path.exists(resumed.path)
+    print("✓ Resume tests passed")
+
+def test_overlapping_runs_are_refused():
+    """Only one run per user writes the spill; the lock is held until release()"""
+    print("\nTesting the spill lock...")
+    runs_dir = tempfile.mkdtemp()
+    writer = spill.open_run("alice", runs_dir)
+    try:
+        spill.open_run("alice", runs_dir)
+        assert False, "second run opened a locked spill"
+    except spill.SpillBusy:
+        pass
+    # close() keeps the lock so nothing resumes from a spill that is still being saved
+    writer.close()
+    try:
+        spill.open_run("@Alice", runs_dir)
+        assert False, "spill opened before release()"
+    except spill.SpillBusy:
+        pass
+    writer.release()
+    spill.open_run("alice", runs_dir).finish()
+    print("✓ Spill lock tests passed")
+
+def main():
+    print("Running spill file tests...\n")
+
+    try:
+        test_torn_line_is_ignored()
+        test_resume_interrupted_run()
+        test_overlapping_runs_are_refused()
+
+        print("\n✓ All tests passed!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
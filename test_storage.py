@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the profile database: partial follower lists merge, complete ones replace
+"""
+import os
+import sys
+import tempfile
+from app import storage
+
+def _followers(*handles):
+    return [{"follower_username": h, "follower_name": h.title(), "follower_bio": f"bio of {h}"} for h in handles]
+
+def _stored_followers(db_path):
+    result = storage.load_result("alice", db_path)
+    return sorted(user["follower_username"] for user in result["followers"])
+
+def test_complete_relations():
+    """Only lists that reached the end count as complete"""
+    print("Testing complete_relations...")
+    assert storage.complete_relations({}) == {"followers", "following"}
+    ended = {"followers": storage.END_OF_LIST, "following": "rate_limited"}
+    assert storage.complete_relations({"ended": ended}) == {"followers"}
+    assert storage.complete_relations({"ended": {}}) == set()
+    print("✓ complete_relations tests passed")
+
+def test_partial_list_merges():
+    """A capped or interrupted follower list adds to the stored one"""
+    print("\nTesting partial follower list merge...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    storage.save_result("alice", {"followers": _followers("a", "b", "c"),
+                                  "ended": {"followers": storage.END_OF_LIST}}, db_path)
+    revision = storage.save_result("alice", {"followers": _followers("d", "a"),
+                                             "ended": {"followers": "limit"}}, db_path)
+    assert revision == 2
+    assert _stored_followers(db_path) == ["a", "b", "c", "d"], _stored_followers(db_path)
+    print("✓ Partial list merge tests passed")
+
+def test_complete_list_replaces():
+    """A list scrolled to the end drops members that are gone"""
+    print("\nTesting complete follower list replace...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    storage.save_result("alice", {"followers": _followers("a", "b", "c")}, db_path)
+    storage.save_result("alice", {"followers": _followers("b"),
+                                  "ended": {"followers": storage.END_OF_LIST}}, db_path)
+    assert _stored_followers(db_path) == ["b"], _stored_followers(db_path)
+    print("✓ Complete list replace tests passed")
+
+def test_tweets_accumulate():
+    """Tweets from earlier runs are kept"""
+    print("\nTesting tweet accumulation...")
+    db_path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    storage.save_result("alice", {"tweets": [{"tweet_id": "2", "tweet_content": "new", "tweet_date": "2024-01-02"}]}, db_path)
+    storage.save_result("alice", {"tweets": [{"tweet_id": "1", "tweet_content": "old", "tweet_date": "2024-01-01"}]}, db_path)
+    tweets = storage.load_result("alice", db_path)["tweets"]
+    assert [tweet["tweet_id"] for tweet in tweets] == ["2", "1"]
+    assert storage.get_known_status_ids("alice", db_path=db_path) == {"1", "2"}
+    print("✓ Tweet accumulation tests passed")
+
+def main():
+    print("Running profile database tests...\n")
+
+    try:
+        test_complete_relations()
+        test_partial_list_merges()
+        test_complete_list_replaces()
+        test_tweets_accumulate()
+
+        print("\n✓ All tests passed!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()